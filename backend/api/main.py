@@ -1,6 +1,7 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends, Header
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 from typing import List, Dict, Any, Optional
 import uuid
 import os
@@ -19,9 +20,11 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from document_processing.processor import DocumentProcessor
-from document_processing.vectordb import VectorDatabase
+from document_processing.vectordb import ShardedVectorDatabase
+from document_processing.jobs import IngestionJobs, JobQueueFull
 from search.academic import AcademicSearch
 from search.llm import LLMService
+from search.rate_limit import limiter_stats
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -40,16 +43,21 @@ app.add_middleware(
 )
 
 # Initialize services
-vector_db = VectorDatabase()
+vector_db = ShardedVectorDatabase()  # One shard per session, backend selected by VECTOR_BACKEND
 document_processor = DocumentProcessor(vector_db)
+ingestion_jobs = IngestionJobs()  # Bounded background pool for parsing and indexing uploads
 academic_search = AcademicSearch()
 llm_service = LLMService()
 
 # Session management
 sessions = {}  # session_id -> creation_time
 
-def get_session_id(session_id: Optional[str] = Header(None)) -> str:
-    """Get or create a session ID"""
+def get_session_id(
+    session_id: Optional[str] = Header(None),
+    session_id_query: Optional[str] = Query(None, alias="session_id")
+) -> str:
+    """Get or create a session ID (from the session_id header, or the query string the frontend uses)"""
+    session_id = session_id or session_id_query
     if not session_id:
         session_id = str(uuid.uuid4())
     
@@ -80,22 +88,85 @@ async def upload_file(
         )
     
     try:
-        # Process the file
-        result = document_processor.process_file(file.file, file.filename, session_id)
-        
-        return {
-            "session_id": session_id,
-            "file_id": result["file_id"],
-            "filename": result["filename"],
-            "chunk_count": result["chunk_count"],
-            "message": "File uploaded and processed successfully"
-        }
+        # Save the upload off the event loop, then parse and index it in the background
+        upload = await run_in_threadpool(document_processor.save_upload, file.file, file.filename)
     except Exception as e:
-        logger.error(f"Error processing file: {e}")
+        logger.error(f"Error saving file: {e}")
         raise HTTPException(
             status_code=500,
-            detail=f"Error processing file: {str(e)}"
+            detail=f"Error saving file: {str(e)}"
+        )
+    
+    try:
+        job_id = ingestion_jobs.submit(
+            lambda progress: document_processor.ingest_file(upload, session_id, progress),
+            session_id=session_id,
+            file_id=upload["file_id"],
+            filename=upload["filename"]
         )
+    except JobQueueFull as e:
+        document_processor.discard_upload(upload)
+        raise HTTPException(status_code=503, detail=f"Too many uploads in progress, try again later ({e})")
+    
+    return {
+        "session_id": session_id,
+        "job_id": job_id,
+        "file_id": upload["file_id"],
+        "filename": upload["filename"],
+        "status": "queued",
+        "message": f"File uploaded, processing started; poll /upload/{job_id} for progress"
+    }
+
+@app.post("/upload/batch")
+async def upload_batch(
+    files: List[UploadFile] = File(...),
+    session_id: str = Depends(get_session_id)
+):
+    """Upload several documents, or zip/tar archives of documents, in one request"""
+    try:
+        # Save (and unpack) off the event loop, then parse and index the batch as one job
+        uploads = await run_in_threadpool(
+            document_processor.save_batch, [(file.file, file.filename) for file in files]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error saving batch: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error saving files: {str(e)}"
+        )
+    
+    if not uploads:
+        raise HTTPException(status_code=400, detail="No supported documents in the upload (.pdf, .docx, .txt)")
+    
+    try:
+        job_id = ingestion_jobs.submit(
+            lambda progress: document_processor.ingest_batch(uploads, session_id, progress),
+            session_id=session_id,
+            files=[{"file_id": upload["file_id"], "filename": upload["filename"]} for upload in uploads]
+        )
+    except JobQueueFull as e:
+        for upload in uploads:
+            document_processor.discard_upload(upload)
+        raise HTTPException(status_code=503, detail=f"Too many uploads in progress, try again later ({e})")
+    
+    return {
+        "session_id": session_id,
+        "job_id": job_id,
+        "files": [{"file_id": upload["file_id"], "filename": upload["filename"]} for upload in uploads],
+        "status": "queued",
+        "message": f"{len(uploads)} files uploaded, processing started; poll /upload/{job_id} for progress"
+    }
+
+@app.get("/upload/{job_id}")
+def upload_status(job_id: str, session_id: str = Depends(get_session_id)):
+    """Progress of an upload: status, pages parsed, chunks indexed, then the result or error"""
+    job = ingestion_jobs.get(job_id)
+    # Jobs of other sessions are reported as unknown, like their files
+    if job is None or job.get("session_id") != session_id:
+        raise HTTPException(status_code=404, detail=f"Unknown upload job: {job_id}")
+    return job
 
 @app.get("/files")
 def get_files(session_id: str = Depends(get_session_id)):
@@ -107,7 +178,12 @@ async def query(
     query: str = Form(...),
     source: str = Form("both"),  # "uploaded", "online", or "both"
     session_id: str = Depends(get_session_id),
-    previous_messages: Optional[str] = Form(None)  # JSON string of previous messages
+    previous_messages: Optional[str] = Form(None),  # JSON string of previous messages
+    file_name: Optional[str] = Form(None),  # Only search chunks from this uploaded file
+    chunk_type: Optional[str] = Form(None),  # e.g. "page", "table", "toc", "paragraph_group"
+    page_from: Optional[int] = Form(None),
+    page_to: Optional[int] = Form(None),
+    table_index: Optional[int] = Form(None)
 ):
     """Query the research assistant with chat history support"""
     try:
@@ -131,15 +207,30 @@ async def query(
         
         # Search uploaded documents
         if source in ["uploaded", "both"]:
-            doc_results = document_processor.search_documents(query, session_id, top_k=5)
+            retrieval_timings = {}
+            filters = {
+                key: value for key, value in (
+                    ("source", file_name), ("chunk_type", chunk_type), ("page_from", page_from),
+                    ("page_to", page_to), ("table_index", table_index),
+                ) if value is not None
+            }
+            doc_results = document_processor.search_documents(
+                query, session_id, top_k=5, timings=retrieval_timings, filters=filters or None
+            )
             if doc_results:
                 results["uploaded_documents"] = doc_results
+            results["retrieval_timings"] = retrieval_timings
         
         # Search online sources
         if source in ["online", "both"]:
-            paper_results = academic_search.search_all(query, max_results=3)
+            search_timings = {}
+            # Off the event loop, so concurrent identical searches can overlap and be coalesced
+            paper_results = await run_in_threadpool(
+                academic_search.search_all, query, max_results=3, timings=search_timings
+            )
             if paper_results:
                 results["online_papers"] = paper_results
+            results["search_timings"] = search_timings
         
         # Generate answer using LLM
         context = ""
@@ -182,16 +273,16 @@ async def query(
             # Add source information to context
             context += source_info
             
-            answer = llm_service.answer_question(query, context)
+            answer = await run_in_threadpool(llm_service.answer_question, query, context)
             results["answer"] = answer
         elif is_simple_greeting:
             # Handle simple greetings even without context
-            answer = llm_service.answer_question(query, "The user is greeting you. Respond in a friendly manner.")
+            answer = await run_in_threadpool(llm_service.answer_question, query, "The user is greeting you. Respond in a friendly manner.")
             results["answer"] = answer
         else:
             # For other questions without context, use general knowledge
             context_with_sources = (chat_context if len(chat_history) > 0 else "") + source_info
-            answer = llm_service.answer_question(query, context_with_sources)
+            answer = await run_in_threadpool(llm_service.answer_question, query, context_with_sources)
             results["answer"] = answer
         
         # Add the current Q&A to chat history
@@ -210,6 +301,25 @@ async def query(
             detail=f"Error processing query: {str(e)}"
         )
 
+@app.get("/metrics")
+def get_metrics():
+    """Counters for monitoring"""
+    metrics = {"sessions": len(vector_db.shards)}
+    if vector_db.cache is not None:
+        metrics["query_cache"] = vector_db.cache.stats()
+    metrics["pdf_fallback_pages"] = document_processor.fallback_pages
+    metrics["ingestion_jobs"] = ingestion_jobs.stats()
+    if document_processor.parse_cache is not None:
+        metrics["parse_cache"] = document_processor.parse_cache.stats()
+    if academic_search.cache is not None:
+        metrics["search_cache"] = academic_search.cache_stats()
+    metrics["rate_limits"] = limiter_stats()
+    metrics["coalescing"] = {
+        "academic_search": academic_search.flights.stats(),
+        "llm": llm_service.flights.stats(),
+    }
+    return metrics
+
 @app.delete("/file/{file_id}")
 def delete_file(file_id: str, session_id: str = Depends(get_session_id)):
     """Delete a specific file"""
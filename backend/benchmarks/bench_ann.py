@@ -0,0 +1,69 @@
+"""
+Benchmark IVF approximate search against exact search: recall@k vs. latency
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_ann --vectors 50000 --nprobe 1 4 8 16 32
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+# Add the backend directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from document_processing.dense import VectorStore
+from document_processing.ann import IVFIndex
+
+def make_vectors(count: int, dim: int, clusters: int, noise: float, rng: np.random.Generator) -> np.ndarray:
+    """Unit vectors drawn around random topic centres, like chunks of related papers"""
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centres[rng.integers(0, clusters, count)] + noise * rng.standard_normal((count, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--clusters", type=int, default=1000)
+    parser.add_argument("--noise", type=float, default=1.4, help="Spread around each topic centre")
+    parser.add_argument("--batch", type=int, default=500, help="Vectors per add_documents-sized insert")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    data = make_vectors(args.vectors + args.queries, args.dim, args.clusters, args.noise, rng)
+    vectors, queries = data[:args.vectors], data[args.vectors:]
+
+    # Insert incrementally, as uploads would
+    store = VectorStore(args.dim)
+    ivf = IVFIndex(store)
+    start = time.perf_counter()
+    for batch_start in range(0, len(vectors), args.batch):
+        ivf.add(store.add(vectors[batch_start:batch_start + args.batch]))
+        if ivf.needs_training:
+            ivf.train()
+    print(f"Inserted {len(store)} vectors in {time.perf_counter() - start:.2f}s ({len(ivf.lists)} lists)")
+
+    start = time.perf_counter()
+    exact = [store.search(query, args.top_k) for query in queries]
+    exact_ms = (time.perf_counter() - start) / len(queries) * 1000
+    print(f"{'exact':>10}  recall@{args.top_k}=1.000  {exact_ms:7.3f} ms/query")
+
+    truth = [{ordinal for ordinal, _ in result} for result in exact]
+    for nprobe in args.nprobe:
+        start = time.perf_counter()
+        approx = [ivf.search(query, args.top_k, nprobe=nprobe) for query in queries]
+        ivf_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+        hits = sum(len(expected & {ordinal for ordinal, _ in result}) for expected, result in zip(truth, approx))
+        recall = hits / (len(queries) * args.top_k)
+        print(f"{f'nprobe={nprobe}':>10}  recall@{args.top_k}={recall:.3f}  {ivf_ms:7.3f} ms/query  ({exact_ms / ivf_ms:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Measure chunking throughput and chunk sizes on multi-megabyte text files
+
+Compares the paragraph grouping the TXT/DOCX parsers used before (string
+concatenation, no split of long paragraphs) with the shared Chunker, on text
+with regular paragraphs and on text with a few huge paragraphs (e.g. PDFs
+converted to text without blank lines). --no-breaks adds a file that is one
+single paragraph. Each scenario is also read end to end by the TXT parser.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_chunker --megabytes 8 --no-breaks
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+# Add the backend directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from document_processing.chunker import Chunker
+from document_processing.parser import DocumentParser
+
+def make_text(megabytes: float, paragraph_words: int, rng: random.Random, separator: str = "\n\n") -> str:
+    """Sentences of 8-30 words, grouped into paragraphs of about paragraph_words words joined by separator"""
+    vocab = [f"word{i}" for i in range(5000)]
+    paragraphs = []
+    size = 0
+    while size < megabytes * 1e6:
+        sentences = []
+        words = 0
+        while words < paragraph_words:
+            length = rng.randint(8, 30)
+            sentences.append(" ".join(rng.choices(vocab, k=length)).capitalize() + ".")
+            words += length
+        paragraph = " ".join(sentences)
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+    return separator.join(paragraphs)
+
+def legacy_chunks(paragraphs, max_chunk_size: int = 1000) -> list:
+    """Paragraph grouping as previously done in _parse_txt/_parse_docx"""
+    chunks = []
+    current_chunk = ""
+    current_chunk_size = 0
+    for para in paragraphs:
+        if para.strip():
+            if current_chunk_size + len(para) > max_chunk_size and current_chunk:
+                chunks.append(current_chunk)
+                current_chunk = para
+                current_chunk_size = len(para)
+            else:
+                if current_chunk:
+                    current_chunk += "\n\n" + para
+                else:
+                    current_chunk = para
+                current_chunk_size += len(para)
+    if current_chunk:
+        chunks.append(current_chunk)
+    return chunks
+
+def report(name: str, chunks: list, seconds: float, megabytes: float):
+    sizes = sorted(len(chunk) for chunk in chunks)
+    print(f"  {name:>22}: {megabytes / seconds:7.1f} MB/s, {len(chunks):7d} chunks, "
+          f"median {statistics.median(sizes):8.0f} chars, max {sizes[-1]:9d} chars")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--megabytes", type=float, default=8.0)
+    parser.add_argument("--size", type=int, default=1000)
+    parser.add_argument("--overlap", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-breaks", action="store_true", help="Also run on text without any paragraph break")
+    args = parser.parse_args()
+
+    scenarios = [("regular paragraphs", 25, "\n\n"), ("huge paragraphs", 200000, "\n\n")]
+    if args.no_breaks:
+        scenarios.append(("no breaks", 25, " "))
+
+    rng = random.Random(args.seed)
+    for label, paragraph_words, separator in scenarios:
+        text = make_text(args.megabytes, paragraph_words, rng, separator)
+        megabytes = len(text) / 1e6
+        paragraphs = text.split("\n\n")
+        print(f"{label}: {megabytes:.1f} MB, {len(paragraphs)} paragraphs")
+
+        start = time.perf_counter()
+        chunks = legacy_chunks(paragraphs, args.size)
+        report("legacy grouping", chunks, time.perf_counter() - start, megabytes)
+
+        for unit, size, overlap in (("chars", args.size, args.overlap), ("tokens", args.size // 8, args.overlap // 8)):
+            chunker = Chunker(size, overlap, unit)
+            start = time.perf_counter()
+            chunks = list(chunker.chunks(paragraphs))
+            report(f"Chunker {size} {unit}", chunks, time.perf_counter() - start, megabytes)
+
+        # The TXT parser reads the file in blocks instead of splitting it in memory
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", encoding="utf-8", delete=False) as file:
+            file.write(text)
+        try:
+            chunker = Chunker(args.size, args.overlap, "chars")
+            start = time.perf_counter()
+            chunks = [chunk["content"] for chunk in DocumentParser._iter_txt(file.name, "bench.txt", chunker)]
+            report("TXT parser", chunks, time.perf_counter() - start, megabytes)
+        finally:
+            os.remove(file.name)
+        del text, paragraphs, chunks
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Measure chunk storage memory: plain chunk dicts against the columnar ChunkStore
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_memory --chunks 100000
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+
+# Add the backend directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from document_processing.chunks import ChunkStore
+
+def make_chunk(i: int, sources: list, vocab: list, content_length: int, rng: random.Random) -> dict:
+    """Build a chunk shaped like DocumentParser output"""
+    words = []
+    length = 0
+    while length < content_length:
+        word = rng.choice(vocab)
+        words.append(word)
+        length += len(word) + 1
+    chunk = {
+        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "content": " ".join(words),
+        "metadata": {
+            # Parsed file names arrive as fresh strings, not shared objects
+            "source": "".join(sources[i % len(sources)]),
+            "page": i // 4 + 1,
+            "chunk_type": "table" if i % 4 == 3 else "page",
+        },
+    }
+    if i % 4 == 3:
+        chunk["metadata"]["table_index"] = 0
+    return chunk
+
+def measure(store, args) -> tuple:
+    """Fill a store with chunks and return (bytes allocated, chunk IDs)"""
+    rng = random.Random(args.seed)
+    vocab = [f"word{i}" for i in range(5000)]
+    sources = [f"paper_{i:03d}.pdf" for i in range(args.sources)]
+
+    gc.collect()
+    tracemalloc.start()
+    ids = []
+    for i in range(args.chunks):
+        chunk = make_chunk(i, sources, vocab, args.content_length, rng)
+        store[chunk["id"]] = chunk
+        ids.append(chunk["id"])
+    del chunk
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, ids
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=100000)
+    parser.add_argument("--content-length", type=int, default=500)
+    parser.add_argument("--sources", type=int, default=20)
+    parser.add_argument("--lookups", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{args.chunks} chunks of ~{args.content_length} characters from {args.sources} files")
+    for name, store in (("dict", {}), ("ChunkStore", ChunkStore())):
+        size, ids = measure(store, args)
+
+        # Top-k formatting: the dict store has to be copied, the ChunkStore builds a fresh dict
+        rng = random.Random(args.seed)
+        sample = [rng.choice(ids) for _ in range(args.lookups)]
+        start = time.perf_counter()
+        if isinstance(store, ChunkStore):
+            for doc_id in sample:
+                store[doc_id]
+        else:
+            for doc_id in sample:
+                store[doc_id].copy()
+        lookup_us = (time.perf_counter() - start) / args.lookups * 1e6
+
+        print(f"{name:>10}: {size / 1e6:8.1f} MB, {size / args.chunks:7.0f} bytes/chunk, {lookup_us:5.2f} us/result")
+        del store, ids
+
+if __name__ == "__main__":
+    main()
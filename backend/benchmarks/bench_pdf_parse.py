@@ -0,0 +1,87 @@
+"""
+Measure PDF parsing throughput: page-by-page in one thread against the process pool
+
+Builds synthetic papers with PyMuPDF (text pages, with a ruled table every few
+pages so find_tables has work to do) and parses each one in both modes, checking
+that the parallel mode yields the same chunks in the same order.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_pdf_parse --pages 300 --workers 4
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Add the backend directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import fitz  # PyMuPDF
+
+from document_processing.parser import DocumentParser
+
+def make_pdf(path: str, pages: int, table_every: int, rng: random.Random):
+    """Write a synthetic paper of dense text pages, some with a ruled table"""
+    vocab = [f"word{i}" for i in range(5000)]
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page()
+        lines = [" ".join(rng.choices(vocab, k=12)) for _ in range(45)]
+        page.insert_text((50, 50), f"Page {number + 1}\n" + "\n".join(lines), fontsize=8)
+        if table_every and number % table_every == 0:
+            # A 6x4 grid of ruled cells near the bottom of the page
+            top, left, width, height = 560, 60, 120, 28
+            for row in range(6):
+                for col in range(4):
+                    rect = fitz.Rect(left + col * width, top + row * height,
+                                     left + (col + 1) * width, top + (row + 1) * height)
+                    page.draw_rect(rect, color=(0, 0, 0), width=0.8)
+                    page.insert_text((rect.x0 + 4, rect.y0 + 16), f"r{row}c{col} {rng.choice(vocab)}", fontsize=8)
+    doc.save(path)
+    doc.close()
+
+def signature(chunks: list) -> list:
+    """Chunk contents and metadata, ignoring the random IDs"""
+    return [(chunk["content"], chunk["metadata"]) for chunk in chunks]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[50, 300])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--table-every", type=int, default=3, help="Put a table on every Nth page (0 for none)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    logging.getLogger("document_processing").setLevel(logging.WARNING)
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Start the pool up front so its startup is not charged to the first document
+        warmup = os.path.join(temp_dir, "warmup.pdf")
+        make_pdf(warmup, 2, 0, rng)
+        list(DocumentParser._iter_pdf(warmup, "warmup.pdf", workers=args.workers, min_pages=0))
+
+        for pages in args.pages:
+            path = os.path.join(temp_dir, f"paper_{pages}.pdf")
+            make_pdf(path, pages, args.table_every, rng)
+
+            start = time.perf_counter()
+            sequential = list(DocumentParser._iter_pdf(path, "paper.pdf", workers=1))
+            sequential_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            parallel = list(DocumentParser._iter_pdf(path, "paper.pdf", workers=args.workers, min_pages=0))
+            parallel_s = time.perf_counter() - start
+
+            same = signature(sequential) == signature(parallel)
+            print(f"{pages:5d} pages, {len(sequential):5d} chunks: "
+                  f"sequential {pages / sequential_s:7.1f} pages/s ({sequential_s:6.2f} s), "
+                  f"{args.workers} workers {pages / parallel_s:7.1f} pages/s ({parallel_s:6.2f} s), "
+                  f"speedup {sequential_s / parallel_s:4.2f}x, identical output: {same}")
+            if not same:
+                sys.exit(1)
+
+if __name__ == "__main__":
+    main()
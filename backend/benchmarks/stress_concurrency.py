@@ -0,0 +1,155 @@
+"""
+Stress the vector store with concurrent uploads, deletions and queries
+
+Writers add batches of chunks (replacing some earlier IDs), a deleter removes
+chunks, and readers query the same shard throughout. Every result is checked
+against what was ever added, and the final ID/ordinal/tombstone bookkeeping is
+checked against the index; any exception or inconsistency fails the run.
+
+Usage (from the backend directory):
+    python -m benchmarks.stress_concurrency --backend keyword --seconds 10
+"""
+import argparse
+import logging
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+# Add the backend directory to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from document_processing.vectordb import create_vector_database
+
+def id_token(doc_id: str) -> str:
+    return doc_id.replace('-', '_')
+
+def make_batch(writer: int, batch: int, size: int, vocab: list, rng: random.Random) -> list:
+    """Chunks whose content starts with their own ID as one token, so results can be verified"""
+    chunks = []
+    for i in range(size):
+        # Every fifth chunk re-uses an ID from the previous batch, exercising replacement
+        doc_id = f"w{writer}-b{batch - 1 if batch and i % 5 == 0 else batch}-{i}"
+        words = rng.choices(vocab, k=60)
+        chunks.append({"id": doc_id, "content": f"{id_token(doc_id)} " + " ".join(words), "metadata": {"source": f"writer{writer}.pdf"}})
+    return chunks
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", default="keyword", choices=["keyword", "dense", "hybrid"])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--positional", action="store_true")
+    parser.add_argument("--ann", action="store_true", help="Use the IVF index with the dense backend")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    logging.getLogger("document_processing").setLevel(logging.WARNING)
+    options = {"positional": args.positional}
+    if args.backend != "keyword":
+        options["ann_index"] = "ivf" if args.ann else "none"
+    db = create_vector_database(args.backend, compaction_threshold=0.1, **options)
+
+    vocab = [f"word{i}" for i in range(5000)]
+    added = set()  # Every ID ever added
+    added_lock = threading.Lock()
+    stop = threading.Event()
+    errors = []
+    latencies = []
+    counts = {"batches": 0, "deletes": 0, "results": 0}
+
+    def writer(number: int, batch: int):
+        rng = random.Random(args.seed + number)
+        while not stop.is_set():
+            chunks = make_batch(number, batch, args.batch_size, vocab, rng)
+            with added_lock:
+                added.update(chunk["id"] for chunk in chunks)
+            db.add_documents(chunks)
+            counts["batches"] += 1
+            batch += 1
+
+    def deleter():
+        rng = random.Random(args.seed - 1)
+        while not stop.is_set():
+            with added_lock:
+                sample = rng.sample(list(added), min(50, len(added))) if added else []
+            counts["deletes"] += db.delete_documents(sample)
+            time.sleep(0.01)
+
+    def reader(number: int):
+        rng = random.Random(args.seed + 1000 + number)
+        while not stop.is_set():
+            query = " ".join(rng.choices(vocab, k=4))
+            if rng.random() < 0.3:
+                query = f'"w{rng.randrange(args.writers)} b{rng.randrange(5)}" ' + query
+            start = time.perf_counter()
+            results = db.search(query, top_k=5)
+            latencies.append((time.perf_counter() - start) * 1000)
+            counts["results"] += len(results)
+            with added_lock:
+                for result in results:
+                    if result["id"] not in added or not result["content"].startswith(id_token(result["id"])):
+                        raise AssertionError(f"Inconsistent result {result['id']} for {query!r}")
+                    if not 0.0 <= result["score"] <= 1.0 + 1e-9:
+                        raise AssertionError(f"Score out of range: {result['score']}")
+
+    def guarded(target, *target_args):
+        try:
+            target(*target_args)
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+
+    # Seed the shard so readers have something to search from the start
+    for number in range(args.writers):
+        chunks = make_batch(number, 0, args.batch_size, vocab, random.Random(args.seed - 2 - number))
+        added.update(chunk["id"] for chunk in chunks)
+        db.add_documents(chunks)
+
+    threads = [threading.Thread(target=guarded, args=(writer, i, 1)) for i in range(args.writers)]
+    threads += [threading.Thread(target=guarded, args=(reader, i)) for i in range(args.readers)]
+    threads.append(threading.Thread(target=guarded, args=(deleter,)))
+    for thread in threads:
+        thread.start()
+    stop.wait(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    # Live chunks map to their own ordinal and stored chunk; everything else is tombstoned
+    live = list(db.ordinals)
+    for doc_id in live:
+        if db.document_ids[db.ordinals[doc_id]] != doc_id or db.documents[doc_id]["id"] != doc_id:
+            errors.append(AssertionError(f"Inconsistent bookkeeping for {doc_id}"))
+    if len(db.index) != len(db.document_ids) or db.index.deleted_count != len(db.document_ids) - len(live):
+        errors.append(AssertionError(
+            f"Index has {len(db.index)} documents and {db.index.deleted_count} tombstones, "
+            f"expected {len(db.document_ids)} and {len(db.document_ids) - len(live)}"
+        ))
+
+    # The lexical backends must find every live chunk by its ID token (hashed vectors may collide)
+    missing = []
+    if args.backend != "dense":
+        missing = [doc_id for doc_id in random.Random(args.seed).sample(live, min(200, len(live)))
+                   if doc_id not in {result["id"] for result in db.search(id_token(doc_id), top_k=50)}]
+
+    print(f"backend={args.backend} writers={args.writers} readers={args.readers} seconds={args.seconds}")
+    print(f"batches added: {counts['batches']}, chunks deleted: {counts['deletes']}, live chunks: {len(live)}")
+    if latencies:
+        latencies.sort()
+        print(f"queries: {len(latencies)} ({len(latencies) / args.seconds:.0f}/s, {counts['results'] / len(latencies):.1f} results each), "
+              f"p50 {statistics.median(latencies):.2f} ms, p99 {latencies[int(len(latencies) * 0.99)]:.2f} ms")
+    if errors or missing:
+        for error in errors:
+            print(f"ERROR: {error!r}")
+        if missing:
+            print(f"ERROR: {len(missing)} live chunks not found, e.g. {missing[:3]}")
+        sys.exit(1)
+    print("OK")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import math
+import logging
+import numpy as np
+from array import array
+from typing import List, Optional, Tuple, Sequence
+from .dense import VectorStore, top_k_scores
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class IVFIndex:
+    """
+    Inverted-file approximate nearest-neighbour index over the vectors of a VectorStore
+
+    Vectors are grouped by their nearest k-means centroid. A query only scores the
+    vectors in the nprobe lists whose centroids are closest to it, so latency grows
+    with nprobe * (size / nlist) instead of size. Small stores are searched exactly.
+    """
+
+    def __init__(
+        self,
+        store: VectorStore,
+        nlist: Optional[int] = None,
+        nprobe: int = 8,
+        min_train_size: int = 2048,
+        retrain_factor: float = 4.0,
+        iterations: int = 10,
+        max_train_sample: int = 50000,
+        seed: int = 0
+    ):
+        """
+        Initialize the IVF index
+
+        Args:
+            store: Vector store holding the (unit-normalized) vectors
+            nlist: Number of k-means lists (if None, about sqrt(size) at training time)
+            nprobe: Number of lists scanned per query (higher = better recall, slower)
+            min_train_size: Below this many vectors, search exactly and skip training
+            retrain_factor: Retrain once the store has grown by this factor since the last training
+            iterations: k-means iterations per training
+            max_train_sample: Maximum number of vectors sampled for k-means
+            seed: Random seed for centroid initialization and sampling
+        """
+        self.store = store
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.retrain_factor = retrain_factor
+        self.iterations = iterations
+        self.max_train_sample = max_train_sample
+        self.seed = seed
+        self.centroids = None  # (nlist, dim) float32, None until trained
+        self.lists = []  # centroid -> array of ordinals
+        self.trained_size = 0
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    @property
+    def needs_training(self) -> bool:
+        """Whether the store is big enough to train, or has grown enough since the last training"""
+        size = len(self.store)
+        if size < self.min_train_size:
+            return False
+        return not self.is_trained or size >= self.trained_size * self.retrain_factor
+
+    def add(self, ordinals: range):
+        """
+        Assign newly stored vectors to the current lists
+
+        Training is left to the caller (see needs_training), so it can run outside any lock
+        readers wait on; until then, an untrained index keeps searching exactly.
+
+        Args:
+            ordinals: Ordinals of the vectors just added to the store
+        """
+        if self.is_trained:
+            self.assign(ordinals.start, ordinals.stop, self.centroids, self.lists)
+
+    def train(self):
+        """Run spherical k-means on a sample of the store and rebuild every list"""
+        size = len(self.store)
+        self.install(*self.fit(size), size)
+
+    def fit(self, size: int) -> Tuple[np.ndarray, List[array]]:
+        """
+        Run spherical k-means on a sample of the first `size` vectors and list them
+
+        Only reads vectors already in the store, so it can run while searches use the
+        current centroids and lists; install() swaps the result in.
+
+        Args:
+            size: Number of vectors to train on and assign (the store size at snapshot time)
+
+        Returns:
+            Centroids and the lists of ordinals 0..size-1
+        """
+        vectors = self.store.vectors[:size]
+        nlist = self.nlist or int(math.sqrt(size))
+        nlist = max(1, min(nlist, size))
+        rng = np.random.default_rng(self.seed)
+
+        sample = vectors
+        if size > self.max_train_sample:
+            sample = vectors[rng.choice(size, self.max_train_sample, replace=False)]
+
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(self.iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+
+            # Sum members per list with one reduceat over the sample sorted by list
+            order = np.argsort(assignment, kind='stable')
+            counts = np.bincount(assignment, minlength=nlist)
+            filled = counts > 0
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[filled]
+
+            # Empty lists keep their previous centroid
+            centroids[filled] = np.add.reduceat(sample[order], starts, axis=0)
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            centroids /= np.maximum(norms, 1e-12)
+
+        lists = [array('I') for _ in range(nlist)]
+        self.assign(0, size, centroids, lists)
+
+        logger.info(f"Trained IVF index with {nlist} lists on {len(sample)} of {size} vectors")
+        return centroids, lists
+
+    def install(self, centroids: np.ndarray, lists: List[array], trained_size: int):
+        """
+        Replace the centroids and lists with ones from fit()
+
+        The caller must keep writers and searches out, and first assign() any vectors
+        added to the store since the fit snapshot.
+
+        Args:
+            centroids: Centroids returned by fit()
+            lists: Lists returned by fit()
+            trained_size: The size passed to fit()
+        """
+        self.centroids, self.lists, self.trained_size = centroids, lists, trained_size
+
+    def assign(self, start: int, stop: int, centroids: np.ndarray, lists: List[array], batch_size: int = 8192):
+        """Append ordinals start..stop-1 to the given list of their nearest centroid"""
+        vectors = self.store.vectors
+        for batch_start in range(start, stop, batch_size):
+            batch_stop = min(batch_start + batch_size, stop)
+            assignment = np.argmax(vectors[batch_start:batch_stop] @ centroids.T, axis=1)
+
+            # Group the batch by list so each list is extended once
+            order = np.argsort(assignment, kind='stable')
+            ordinals = (order + batch_start).astype(np.uint32)
+            boundaries = np.searchsorted(assignment[order], np.arange(len(lists) + 1))
+            for list_id in np.flatnonzero(np.diff(boundaries)):
+                lists[list_id].frombytes(ordinals[boundaries[list_id]:boundaries[list_id + 1]].tobytes())
+
+    def search(
+        self,
+        query: np.ndarray,
+        top_k: int = 5,
+        nprobe: Optional[int] = None,
+        allowed: Optional[Sequence[int]] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Approximate inner-product search
+
+        Args:
+            query: Query vector
+            top_k: Number of results to return
+            nprobe: Lists to scan (if None, uses the index default)
+            allowed: If given, only these ordinals can be returned
+
+        Returns:
+            List of (ordinal, score) pairs sorted by descending score
+        """
+        if not self.is_trained:
+            return self.store.search(query, top_k, allowed)
+
+        if top_k <= 0:
+            return []
+
+        nprobe = min(nprobe or self.nprobe, len(self.lists))
+        centroid_scores = self.centroids @ query
+        probes = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+
+        candidates = np.concatenate([np.frombuffer(self.lists[list_id], dtype=np.uint32) for list_id in probes])
+        if allowed is not None:
+            # Scoring a small filtered set exactly is cheaper than scanning the probed lists
+            if len(allowed) <= len(candidates):
+                return self.store.search(query, top_k, allowed)
+            candidates = candidates[np.isin(candidates, np.array(allowed, dtype=np.uint32))]
+        if self.store.deleted_count:
+            candidates = candidates[~self.store.deleted[candidates]]
+        if not len(candidates):
+            return []
+
+        scores = self.store.vectors[candidates] @ query
+        return top_k_scores(scores, top_k, candidates)
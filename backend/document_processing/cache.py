@@ -0,0 +1,151 @@
+import sys
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Hashable
+
+class QueryCache:
+    """
+    LRU cache of search results with a memory budget and per-session invalidation
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        """
+        Initialize the query cache
+
+        Args:
+            max_bytes: Approximate memory budget for cached results
+        """
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # (session_id, key) -> (results, size)
+        self._session_keys = {}  # session_id -> set of keys cached for it
+        self._generations = {}  # session_id -> generation, from _clock when the corpus last changed
+        self._clock = 0  # Bumped on every invalidation and drop, so a generation is never reused
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _estimate_size(results: List[Dict[str, Any]]) -> int:
+        """Rough size in bytes of a result list (contents dominate)"""
+        size = sys.getsizeof(results)
+        for result in results:
+            size += sys.getsizeof(result) + sys.getsizeof(result.get("content", ""))
+            size += sys.getsizeof(result.get("metadata", {})) + 64 * len(result.get("metadata", {}))
+        return size
+
+    def generation(self, session_id: str) -> int:
+        """
+        Current corpus generation of a session
+
+        Read this before searching and pass it to put(), so results computed while the
+        corpus changed are not cached.
+        """
+        with self._lock:
+            return self._generations.get(session_id, self._clock)
+
+    def get(self, session_id: str, key: Hashable) -> Optional[List[Dict[str, Any]]]:
+        """
+        Look up cached results
+
+        Args:
+            session_id: Session ID
+            key: Normalized query key
+
+        Returns:
+            Copies of the cached results, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get((session_id, key))
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((session_id, key))
+            self.hits += 1
+        return [dict(result) for result in entry[0]]
+
+    def put(self, session_id: str, key: Hashable, results: List[Dict[str, Any]], generation: int):
+        """
+        Cache results, evicting least recently used entries to stay within budget
+
+        Args:
+            session_id: Session ID
+            key: Normalized query key
+            results: Search results
+            generation: Session generation read before the search ran
+        """
+        size = self._estimate_size(results)
+        if size > self.max_bytes:
+            return
+
+        results = [dict(result) for result in results]
+        with self._lock:
+            if self._generations.get(session_id, self._clock) != generation:
+                return
+
+            old = self._entries.pop((session_id, key), None)
+            if old is not None:
+                self.size -= old[1]
+            self._entries[(session_id, key)] = (results, size)
+            self._session_keys.setdefault(session_id, set()).add(key)
+            self.size += size
+
+            while self.size > self.max_bytes:
+                (evicted_session, evicted_key), (_, evicted_size) = self._entries.popitem(last=False)
+                keys = self._session_keys[evicted_session]
+                keys.discard(evicted_key)
+                if not keys:
+                    del self._session_keys[evicted_session]
+                self.size -= evicted_size
+                self.evictions += 1
+
+    def invalidate(self, session_id: str):
+        """
+        Drop every cached result of a session after its corpus changed
+
+        Args:
+            session_id: Session ID
+        """
+        with self._lock:
+            self._clock += 1
+            self._generations[session_id] = self._clock
+            self._remove_entries(session_id)
+            self.invalidations += 1
+
+    def drop(self, session_id: str):
+        """
+        Forget a session that no longer exists: its cached results and its generation
+
+        Searches that started before the drop still cannot cache their results, since
+        the generation they read is not handed out again.
+
+        Args:
+            session_id: Session ID
+        """
+        with self._lock:
+            self._clock += 1
+            self._generations.pop(session_id, None)
+            self._remove_entries(session_id)
+
+    def _remove_entries(self, session_id: str):
+        """Remove every cached result of a session (caller holds the lock)"""
+        for key in self._session_keys.pop(session_id, ()):
+            _, size = self._entries.pop((session_id, key))
+            self.size -= size
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and memory use for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,164 @@
+import os
+import re
+from typing import List, Tuple, Iterable, Iterator, Optional
+
+# Split points, coarsest first: a piece over budget is split at sentence ends, then at
+# line breaks, then between words, and only then mid-word
+BOUNDARIES = (
+    re.compile(r'(?<=[.!?])\s+'),
+    re.compile(r'[ \t]*\n\s*'),
+    re.compile(r'\s+'),
+)
+
+class Chunker:
+    """
+    Split text into chunks of bounded size with sliding overlap
+
+    Text arrives as a stream of paragraphs. Paragraphs are packed whole into a chunk while
+    they fit; a paragraph over the budget is split at sentence boundaries (then line breaks,
+    then words). Each chunk repeats the trailing sentences or paragraphs of the previous one,
+    up to the overlap budget. Chunks keep the original text between the pieces they join, so
+    a paragraph or page under the budget comes out unchanged.
+    """
+
+    def __init__(self, size: Optional[int] = None, overlap: Optional[int] = None, unit: Optional[str] = None):
+        """
+        Initialize the chunker
+
+        Args:
+            size: Chunk budget (if None, uses CHUNK_SIZE, default 1000)
+            overlap: Budget for text repeated from the previous chunk (if None, uses CHUNK_OVERLAP, default 100)
+            unit: "chars" or "tokens" (whitespace-separated words, a rough proxy for LLM
+                tokens); if None, uses CHUNK_UNIT, default "chars"
+
+        Raises:
+            ValueError: For an unknown unit or an overlap not smaller than the size
+        """
+        self.size = size or int(os.environ.get("CHUNK_SIZE", 1000))
+        self.overlap = overlap if overlap is not None else int(os.environ.get("CHUNK_OVERLAP", 100))
+        self.unit = (unit or os.environ.get("CHUNK_UNIT", "chars")).lower()
+        if self.unit not in ("chars", "tokens"):
+            raise ValueError(f"Unsupported chunk unit: {self.unit}")
+        if not 0 <= self.overlap < self.size:
+            raise ValueError(f"Chunk overlap must be in [0, {self.size}), got {self.overlap}")
+
+    @property
+    def key(self) -> str:
+        """Short description of the settings, for caches of chunked output"""
+        return f"{self.size}{self.unit[0]}{self.overlap}"
+
+    def measure(self, text: str) -> int:
+        """Size of a text in the chunker's unit"""
+        if self.unit == "chars":
+            return len(text)
+        return len(text.split())
+
+    def _separator_size(self, separator: str) -> int:
+        return len(separator) if self.unit == "chars" else 0
+
+    def _pieces(self, text: str, level: int = 0) -> Iterator[Tuple[str, str, int]]:
+        """
+        Split a text into pieces within the budget
+
+        Returns:
+            Iterator over (separator before the piece, piece, piece size)
+        """
+        size = self.measure(text)
+        if size <= self.size:
+            yield "", text, size
+            return
+
+        if level == len(BOUNDARIES):
+            # A single word over the budget (only possible when counting characters)
+            for start in range(0, len(text), self.size):
+                yield "", text[start:start + self.size], min(self.size, len(text) - start)
+            return
+
+        separator = ""
+        position = 0
+        for match in BOUNDARIES[level].finditer(text):
+            if match.start() > position:
+                for i, (inner, piece, piece_size) in enumerate(self._pieces(text[position:match.start()], level + 1)):
+                    yield (separator if i == 0 else inner), piece, piece_size
+            separator = match.group()
+            position = match.end()
+        if position < len(text):
+            for i, (inner, piece, piece_size) in enumerate(self._pieces(text[position:], level + 1)):
+                yield (separator if i == 0 else inner), piece, piece_size
+
+    def chunks(self, paragraphs: Iterable[str], separator: str = "\n\n") -> Iterator[str]:
+        """
+        Pack a stream of paragraphs into chunks
+
+        Args:
+            paragraphs: Paragraphs in document order (blank ones are skipped)
+            separator: Text put between paragraphs joined into one chunk
+
+        Returns:
+            Iterator over chunk texts
+        """
+        buffer = []  # (separator, piece, size) of the chunk being built
+        buffer_size = 0
+        carried = 0  # Leading pieces of the buffer repeated from the previous chunk
+
+        for paragraph in paragraphs:
+            if not paragraph.strip():
+                continue
+            for i, (inner, piece, piece_size) in enumerate(self._pieces(paragraph)):
+                piece_separator = separator if i == 0 else inner
+                added = piece_size + (self._separator_size(piece_separator) if buffer else 0)
+
+                if buffer and buffer_size + added > self.size:
+                    if carried < len(buffer):
+                        yield self._join(buffer)
+                        buffer, buffer_size = self._overlap(buffer)
+                        carried = len(buffer)
+                    # Drop repeated pieces that leave no room for new text
+                    while buffer and buffer_size + piece_size + self._separator_size(piece_separator) > self.size:
+                        buffer.pop(0)
+                        carried -= 1
+                        buffer_size = self._buffer_size(buffer)
+                    added = piece_size + (self._separator_size(piece_separator) if buffer else 0)
+
+                buffer.append((piece_separator, piece, piece_size))
+                buffer_size += added
+
+        if carried < len(buffer):
+            yield self._join(buffer)
+
+    def split(self, text: str) -> Iterator[str]:
+        """
+        Chunk a single text, such as a PDF page
+
+        Args:
+            text: Text to split
+
+        Returns:
+            Iterator over chunk texts (the text itself if it fits the budget)
+        """
+        return self.chunks((text,))
+
+    @staticmethod
+    def _join(buffer: List[Tuple[str, str, int]]) -> str:
+        parts = [buffer[0][1]]
+        for separator, piece, _ in buffer[1:]:
+            parts.append(separator)
+            parts.append(piece)
+        return "".join(parts)
+
+    def _buffer_size(self, buffer: List[Tuple[str, str, int]]) -> int:
+        if not buffer:
+            return 0
+        return sum(size for _, _, size in buffer) + sum(self._separator_size(separator) for separator, _, _ in buffer[1:])
+
+    def _overlap(self, buffer: List[Tuple[str, str, int]]) -> Tuple[List[Tuple[str, str, int]], int]:
+        """Trailing pieces of a finished chunk that fit the overlap budget, and their size"""
+        tail = []
+        size = 0
+        for separator, piece, piece_size in reversed(buffer):
+            added = piece_size + (self._separator_size(tail[0][0]) if tail else 0)
+            if size + added > self.overlap:
+                break
+            tail.insert(0, (separator, piece, piece_size))
+            size += added
+        return tail, size
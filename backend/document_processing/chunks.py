@@ -0,0 +1,179 @@
+from array import array
+from collections.abc import MutableMapping
+from typing import Dict, Any, Optional, Iterator, Mapping
+
+# Metadata fields stored as columns; anything else (or an unexpected type) is kept per chunk
+STRING_COLUMNS = ("source", "chunk_type")
+INT_COLUMNS = ("page", "table_index")
+COLUMN_ORDER = ("source", "page", "chunk_type", "table_index")  # Field order of parser output
+MISSING = -1
+
+class _Columns:
+    """
+    One generation of chunk columns; replaced as a whole when dead rows are dropped
+    """
+
+    __slots__ = ("ids", "rows", "content", "content_offsets", "strings", "ints", "extra_metadata", "extra_fields")
+
+    def __init__(self):
+        self.ids = []  # row -> chunk ID (None once deleted)
+        self.rows = {}  # chunk ID -> row
+        self.content = bytearray()  # UTF-8 contents of all rows
+        self.content_offsets = array('Q', [0])  # row -> start of its content
+        self.strings = {name: array('i') for name in STRING_COLUMNS}  # row -> interned string code
+        self.ints = {name: array('i') for name in INT_COLUMNS}  # row -> value
+        self.extra_metadata = {}  # row -> metadata fields not held in columns
+        self.extra_fields = {}  # row -> top-level fields other than id, content and metadata
+
+class ChunkStore(MutableMapping):
+    """
+    Columnar chunk ID -> chunk mapping
+
+    Chunks are stored as rows: contents in one UTF-8 buffer addressed by offsets and
+    common metadata fields in typed arrays, with repeated strings (source file names,
+    chunk types) interned once. A chunk dict is only built when it is looked up, so
+    every lookup returns a fresh dict the caller may modify.
+    """
+
+    def __init__(self, documents: Optional[Mapping[str, Dict[str, Any]]] = None):
+        """
+        Initialize the chunk store
+
+        Args:
+            documents: Chunks to start with (chunk ID -> chunk)
+        """
+        self._columns = _Columns()
+        self._strings = []  # code -> string
+        self._string_codes = {}  # string -> code
+        self.dead = 0
+        if documents:
+            self.update(documents)
+
+    def _intern(self, value: str) -> int:
+        code = self._string_codes.get(value)
+        if code is None:
+            code = self._string_codes[value] = len(self._strings)
+            self._strings.append(value)
+        return code
+
+    def _append(self, columns: _Columns, doc_id: str, doc: Dict[str, Any]):
+        """Append a chunk as a new row"""
+        row = len(columns.ids)
+        columns.content += doc["content"].encode('utf-8')
+        columns.content_offsets.append(len(columns.content))
+
+        metadata = dict(doc.get("metadata") or {})
+        for name in STRING_COLUMNS:
+            value = metadata.get(name)
+            if isinstance(value, str):
+                del metadata[name]
+                columns.strings[name].append(self._intern(value))
+            else:
+                columns.strings[name].append(MISSING)
+        for name in INT_COLUMNS:
+            value = metadata.get(name)
+            if type(value) is int and 0 <= value < 2 ** 31:
+                del metadata[name]
+                columns.ints[name].append(value)
+            else:
+                columns.ints[name].append(MISSING)
+        if metadata:
+            columns.extra_metadata[row] = metadata
+
+        extra = {key: value for key, value in doc.items() if key not in ("id", "content", "metadata")}
+        if extra:
+            columns.extra_fields[row] = extra
+
+        columns.ids.append(doc_id)
+        columns.rows[doc_id] = row
+
+    def _build(self, columns: _Columns, doc_id: str, row: int) -> Dict[str, Any]:
+        """Materialize the chunk dict of a row"""
+        metadata = {}
+        for name in COLUMN_ORDER:
+            if name in columns.strings:
+                code = columns.strings[name][row]
+                if code != MISSING:
+                    metadata[name] = self._strings[code]
+            else:
+                value = columns.ints[name][row]
+                if value != MISSING:
+                    metadata[name] = value
+        if row in columns.extra_metadata:
+            metadata.update(columns.extra_metadata[row])
+
+        content = columns.content[columns.content_offsets[row]:columns.content_offsets[row + 1]]
+        doc = {"id": doc_id, "content": content.decode('utf-8'), "metadata": metadata}
+        if row in columns.extra_fields:
+            doc.update(columns.extra_fields[row])
+        return doc
+
+    def __getitem__(self, doc_id: str) -> Dict[str, Any]:
+        # Read the columns once, so a concurrent rebuild cannot mix generations
+        columns = self._columns
+        return self._build(columns, doc_id, columns.rows[doc_id])
+
+    def __setitem__(self, doc_id: str, doc: Dict[str, Any]):
+        self.discard(doc_id)
+        self._append(self._columns, doc_id, doc)
+
+    def __delitem__(self, doc_id: str):
+        if not self.discard(doc_id):
+            raise KeyError(doc_id)
+
+    def discard(self, doc_id: str) -> bool:
+        """
+        Remove a chunk if present, without materializing it
+
+        Args:
+            doc_id: Chunk ID
+
+        Returns:
+            True if the chunk was removed
+        """
+        columns = self._columns
+        row = columns.rows.pop(doc_id, None)
+        if row is None:
+            return False
+        columns.ids[row] = None
+        columns.extra_metadata.pop(row, None)
+        columns.extra_fields.pop(row, None)
+        self.dead += 1
+
+        # Reclaim space once dead rows outnumber live ones
+        if self.dead > 1024 and self.dead > len(columns.rows):
+            self._rebuild()
+        return True
+
+    def _rebuild(self):
+        """Copy the live rows into fresh columns and swap them in"""
+        old = self._columns
+        columns = _Columns()
+        for row, doc_id in enumerate(old.ids):
+            if doc_id is None:
+                continue
+            new_row = len(columns.ids)
+            columns.content += old.content[old.content_offsets[row]:old.content_offsets[row + 1]]
+            columns.content_offsets.append(len(columns.content))
+            for name in STRING_COLUMNS:
+                columns.strings[name].append(old.strings[name][row])
+            for name in INT_COLUMNS:
+                columns.ints[name].append(old.ints[name][row])
+            if row in old.extra_metadata:
+                columns.extra_metadata[new_row] = old.extra_metadata[row]
+            if row in old.extra_fields:
+                columns.extra_fields[new_row] = old.extra_fields[row]
+            columns.ids.append(doc_id)
+            columns.rows[doc_id] = new_row
+
+        self._columns = columns
+        self.dead = 0
+
+    def __contains__(self, doc_id) -> bool:
+        return doc_id in self._columns.rows
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._columns.rows))
+
+    def __len__(self) -> int:
+        return len(self._columns.rows)
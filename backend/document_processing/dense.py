@@ -0,0 +1,344 @@
+import os
+import math
+import zlib
+import numpy as np
+from array import array
+from collections import Counter
+from typing import List, Optional, Tuple, Sequence
+
+class HashingEmbedder:
+    """
+    Local fixed-size embeddings using the signed hashing trick (no model download, no network)
+    """
+
+    def __init__(self, dim: int = 1024):
+        """
+        Initialize the embedder
+
+        Args:
+            dim: Number of hash buckets (embedding dimension)
+        """
+        self.dim = dim
+
+    def _bucket(self, token: str) -> Tuple[int, float]:
+        """Map a token to a (bucket, sign) pair with a hash that is stable across processes"""
+        h = zlib.crc32(token.encode('utf-8'))
+        return h % self.dim, (1.0 if h & 0x80000000 else -1.0)
+
+    def embed(self, tokens: List[str]) -> np.ndarray:
+        """
+        Embed a tokenized text as sublinear term frequencies (not normalized)
+
+        Args:
+            tokens: Text tokens
+
+        Returns:
+            float32 vector of length dim
+        """
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token, tf in Counter(tokens).items():
+            bucket, sign = self._bucket(token)
+            vector[bucket] += sign * (1.0 + math.log(tf))
+        return vector
+
+    def embed_batch(self, token_lists: List[List[str]], normalize: bool = False) -> np.ndarray:
+        """
+        Embed several tokenized texts
+
+        Args:
+            token_lists: One token list per text
+            normalize: Scale each row to unit length, so inner products are cosine similarities
+
+        Returns:
+            float32 matrix of shape (len(token_lists), dim)
+        """
+        matrix = np.zeros((len(token_lists), self.dim), dtype=np.float32)
+        for row, tokens in enumerate(token_lists):
+            matrix[row] = self.embed(tokens)
+        if normalize:
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix /= np.maximum(norms, 1e-12)
+        return matrix
+
+class VectorStore:
+    """
+    Contiguous float32 matrix of vectors with amortized growth and exact top-k search
+    """
+
+    def __init__(self, dim: int, initial_capacity: int = 1024):
+        """
+        Initialize the vector store
+
+        Args:
+            dim: Vector dimension
+            initial_capacity: Number of rows allocated up front
+        """
+        self.dim = dim
+        self.size = 0
+        self._matrix = np.zeros((initial_capacity, dim), dtype=np.float32)
+        self._deleted = np.zeros(initial_capacity, dtype=bool)  # ordinal -> tombstoned
+        self.deleted_count = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getstate__(self):
+        # Only persist the filled rows, not the spare capacity
+        state = self.__dict__.copy()
+        state["_matrix"] = self.vectors.copy()
+        state["_deleted"] = self.deleted.copy()
+        return state
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """View of the stored vectors, one row per ordinal"""
+        return self._matrix[:self.size]
+
+    @property
+    def deleted(self) -> np.ndarray:
+        """Tombstone flags, one per ordinal"""
+        return self._deleted[:self.size]
+
+    def delete(self, ordinal: int):
+        """
+        Tombstone a vector so searches skip it
+
+        Args:
+            ordinal: Vector ordinal
+        """
+        if not self._deleted[ordinal]:
+            self._deleted[ordinal] = True
+            self.deleted_count += 1
+
+    def add(self, vectors: np.ndarray) -> range:
+        """
+        Append vectors, doubling the allocation when it runs out
+
+        Args:
+            vectors: Matrix of shape (n, dim)
+
+        Returns:
+            Ordinals assigned to the new rows
+        """
+        count = len(vectors)
+        needed = self.size + count
+        if needed > len(self._matrix):
+            capacity = max(needed, 2 * len(self._matrix), 1)
+            matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+            matrix[:self.size] = self.vectors
+            deleted = np.zeros(capacity, dtype=bool)
+            deleted[:self.size] = self.deleted
+            self._matrix, self._deleted = matrix, deleted
+
+        self._matrix[self.size:needed] = vectors
+        ordinals = range(self.size, needed)
+        self.size = needed
+        return ordinals
+
+    def search(self, query: np.ndarray, top_k: int = 5, allowed: Optional[Sequence[int]] = None) -> List[Tuple[int, float]]:
+        """
+        Exact inner-product search
+
+        Args:
+            query: Query vector of length dim
+            top_k: Number of results to return
+            allowed: If given, only these ordinals are scored
+
+        Returns:
+            List of (ordinal, score) pairs sorted by descending score
+        """
+        if not self.size or top_k <= 0:
+            return []
+
+        if allowed is not None:
+            rows = np.array(allowed, dtype=np.int64)
+            if self.deleted_count:
+                rows = rows[~self.deleted[rows]]
+            if not len(rows):
+                return []
+            return top_k_scores(self.vectors[rows] @ query, top_k, rows)
+
+        # One matrix-vector product scores every stored vector
+        scores = self.vectors @ query
+        if self.deleted_count:
+            scores[self.deleted] = -np.inf
+        return top_k_scores(scores, top_k)
+
+def top_k_scores(scores: np.ndarray, top_k: int, ordinals: np.ndarray = None) -> List[Tuple[int, float]]:
+    """
+    Select the best entries of a score array without sorting all of it
+
+    Args:
+        scores: Score per candidate
+        top_k: Number of results to return
+        ordinals: Ordinal per candidate (defaults to the position in scores)
+
+    Returns:
+        List of (ordinal, score) pairs sorted by descending score
+    """
+    if top_k < len(scores):
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+    else:
+        best = np.arange(len(scores))
+    best = best[np.argsort(-scores[best], kind='stable')]
+
+    if ordinals is not None:
+        return [(int(ordinals[i]), float(scores[i])) for i in best]
+    return [(int(i), float(scores[i])) for i in best]
+
+class DenseIndex:
+    """
+    Hashed TF-IDF index: term frequency vectors in a VectorStore, IDF applied on the query side
+    """
+
+    def __init__(self, dim: int = 1024, ann: bool = False, nlist: Optional[int] = None, nprobe: int = 8):
+        """
+        Initialize the dense index
+
+        Args:
+            dim: Embedding dimension
+            ann: Search through an IVF approximate nearest-neighbour index instead of a full scan
+            nlist: Number of IVF lists (if None, chosen from the corpus size)
+            nprobe: Number of IVF lists scanned per query
+        """
+        self.embedder = HashingEmbedder(dim)
+        self.store = VectorStore(dim)
+        self.doc_freqs = np.zeros(dim, dtype=np.int64)  # bucket -> number of documents using it
+        self.ann = None
+        if ann:
+            from .ann import IVFIndex
+            self.ann = IVFIndex(self.store, nlist=nlist, nprobe=nprobe)
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    @property
+    def deleted_count(self) -> int:
+        return self.store.deleted_count
+
+    def delete(self, ordinal: int):
+        """
+        Tombstone a document so searches skip it
+
+        Args:
+            ordinal: Document ordinal
+        """
+        self.store.delete(ordinal)
+
+    def add_batch(self, token_lists: List[List[str]]) -> range:
+        """
+        Embed and store a batch of tokenized documents
+
+        Args:
+            token_lists: One token list per document
+
+        Returns:
+            Ordinals assigned to the documents
+        """
+        return self.add_vectors(self.embedder.embed_batch(token_lists, normalize=True))
+
+    def add_vectors(self, vectors: np.ndarray) -> range:
+        """
+        Store document vectors computed ahead of time
+
+        Args:
+            vectors: Unit-length matrix from HashingEmbedder.embed_batch, one row per document
+
+        Returns:
+            Ordinals assigned to the documents
+        """
+        self.doc_freqs += (vectors != 0).sum(axis=0)
+        ordinals = self.store.add(vectors)
+        if self.ann is not None:
+            self.ann.add(ordinals)
+        return ordinals
+
+    def save(self, directory: str):
+        """
+        Write the vectors as .npy (memory-mappable) and the remaining state as .npz
+
+        Args:
+            directory: Directory to write to (files are replaced atomically)
+        """
+        state = {"deleted": self.store.deleted, "doc_freqs": self.doc_freqs}
+        if self.ann is not None and self.ann.is_trained:
+            state["centroids"] = self.ann.centroids
+            state["list_offsets"] = np.cumsum([0] + [len(ordinals) for ordinals in self.ann.lists])
+            state["list_ordinals"] = np.concatenate([np.frombuffer(ordinals, dtype=np.uint32) for ordinals in self.ann.lists])
+            state["trained_size"] = np.array(self.ann.trained_size)
+
+        # Write beside the old files and rename, so a store still mapping them stays valid
+        for name, writer in (("vectors.npy", lambda f: np.save(f, self.store.vectors)), ("dense.npz", lambda f: np.savez(f, **state))):
+            path = os.path.join(directory, name)
+            with open(path + ".tmp", 'wb') as f:
+                writer(f)
+            os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, directory: str, ann: bool = False, nlist: Optional[int] = None, nprobe: int = 8) -> 'DenseIndex':
+        """
+        Open a saved dense index, memory-mapping its vectors
+
+        Args:
+            directory: Directory written by save
+            ann: Search through an IVF index (restored if one was saved, trained later otherwise)
+            nlist: Number of IVF lists
+            nprobe: Number of IVF lists scanned per query
+
+        Returns:
+            Loaded DenseIndex; the first insert copies the vectors into memory
+        """
+        try:
+            vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode='r')
+        except ValueError:
+            # Empty arrays cannot be mapped
+            vectors = np.load(os.path.join(directory, "vectors.npy"))
+
+        index = cls(vectors.shape[1], ann=ann, nlist=nlist, nprobe=nprobe)
+        index.store.size = len(vectors)
+        index.store._matrix = vectors
+
+        with np.load(os.path.join(directory, "dense.npz")) as state:
+            index.store._deleted = state["deleted"].copy()
+            index.store.deleted_count = int(index.store._deleted.sum())
+            index.doc_freqs = state["doc_freqs"].copy()
+            if index.ann is not None and "centroids" in state:
+                offsets, ordinals = state["list_offsets"], state["list_ordinals"]
+                index.ann.centroids = state["centroids"].copy()
+                index.ann.lists = [array('I', ordinals[offsets[i]:offsets[i + 1]].tobytes()) for i in range(len(offsets) - 1)]
+                index.ann.trained_size = int(state["trained_size"])
+
+        return index
+
+    def embed_query(self, tokens: List[str]) -> np.ndarray:
+        """
+        Embed a query with IDF weighting
+
+        Args:
+            tokens: Query tokens
+
+        Returns:
+            Unit-length float32 query vector (all zeros if nothing matches)
+        """
+        idf = np.log((1.0 + len(self.store)) / (1.0 + self.doc_freqs)) + 1.0
+        query = self.embedder.embed(tokens) * idf.astype(np.float32)
+        norm = np.linalg.norm(query)
+        return query / norm if norm > 0 else query
+
+    def search(self, tokens: List[str], top_k: int = 5, allowed: Optional[Sequence[int]] = None) -> List[Tuple[int, float]]:
+        """
+        Find the documents closest to a query
+
+        Args:
+            tokens: Query tokens
+            top_k: Number of results to return
+            allowed: If given, only these ordinals can be returned
+
+        Returns:
+            List of (ordinal, cosine score) pairs with positive scores, best first (tombstones excluded)
+        """
+        query = self.embed_query(tokens)
+        if not query.any():
+            return []
+        searcher = self.ann if self.ann is not None else self.store
+        return [(ordinal, score) for ordinal, score in searcher.search(query, top_k, allowed=allowed) if score > 0]
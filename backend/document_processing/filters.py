@@ -0,0 +1,136 @@
+from array import array
+from heapq import merge
+from bisect import bisect_left, bisect_right
+from typing import List, Dict, Any, Optional, Iterable
+
+# Search filter name -> metadata field it restricts
+FILTERS = {
+    "source": "source",
+    "chunk_type": "chunk_type",
+    "table_index": "table_index",
+    "page_from": "page",
+    "page_to": "page",
+}
+
+class MetadataIndex:
+    """
+    Sorted ordinal lists per metadata value, so searches can be restricted to
+    matching documents before any scoring happens
+    """
+
+    FIELDS = ("source", "chunk_type", "page", "table_index")
+
+    def __init__(self):
+        self.values = {field: {} for field in self.FIELDS}  # field -> value -> array of ordinals, ascending
+        # Paged documents as sorted runs of (pages ascending, ordinals in the same order), one
+        # per batch until merged; runs hold consecutive ordinal ranges, oldest first
+        self.page_runs = []
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, metadata_list: Iterable[Optional[Dict[str, Any]]]):
+        """
+        Index the metadata of documents taking the next ordinals
+
+        Args:
+            metadata_list: Metadata dict per document, None for deleted placeholders
+        """
+        paged = []
+        for metadata in metadata_list:
+            if metadata:
+                for field in self.FIELDS:
+                    value = metadata.get(field)
+                    if value is None:
+                        continue
+                    ordinals = self.values[field].get(value)
+                    if ordinals is None:
+                        ordinals = self.values[field][value] = array('I')
+                    ordinals.append(self.size)
+                if isinstance(metadata.get("page"), int):
+                    paged.append((metadata["page"], self.size))
+            self.size += 1
+
+        if paged:
+            paged.sort()
+            runs = self.page_runs + [(array('q', (page for page, _ in paged)), array('I', (ordinal for _, ordinal in paged)))]
+            # Merge a run into the one before it unless that is over twice as large, so there
+            # are O(log n) runs and each document is re-merged O(log n) times
+            while len(runs) > 1 and len(runs[-2][0]) <= 2 * len(runs[-1][0]):
+                (pages, ordinals), (new_pages, new_ordinals) = runs[-2], runs[-1]
+                pairs = list(merge(zip(pages, ordinals), zip(new_pages, new_ordinals)))
+                runs[-2:] = [(array('q', (page for page, _ in pairs)), array('I', (ordinal for _, ordinal in pairs)))]
+            self.page_runs = runs  # Published in one step for concurrent readers
+
+    def _page_range(self, first: Optional[int], last: Optional[int]) -> array:
+        """Ordinals of documents whose page lies in [first, last]"""
+        result = array('I')
+        found = set()  # Pages matched
+        for pages, ordinals in self.page_runs:
+            start = bisect_left(pages, first) if first is not None else 0
+            stop = bisect_right(pages, last) if last is not None else len(pages)
+            if start < stop:
+                result.extend(ordinals[start:stop])
+                found.update((pages[start], pages[stop - 1]))
+        if len(found) <= 1:
+            return result  # One page is in ordinal order within each run, and the runs follow each other
+        return array('I', sorted(result))
+
+    def select(self, filters: Dict[str, Any]) -> array:
+        """
+        Find the documents matching every filter
+
+        Args:
+            filters: Any of source, chunk_type, table_index (exact match) and page_from,
+                page_to (inclusive page range)
+
+        Returns:
+            Matching ordinals, ascending (tombstoned documents included)
+
+        Raises:
+            ValueError: For an unknown filter name
+        """
+        unknown = set(filters) - set(FILTERS)
+        if unknown:
+            raise ValueError(f"Unsupported filters: {', '.join(sorted(unknown))}")
+
+        selections = []
+        for name in ("source", "chunk_type", "table_index"):
+            if filters.get(name) is not None:
+                selections.append(self.values[name].get(filters[name], array('I')))
+        if filters.get("page_from") is not None or filters.get("page_to") is not None:
+            selections.append(self._page_range(filters.get("page_from"), filters.get("page_to")))
+
+        if not selections:
+            return array('I', range(self.size))
+
+        # Intersect starting from the most selective list
+        selections.sort(key=len)
+        result = selections[0]
+        for ordinals in selections[1:]:
+            if not result:
+                break
+            result = array('I', intersect_sorted(result, ordinals))
+        return result
+
+def intersect_sorted(small: array, large: array) -> List[int]:
+    """
+    Intersect two ascending ordinal lists by binary searching the larger one
+
+    Args:
+        small: The shorter list
+        large: The longer list
+
+    Returns:
+        Ordinals present in both, ascending
+    """
+    result = []
+    cursor = 0
+    for ordinal in small:
+        cursor = bisect_left(large, ordinal, cursor)
+        if cursor == len(large):
+            break
+        if large[cursor] == ordinal:
+            result.append(ordinal)
+    return result
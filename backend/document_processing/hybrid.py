@@ -0,0 +1,83 @@
+from typing import List, Tuple, Optional
+from .index import InvertedIndex
+from .dense import DenseIndex
+
+class HybridIndex:
+    """
+    Lexical (BM25) and dense indexes kept over the same document ordinals
+    """
+
+    def __init__(self, lexical: InvertedIndex, dense: DenseIndex):
+        """
+        Initialize the hybrid index
+
+        Args:
+            lexical: BM25 inverted index
+            dense: Hashed TF-IDF vector index
+        """
+        self.lexical = lexical
+        self.dense = dense
+
+    def __len__(self) -> int:
+        return len(self.lexical)
+
+    @property
+    def deleted_count(self) -> int:
+        return self.lexical.deleted_count
+
+    @property
+    def positional(self) -> bool:
+        return self.lexical.positional
+
+    def term_positions(self, term: str, ordinal: int) -> Optional[List[int]]:
+        """Token positions of a term in a document, from the lexical index"""
+        return self.lexical.term_positions(term, ordinal)
+
+    def delete(self, ordinal: int):
+        """
+        Tombstone a document in both indexes
+
+        Args:
+            ordinal: Document ordinal
+        """
+        self.lexical.delete(ordinal)
+        self.dense.delete(ordinal)
+
+def reciprocal_rank_fusion(rankings: List[List[Tuple[int, float]]], k: int = 60) -> List[Tuple[int, float]]:
+    """
+    Merge rankings by summing 1 / (k + rank) for every list a document appears in
+
+    Args:
+        rankings: Ranked (ordinal, score) lists, best first
+        k: Damping constant; larger values flatten the contribution of top ranks
+
+    Returns:
+        Fused (ordinal, score) list, best first, with scores scaled into [0, 1]
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, (ordinal, _) in enumerate(ranking, start=1):
+            fused[ordinal] = fused.get(ordinal, 0.0) + 1.0 / (k + rank)
+
+    # A document ranked first in every list gets 1.0
+    best = len(rankings) / (k + 1.0)
+    return sorted(((ordinal, score / best) for ordinal, score in fused.items()), key=lambda item: item[1], reverse=True)
+
+def weighted_fusion(lexical: List[Tuple[int, float]], dense: List[Tuple[int, float]], alpha: float = 0.5) -> List[Tuple[int, float]]:
+    """
+    Merge rankings by a weighted sum of their (already normalized) scores
+
+    Args:
+        lexical: Ranked (ordinal, score) list with scores in [0, 1]
+        dense: Ranked (ordinal, score) list with scores in [0, 1]
+        alpha: Weight of the lexical score; the dense score gets 1 - alpha
+
+    Returns:
+        Fused (ordinal, score) list, best first
+    """
+    fused = {}
+    for ordinal, score in lexical:
+        fused[ordinal] = alpha * score
+    for ordinal, score in dense:
+        fused[ordinal] = fused.get(ordinal, 0.0) + (1.0 - alpha) * score
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
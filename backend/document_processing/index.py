@@ -0,0 +1,430 @@
+import math
+import heapq
+from bisect import bisect_left
+from array import array
+from collections import Counter, defaultdict
+from typing import List, Tuple, Iterable, Optional, Sequence
+from .positions import PositionList
+
+class PostingList:
+    """
+    Postings for a single term: parallel arrays of document ordinals and term frequencies
+    """
+
+    __slots__ = ("ordinals", "freqs", "max_tf", "min_length")
+
+    def __init__(self):
+        self.ordinals = array('I')  # Document ordinals, ascending
+        self.freqs = array('I')  # Term frequency in the matching document
+        self.max_tf = 0  # Largest term frequency in the list
+        self.min_length = 0  # Shortest document in the list (0 while empty)
+
+    def append(self, ordinal: int, tf: int, doc_length: int):
+        """Append a posting, keeping the statistics used for score upper bounds"""
+        if not self.ordinals or doc_length < self.min_length:
+            self.min_length = doc_length
+        if tf > self.max_tf:
+            self.max_tf = tf
+        self.ordinals.append(ordinal)
+        self.freqs.append(tf)
+
+    def __len__(self) -> int:
+        return len(self.ordinals)
+
+class InvertedIndex:
+    """
+    In-memory inverted index with BM25 scoring over integer document ordinals
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, positional: bool = False):
+        """
+        Initialize the inverted index
+
+        Args:
+            k1: BM25 term frequency saturation parameter
+            b: BM25 document length normalization parameter
+            positional: Also store token positions (for phrase queries and proximity scoring)
+        """
+        self.k1 = k1
+        self.b = b
+        self.positional = positional
+        self.postings = {}  # term -> PostingList
+        self.positions = {}  # term -> PositionList aligned with its postings (positional indexes only)
+        self.doc_lengths = array('I')  # ordinal -> number of tokens
+        self.total_length = 0
+        self.deleted = bytearray()  # ordinal -> 1 if tombstoned
+        self.deleted_count = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def delete(self, ordinal: int):
+        """
+        Tombstone a document so searches skip it (postings are dropped when the index is rebuilt)
+
+        Args:
+            ordinal: Document ordinal
+        """
+        if not self.deleted[ordinal]:
+            self.deleted[ordinal] = 1
+            self.deleted_count += 1
+
+    @property
+    def avg_doc_length(self) -> float:
+        """Average document length in tokens"""
+        return self.total_length / len(self.doc_lengths) if self.doc_lengths else 0.0
+
+    def add(self, tokens: List[str]) -> int:
+        """
+        Index a tokenized document
+
+        Args:
+            tokens: Document tokens
+
+        Returns:
+            Ordinal assigned to the document
+        """
+        ordinal = len(self.doc_lengths)
+        doc_length = len(tokens)
+
+        # Each term is appended once per document, so postings stay sorted and duplicate-free
+        for term, tf in Counter(tokens).items():
+            posting_list = self.postings.get(term)
+            if posting_list is None:
+                posting_list = self.postings[term] = PostingList()
+            posting_list.append(ordinal, tf, doc_length)
+
+        if self.positional:
+            term_positions = defaultdict(list)
+            for position, term in enumerate(tokens):
+                term_positions[term].append(position)
+            for term, positions in term_positions.items():
+                position_list = self.positions.get(term)
+                if position_list is None:
+                    position_list = self.positions[term] = PositionList()
+                position_list.append(positions)
+
+        self.doc_lengths.append(len(tokens))
+        self.total_length += len(tokens)
+        self.deleted.append(0)
+
+        return ordinal
+
+    def extend(self, other: 'InvertedIndex') -> range:
+        """
+        Append the documents of another index, which is typically built for one batch
+        outside any lock and then merged in one short step
+
+        Args:
+            other: Index whose ordinals follow this index's ordinals
+
+        Returns:
+            Ordinals assigned to the appended documents
+        """
+        base = len(self.doc_lengths)
+        for term, other_list in other.postings.items():
+            posting_list = self.postings.get(term)
+            if posting_list is None:
+                posting_list = self.postings[term] = PostingList()
+            if not posting_list.ordinals or other_list.min_length < posting_list.min_length:
+                posting_list.min_length = other_list.min_length
+            posting_list.max_tf = max(posting_list.max_tf, other_list.max_tf)
+            posting_list.ordinals.extend(ordinal + base for ordinal in other_list.ordinals)
+            posting_list.freqs.extend(other_list.freqs)
+
+            if self.positional:
+                offsets, data = other.position_block(term)
+                position_list = self.positions.get(term)
+                if position_list is None:
+                    position_list = self.positions[term] = PositionList()
+                start = len(position_list.data)
+                position_list.offsets.extend(start + offset for offset in offsets[1:])
+                position_list.data += data
+
+        self.doc_lengths.extend(other.doc_lengths)
+        self.total_length += other.total_length
+        self.deleted += other.deleted
+        self.deleted_count += other.deleted_count
+
+        return range(base, len(self.doc_lengths))
+
+    def term_positions(self, term: str, ordinal: int) -> Optional[List[int]]:
+        """
+        Token positions of a term in a document
+
+        Args:
+            term: Index term
+            ordinal: Document ordinal
+
+        Returns:
+            Ascending positions (empty if the document lacks the term), or None if positions are not indexed
+        """
+        if not self.positional:
+            return None
+        posting_list = self.postings.get(term)
+        if posting_list is None:
+            return []
+        i = bisect_left(posting_list.ordinals, ordinal)
+        if i == len(posting_list.ordinals) or posting_list.ordinals[i] != ordinal:
+            return []
+        return self.positions[term].get(i)
+
+    def position_block(self, term: str) -> Tuple[array, bytes]:
+        """
+        Raw positions of a term for copying into a segment
+
+        Args:
+            term: Index term
+
+        Returns:
+            (offsets, data): offsets starts at 0 and has one more entry than the term's postings
+        """
+        position_list = self.positions[term]
+        return position_list.offsets, position_list.data
+
+    def idf(self, term: str) -> float:
+        """
+        BM25 inverse document frequency (always positive)
+
+        Args:
+            term: Index term
+
+        Returns:
+            IDF weight, 0.0 for unknown terms
+        """
+        posting_list = self.postings.get(term)
+        if not posting_list:
+            return 0.0
+
+        df = len(posting_list)
+        return math.log(1.0 + (len(self.doc_lengths) - df + 0.5) / (df + 0.5))
+
+    def _query_terms(self, tokens: Iterable[str]) -> List[Tuple[str, float]]:
+        """Collapse query tokens into (term, weight) pairs for terms present in the index"""
+        return [
+            (term, qtf * self.idf(term))
+            for term, qtf in Counter(tokens).items()
+            if term in self.postings
+        ]
+
+    def max_score(self, tokens: Iterable[str]) -> float:
+        """
+        Upper bound on the BM25 score any document can reach for a query
+
+        Args:
+            tokens: Query tokens
+
+        Returns:
+            Sum of the saturated term weights (used to normalize scores into [0, 1))
+        """
+        return sum(weight for _, weight in self._query_terms(tokens)) * (self.k1 + 1.0)
+
+    def _length_norm(self) -> Tuple[float, float]:
+        """Split the BM25 length normalization k1 * (1 - b + b * dl / avgdl) into base + slope * dl"""
+        base = self.k1 * (1.0 - self.b)
+        slope = self.k1 * self.b / (self.avg_doc_length or 1.0)
+        return base, slope
+
+    def search(
+        self,
+        tokens: List[str],
+        top_k: int = 5,
+        prune: bool = True,
+        allowed: Optional[Sequence[int]] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Find the best scoring documents for a query
+
+        Args:
+            tokens: Query tokens
+            top_k: Number of results to return
+            prune: Skip documents that cannot reach the top-k (MaxScore); False scores every match
+            allowed: If given, only these ordinals (ascending) can be returned
+
+        Returns:
+            List of (ordinal, score) pairs sorted by descending score
+        """
+        if not self.doc_lengths or top_k <= 0:
+            return []
+
+        base, slope = self._length_norm()
+        return self.evaluate(self._query_terms(tokens), base, slope, top_k, prune, allowed)
+
+    def evaluate(
+        self,
+        query_terms: List[Tuple[str, float]],
+        base: float,
+        slope: float,
+        top_k: int,
+        prune: bool = True,
+        allowed: Optional[Sequence[int]] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Score this index's postings with externally supplied collection statistics
+
+        Used directly when several indexes (segments) share one corpus, so IDF and
+        length normalization reflect the whole corpus rather than one segment.
+
+        Args:
+            query_terms: (term, query frequency * IDF) pairs
+            base: Constant part of the length normalization
+            slope: Per-token part of the length normalization
+            top_k: Number of results to return
+            prune: Use MaxScore pruning
+            allowed: If given, only these ordinals (ascending) are scored
+
+        Returns:
+            List of (ordinal, score) pairs sorted by descending score
+        """
+        query_terms = [(term, weight) for term, weight in query_terms if term in self.postings]
+        if not query_terms or top_k <= 0:
+            return []
+
+        if prune:
+            return self._search_maxscore(query_terms, base, slope, top_k, allowed)
+        return self._search_exhaustive(query_terms, base, slope, top_k, allowed)
+
+    def _search_exhaustive(
+        self,
+        query_terms: List[Tuple[str, float]],
+        base: float,
+        slope: float,
+        top_k: int,
+        allowed: Optional[Sequence[int]] = None
+    ) -> List[Tuple[int, float]]:
+        """Score every posting of every query term (of the allowed documents, if given)"""
+        k1 = self.k1
+        doc_lengths = self.doc_lengths
+        deleted = self.deleted
+        allowed = set(allowed) if allowed is not None else None
+
+        scores = {}  # ordinal -> accumulated score
+        for term, weight in query_terms:
+            posting_list = self.postings[term]
+            term_weight = weight * (k1 + 1.0)
+            for ordinal, tf in zip(posting_list.ordinals, posting_list.freqs):
+                if deleted[ordinal] or (allowed is not None and ordinal not in allowed):
+                    continue
+                norm = base + slope * doc_lengths[ordinal]
+                scores[ordinal] = scores.get(ordinal, 0.0) + term_weight * tf / (tf + norm)
+
+        # Heap selection instead of sorting every matching document
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+    def _search_maxscore(
+        self,
+        query_terms: List[Tuple[str, float]],
+        base: float,
+        slope: float,
+        top_k: int,
+        allowed: Optional[Sequence[int]] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Document-at-a-time MaxScore evaluation
+
+        Query terms are ordered by their score upper bound. Once the k-th best score
+        exceeds the combined bound of the lowest terms, those terms become
+        non-essential: they no longer produce candidates and are only probed (by
+        binary search) for documents that can still enter the top-k.
+
+        With a filter, candidates and allowed ordinals are intersected leapfrog style:
+        both sides skip ahead by binary search, so a selective filter means less work.
+        """
+        k1 = self.k1
+        doc_lengths = self.doc_lengths
+        deleted = self.deleted
+
+        # (upper bound, term weight, posting list), ascending by upper bound
+        terms = []
+        for term, weight in query_terms:
+            posting_list = self.postings[term]
+            term_weight = weight * (k1 + 1.0)
+            max_tf = posting_list.max_tf
+            bound = term_weight * max_tf / (max_tf + base + slope * posting_list.min_length)
+            terms.append((bound, term_weight, posting_list))
+        terms.sort(key=lambda item: item[0])
+
+        if not terms:
+            return []
+
+        # cumulative[i] = best score reachable from terms[0..i] alone
+        cumulative = []
+        total = 0.0
+        for bound, _, _ in terms:
+            total += bound
+            cumulative.append(total)
+
+        ordinals = [posting_list.ordinals for _, _, posting_list in terms]
+        freqs = [posting_list.freqs for _, _, posting_list in terms]
+        weights = [term_weight for _, term_weight, _ in terms]
+        lengths = [len(posting_list) for _, _, posting_list in terms]
+        cursors = [0] * len(terms)
+
+        heap = []  # min-heap of (score, ordinal) holding the current top-k
+        threshold = 0.0
+        first_essential = 0  # terms[first_essential:] drive candidate generation
+        allowed_cursor = 0
+
+        while first_essential < len(terms):
+            # Next candidate is the smallest ordinal under any essential cursor
+            candidate = -1
+            for i in range(first_essential, len(terms)):
+                if cursors[i] < lengths[i]:
+                    ordinal = ordinals[i][cursors[i]]
+                    if candidate < 0 or ordinal < candidate:
+                        candidate = ordinal
+            if candidate < 0:
+                break
+
+            if allowed is not None:
+                allowed_cursor = bisect_left(allowed, candidate, allowed_cursor)
+                if allowed_cursor == len(allowed):
+                    break
+                if allowed[allowed_cursor] != candidate:
+                    # Jump the essential cursors to the next allowed document
+                    target = allowed[allowed_cursor]
+                    for i in range(first_essential, len(terms)):
+                        cursors[i] = bisect_left(ordinals[i], target, cursors[i])
+                    continue
+
+            # Tombstoned documents only advance the cursors
+            if deleted[candidate]:
+                for i in range(first_essential, len(terms)):
+                    if cursors[i] < lengths[i] and ordinals[i][cursors[i]] == candidate:
+                        cursors[i] += 1
+                continue
+
+            norm = base + slope * doc_lengths[candidate]
+
+            # Score the essential terms, advancing their cursors past the candidate
+            score = 0.0
+            for i in range(first_essential, len(terms)):
+                cursor = cursors[i]
+                if cursor < lengths[i] and ordinals[i][cursor] == candidate:
+                    tf = freqs[i][cursor]
+                    score += weights[i] * tf / (tf + norm)
+                    cursors[i] = cursor + 1
+
+            # Probe non-essential terms from the highest bound down, stopping once hopeless
+            for i in range(first_essential - 1, -1, -1):
+                if score + cumulative[i] <= threshold:
+                    break
+                cursor = bisect_left(ordinals[i], candidate, cursors[i])
+                cursors[i] = cursor
+                if cursor < lengths[i] and ordinals[i][cursor] == candidate:
+                    tf = freqs[i][cursor]
+                    score += weights[i] * tf / (tf + norm)
+
+            if len(heap) < top_k:
+                heapq.heappush(heap, (score, candidate))
+            elif score > threshold:
+                heapq.heapreplace(heap, (score, candidate))
+            else:
+                continue
+
+            if len(heap) == top_k:
+                threshold = heap[0][0]
+                while first_essential < len(terms) and cumulative[first_essential] <= threshold:
+                    first_essential += 1
+
+        return [(ordinal, score) for score, ordinal in sorted(heap, reverse=True)]
@@ -0,0 +1,135 @@
+import os
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Callable
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class JobQueueFull(Exception):
+    """Raised when the ingestion queue has no room for another job"""
+
+class IngestionJobs:
+    """
+    Bounded pool of background ingestion jobs with pollable status
+
+    Each job gets a progress dict that its work function fills in as it goes (pages
+    parsed, chunks indexed, ...). Finished jobs are kept for a while so clients can
+    collect the result, then forgotten.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None, ttl: Optional[float] = None):
+        """
+        Initialize the job pool
+
+        Args:
+            workers: Jobs run concurrently (if None, uses INGEST_WORKERS, default 2)
+            max_pending: Queued plus running jobs accepted before submit() refuses more
+                (if None, uses INGEST_MAX_PENDING, default 64)
+            ttl: Seconds a finished job stays queryable (if None, uses INGEST_JOB_TTL, default 3600)
+        """
+        self.workers = workers or int(os.environ.get("INGEST_WORKERS", 2))
+        self.max_pending = max_pending or int(os.environ.get("INGEST_MAX_PENDING", 64))
+        self.ttl = ttl if ttl is not None else float(os.environ.get("INGEST_JOB_TTL", 3600))
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ingest")
+        self._jobs = {}  # job_id -> job
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+
+    def submit(self, work: Callable[[Dict[str, Any]], Dict[str, Any]], **info) -> str:
+        """
+        Queue a job
+
+        Args:
+            work: Called with the job's progress dict; returns the job result
+            **info: Extra fields reported with the job status (e.g. filename)
+
+        Returns:
+            Job ID
+
+        Raises:
+            JobQueueFull: If max_pending jobs are already queued or running
+        """
+        with self._lock:
+            self._prune()
+            if self.pending >= self.max_pending:
+                raise JobQueueFull(f"{self.pending} ingestion jobs already pending")
+            job_id = str(uuid.uuid4())
+            job = {
+                **info,
+                "job_id": job_id,
+                "status": "queued",
+                "progress": {},
+                "result": None,
+                "error": None,
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+            }
+            self._jobs[job_id] = job
+            self.pending += 1
+        self._executor.submit(self._run, job, work)
+        return job_id
+
+    def _run(self, job: Dict[str, Any], work: Callable[[Dict[str, Any]], Dict[str, Any]]):
+        job["started_at"] = time.time()
+        job["status"] = "running"
+        try:
+            result = work(job["progress"])
+        except Exception as e:
+            logger.error(f"Ingestion job {job['job_id']} failed: {e}")
+            with self._lock:
+                job["error"] = str(e)
+                job["status"] = "failed"
+                job["finished_at"] = time.time()
+                self.pending -= 1
+                self.failed += 1
+            return
+        with self._lock:
+            job["result"] = result
+            job["status"] = "done"
+            job["finished_at"] = time.time()
+            self.pending -= 1
+            self.completed += 1
+
+    def _prune(self):
+        """Forget finished jobs older than the TTL (caller holds the lock)"""
+        cutoff = time.time() - self.ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job["finished_at"] is not None and job["finished_at"] < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Current status of a job
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            Snapshot of the job (status, progress, result or error), or None if unknown
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = dict(job)
+            snapshot["progress"] = dict(job["progress"])
+            return snapshot
+
+    def stats(self) -> Dict[str, Any]:
+        """Job counters for monitoring"""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "pending": self.pending,
+                "completed": self.completed,
+                "failed": self.failed,
+            }
@@ -0,0 +1,187 @@
+import os
+import json
+import uuid
+import logging
+import threading
+from typing import List, Dict, Any, Optional, Iterable, Iterator
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Bump whenever parser output changes, so entries written by an older parser are not reused
+PARSE_CACHE_VERSION = 3
+ENTRY_SUFFIX = ".jsonl"
+
+class ParseCache:
+    """
+    Content-addressed on-disk cache of parsed chunks
+
+    Entries are keyed by the SHA-256 of the uploaded bytes and the file type, and hold
+    one JSON line per chunk without its ID or source file name, so the same paper
+    uploaded under another name or into another session reuses the entry. Least
+    recently used entries are evicted once the cache outgrows its size budget.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 * 1024):
+        """
+        Initialize the parse cache
+
+        Args:
+            directory: Directory holding the entries (created if missing)
+            max_bytes: Disk budget for all entries
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(digest: str, extension: str, *qualifiers: str) -> str:
+        """
+        Cache key of an upload
+
+        Args:
+            digest: Hex SHA-256 of the file contents
+            extension: File extension, e.g. ".pdf" (the same bytes parse differently per type)
+            qualifiers: Anything else the parsed chunks depend on, such as the chunking
+                settings or which pass of a multi-pass parse the entry holds
+
+        Returns:
+            Key used as the entry's file name
+        """
+        return "-".join([f"v{PARSE_CACHE_VERSION}", digest, extension.lstrip('.').lower(), *filter(None, qualifiers)])
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def get(self, key: str, file_name: str) -> Optional[Iterator[Dict[str, Any]]]:
+        """
+        Look up the chunks of a previously parsed file
+
+        Args:
+            key: Cache key (see key())
+            file_name: Name of the new upload, used as the chunks' source
+
+        Returns:
+            Iterator over chunks with fresh IDs, or None on a miss
+        """
+        path = self._path(key)
+        try:
+            # Opening first keeps the entry readable even if it is evicted meanwhile
+            file = open(path, 'r', encoding='utf-8')
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        # Mark as recently used for eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        logger.info(f"Parse cache hit for {file_name}")
+        return self._read(file, file_name)
+
+    @staticmethod
+    def _read(file, file_name: str) -> Iterator[Dict[str, Any]]:
+        with file:
+            for line in file:
+                entry = json.loads(line)
+                yield {
+                    "id": str(uuid.uuid4()),
+                    "content": entry["content"],
+                    "metadata": {"source": file_name, **entry["metadata"]}
+                }
+
+    def put(self, key: str, chunks: Iterable[Dict[str, Any]]):
+        """
+        Write already parsed chunks to a new entry
+
+        Args:
+            key: Cache key (see key())
+            chunks: Chunks as produced by the parser
+        """
+        for _ in self._write(key, chunks):
+            pass
+
+    def record(self, key: str, chunks: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Pass chunks through while writing them to a new entry, like put() but streaming
+
+        The entry is published only once the chunks are exhausted, so a parse that fails
+        or is abandoned part-way leaves nothing behind.
+
+        Args:
+            key: Cache key (see key())
+            chunks: Chunks as produced by the parser
+
+        Returns:
+            Iterator over the same chunks
+        """
+        return self._write(key, chunks)
+
+    def _write(self, key: str, chunks: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Write chunks to a temporary file as they pass through, then publish it as the entry"""
+        path = self._path(key)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        published = False
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                for chunk in chunks:
+                    metadata = {name: value for name, value in chunk["metadata"].items() if name != "source"}
+                    file.write(json.dumps({"content": chunk["content"], "metadata": metadata}) + "\n")
+                    yield chunk
+            os.replace(temp_path, path)
+            published = True
+        finally:
+            if not published:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+        self._evict()
+
+    def _entries(self) -> List[os.DirEntry]:
+        return [entry for entry in os.scandir(self.directory)
+                if entry.is_file() and entry.name.endswith(ENTRY_SUFFIX)]
+
+    def _evict(self):
+        """Remove least recently used entries until the cache fits its budget"""
+        with self._lock:
+            entries = []
+            for entry in self._entries():
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+            size = sum(entry_size for _, entry_size, _ in entries)
+            entries.sort()
+            for _, entry_size, path in entries:
+                if size <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                size -= entry_size
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters and current disk usage"""
+        with self._lock:
+            entries = self._entries()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(entries),
+                "bytes": sum(entry.stat().st_size for entry in entries),
+                "max_bytes": self.max_bytes,
+            }
@@ -1,15 +1,281 @@
 import os
+import logging
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 import pdfplumber
 import docx
 import fitz  # PyMuPDF
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Tuple, Optional, Iterator
 import uuid
+from .chunker import Chunker
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Parallel PDF parsing: worker processes (0 or 1 parses in the calling thread) and the
+# smallest document worth splitting across them
+PDF_PARSE_WORKERS = int(os.environ.get("PDF_PARSE_WORKERS", min(4, os.cpu_count() or 1)))
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get("PDF_PARALLEL_MIN_PAGES", 32))
+
+READ_BLOCK_SIZE = 1 << 16  # Characters read at a time from text files
+PARAGRAPH_CHUNKS = 64  # Longest paragraph held in memory from a text file, in chunk budgets
+CHARS_PER_TOKEN = 8  # Generous characters per word, to size that limit for token budgets
+TABLE_SNAP_TOLERANCE = 3.0  # Points a line may deviate from horizontal/vertical and still be a ruling
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Shared parsing pool, created on first use and resized if the worker count changes"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # Spawn fresh interpreters: forked workers would inherit the server's threads and locks
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+def _reset_pool():
+    """Drop a broken pool so the next parse starts a new one"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = None
+
+def _ruling_counts(page) -> Tuple[int, int]:
+    """
+    Count the horizontal and vertical edges in a page's vector graphics
+
+    Rectangles count as four edges, or as one line when drawn thin like a rule.
+    Curves cannot form table borders and are ignored.
+    """
+    horizontal = vertical = 0
+    for drawing in page.get_cdrawings():
+        for item in drawing["items"]:
+            kind = item[0]
+            if kind == "l":
+                (x0, y0), (x1, y1) = item[1], item[2]
+                if abs(y1 - y0) <= TABLE_SNAP_TOLERANCE:
+                    horizontal += 1
+                elif abs(x1 - x0) <= TABLE_SNAP_TOLERANCE:
+                    vertical += 1
+            elif kind in ("re", "qu"):
+                if kind == "re":
+                    x0, y0, x1, y1 = item[1]
+                else:
+                    xs = [point[0] for point in item[1]]
+                    ys = [point[1] for point in item[1]]
+                    x0, y0, x1, y1 = min(xs), min(ys), max(xs), max(ys)
+                if abs(y1 - y0) <= TABLE_SNAP_TOLERANCE:
+                    horizontal += 1
+                elif abs(x1 - x0) <= TABLE_SNAP_TOLERANCE:
+                    vertical += 1
+                else:
+                    horizontal += 2
+                    vertical += 2
+    return horizontal, vertical
+
+def _table_candidate(page) -> bool:
+    """
+    Cheap check whether find_tables could find anything on a page
+
+    find_tables builds tables from ruling lines, and the smallest table it reports
+    (one row, two cells) takes at least two horizontal and three vertical edges or
+    vice versa. Pages without that much line work are skipped.
+    """
+    horizontal, vertical = _ruling_counts(page)
+    return horizontal >= 2 and vertical >= 2 and horizontal + vertical >= 5
+
+def _page_chunks(page, page_num: int, file_name: str, chunker: Chunker, text: bool = True,
+                 tables: bool = True) -> List[Dict[str, Any]]:
+    """
+    Text and/or table chunks of one PyMuPDF page
+
+    Args:
+        page: PyMuPDF page
+        page_num: 0-based page number
+        file_name: Original filename
+        chunker: Splits page text over the chunk budget
+        text: Emit the page text chunks
+        tables: Emit table chunks (only candidate pages are searched for tables)
+
+    Returns:
+        Chunks of the page, text first
+    """
+    chunks = []
+    candidate = tables and _table_candidate(page)
+    if not text and not candidate:
+        return chunks
+    page_text = page.get_text()
+
+    # Skip empty pages
+    if not page_text.strip():
+        return chunks
+
+    # Extract page text, split if the page is over the chunk budget
+    if text:
+        for content in chunker.split(page_text):
+            chunks.append({
+                "id": str(uuid.uuid4()),
+                "content": content,
+                "metadata": {
+                    "source": file_name,
+                    "page": page_num + 1,
+                    "chunk_type": "page"
+                }
+            })
+
+    # Extract tables from the page if any
+    if candidate:
+        for i, table in enumerate(page.find_tables()):
+            table_text = "Table content:\n"
+            for row in table.extract():
+                table_text += " | ".join([str(cell) for cell in row]) + "\n"
+
+            chunks.append({
+                "id": str(uuid.uuid4()),
+                "content": table_text,
+                "metadata": {
+                    "source": file_name,
+                    "page": page_num + 1,
+                    "chunk_type": "table",
+                    "table_index": i
+                }
+            })
+    return chunks
+
+def _plumber_page_chunks(page, page_num: int, file_name: str, chunker: Chunker, text: bool = True,
+                         tables: bool = True) -> List[Dict[str, Any]]:
+    """
+    Text and/or table chunks of one pdfplumber page
+
+    Args:
+        page: pdfplumber page
+        page_num: 0-based page number
+        file_name: Original filename
+        chunker: Splits page text over the chunk budget
+        text: Emit the page text chunks
+        tables: Emit table chunks
+
+    Returns:
+        Chunks of the page, text first
+    """
+    chunks = []
+    page_text = (page.extract_text() or "") if text else ""
+    for content in chunker.split(page_text):  # Empty pages yield nothing
+        chunks.append({
+            "id": str(uuid.uuid4()),
+            "content": content,
+            "metadata": {
+                "source": file_name,
+                "page": page_num + 1,
+                "chunk_type": "page"
+            }
+        })
+
+    # Extract tables
+    page_tables = page.extract_tables() if tables else None
+    if page_tables:
+        for i, table in enumerate(page_tables):
+            table_text = "Table content:\n"
+            for row in table:
+                table_text += " | ".join([str(cell or "") for cell in row]) + "\n"
+
+            chunks.append({
+                "id": str(uuid.uuid4()),
+                "content": table_text,
+                "metadata": {
+                    "source": file_name,
+                    "page": page_num + 1,
+                    "chunk_type": "table",
+                    "table_index": i
+                }
+            })
+    return chunks
+
+class _PageFallback:
+    """
+    Re-extracts single pages PyMuPDF fails on with pdfplumber, opening the file on first use
+    """
+
+    def __init__(self, file_path: str, file_name: str, chunker: Chunker, text: bool = True, tables: bool = True):
+        self.file_path = file_path
+        self.file_name = file_name
+        self.chunker = chunker
+        self.text = text
+        self.tables = tables
+        self.pdf = None
+        self.pages = 0  # Pages re-extracted so far
+
+    def chunks(self, page_num: int, error: Exception) -> List[Dict[str, Any]]:
+        """Chunks of a page PyMuPDF raised on"""
+        logger.warning(f"PyMuPDF failed on page {page_num + 1} of {self.file_name}, using pdfplumber: {error}")
+        if self.pdf is None:
+            self.pdf = pdfplumber.open(self.file_path)
+        page = self.pdf.pages[page_num]
+        try:
+            return _plumber_page_chunks(page, page_num, self.file_name, self.chunker, self.text, self.tables)
+        finally:
+            # Release the page's parsed objects before moving on
+            page.flush_cache()
+            self.pages += 1
+
+    def close(self):
+        if self.pdf is not None:
+            self.pdf.close()
+            self.pdf = None
+
+def _count(stats: Optional[Dict[str, int]], key: str, amount: int = 1):
+    if stats is not None:
+        stats[key] = stats.get(key, 0) + amount
+
+def _parse_pdf_pages(file_path: str, file_name: str, start: int, stop: int, chunker: Chunker,
+                     text: bool = True, tables: bool = True) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Parse pages [start, stop) of a PDF; runs in a worker process with its own document handle
+
+    Args:
+        file_path: Path to the PDF
+        file_name: Original filename
+        start: First page (0-based)
+        stop: Page after the last one
+        chunker: Splits page text over the chunk budget
+        text: Emit page text chunks
+        tables: Emit table chunks
+
+    Returns:
+        Page and table chunks in page order, and the number of pages re-extracted with pdfplumber
+    """
+    chunks = []
+    fallback = _PageFallback(file_path, file_name, chunker, text, tables)
+    doc = fitz.open(file_path)
+    try:
+        for page_num in range(start, stop):
+            try:
+                page_chunks = _page_chunks(doc[page_num], page_num, file_name, chunker, text, tables)
+            except Exception as e:
+                page_chunks = fallback.chunks(page_num, e)
+            chunks.extend(page_chunks)
+    finally:
+        doc.close()
+        fallback.close()
+    return chunks, fallback.pages
 
 class DocumentParser:
     """
     Parser for different document types (.pdf, .docx, .txt)
     """
     
+    # Shared chunking engine, configured from CHUNK_SIZE, CHUNK_OVERLAP and CHUNK_UNIT
+    chunker = Chunker()
+    
     @staticmethod
     def parse_document(file_path: str, file_name: str) -> List[Dict[str, Any]]:
         """
@@ -22,229 +288,335 @@ class DocumentParser:
         Returns:
             List of chunks with metadata
         """
+        return list(DocumentParser.iter_document(file_path, file_name))
+    
+    @staticmethod
+    def iter_document(file_path: str, file_name: str, text: bool = True, tables: bool = True,
+                      chunker: Optional[Chunker] = None, stats: Optional[Dict[str, int]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Parse a document lazily, yielding chunks as each page or paragraph group is read
+        
+        Args:
+            file_path: Path to the document
+            file_name: Original filename
+            text: Emit text chunks (everything except PDF tables)
+            tables: Emit PDF table chunks; iter_document(..., text=False) is a table-only pass
+            chunker: Chunking settings (defaults to DocumentParser.chunker)
+            stats: If given, filled with parse counters while the iterator is consumed
+                (for PDFs: "total_pages", "pages_parsed" and "fallback_pages", the pages PyMuPDF
+                failed on and that were re-extracted with pdfplumber)
+            
+        Returns:
+            Iterator over chunks with metadata, in document order
+            
+        Raises:
+            ValueError: For an unsupported file type
+        """
         file_extension = os.path.splitext(file_name)[1].lower()
+        chunker = chunker or DocumentParser.chunker
         
         if file_extension == '.pdf':
-            return DocumentParser._parse_pdf(file_path, file_name)
+            return DocumentParser._iter_pdf(file_path, file_name, text=text, tables=tables, chunker=chunker, stats=stats)
         elif file_extension == '.docx':
-            return DocumentParser._parse_docx(file_path, file_name)
+            return DocumentParser._iter_docx(file_path, file_name, chunker) if text else iter(())
         elif file_extension == '.txt':
-            return DocumentParser._parse_txt(file_path, file_name)
+            return DocumentParser._iter_txt(file_path, file_name, chunker) if text else iter(())
         else:
             raise ValueError(f"Unsupported file type: {file_extension}")
     
     @staticmethod
-    def _parse_pdf(file_path: str, file_name: str) -> List[Dict[str, Any]]:
-        """Parse PDF using pdfplumber and PyMuPDF for better text extraction"""
-        chunks = []
+    def parse_many(
+        files: List[Tuple[str, str]],
+        text: bool = True,
+        tables: bool = True,
+        workers: Optional[int] = None
+    ) -> Iterator[Tuple[int, Optional[List[Dict[str, Any]]], Dict[str, int], Optional[Exception]]]:
+        """
+        Parse several documents at once, one per worker process
+        
+        Args:
+            files: (file path, original filename) per document
+            text: Emit text chunks
+            tables: Emit PDF table chunks
+            workers: Worker processes (defaults to PDF_PARSE_WORKERS; 1 parses in this thread)
+            
+        Returns:
+            Iterator over (index in files, chunks, parse stats, error) in completion order;
+            a document that fails to parse has chunks None and the exception as error
+        """
+        workers = PDF_PARSE_WORKERS if workers is None else workers
+        if workers <= 1 or len(files) <= 1:
+            for i, (file_path, file_name) in enumerate(files):
+                stats = {}
+                try:
+                    chunks = list(DocumentParser.iter_document(file_path, file_name, text, tables, stats=stats))
+                except Exception as e:
+                    yield i, None, stats, e
+                    continue
+                yield i, chunks, stats, None
+            return
+        
+        pool = _get_pool(workers)
+        futures = {
+            pool.submit(_parse_file, file_path, file_name, text, tables, DocumentParser.chunker): i
+            for i, (file_path, file_name) in enumerate(files)
+        }
+        try:
+            for future in as_completed(futures):
+                try:
+                    chunks, stats = future.result()
+                except BrokenProcessPool:
+                    _reset_pool()
+                    raise
+                except Exception as e:
+                    yield futures[future], None, {}, e
+                    continue
+                yield futures[future], chunks, stats, None
+        finally:
+            for future in futures:
+                future.cancel()
+    
+    @staticmethod
+    def _iter_pdf(file_path: str, file_name: str, workers: Optional[int] = None,
+                  min_pages: Optional[int] = None, text: bool = True, tables: bool = True,
+                  chunker: Optional[Chunker] = None, stats: Optional[Dict[str, int]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Parse PDF using pdfplumber and PyMuPDF for better text extraction
+        
+        Pages PyMuPDF raises on are re-extracted one by one with pdfplumber; the whole
+        remaining document only falls back if the file cannot be handled at all.
+
+        Args:
+            file_path: Path to the PDF
+            file_name: Original filename
+            workers: Worker processes for page parsing (defaults to PDF_PARSE_WORKERS)
+            min_pages: Smallest page count parsed in parallel (defaults to PDF_PARALLEL_MIN_PAGES)
+            text: Emit metadata, table of contents and page text chunks
+            tables: Emit table chunks; with text=False this is a separate table pass
+            chunker: Splits page text over the chunk budget (defaults to DocumentParser.chunker)
+            stats: If given, "total_pages" is set and "pages_parsed" and "fallback_pages" (pages
+                parsed with pdfplumber) are increased as pages are emitted
+
+        Returns:
+            Iterator over chunks with metadata
+        """
+        chunker = chunker or DocumentParser.chunker
+        next_page = 0  # First page not yet yielded, where a fallback has to resume
         
         # Try PyMuPDF first for better performance
         try:
             doc = fitz.open(file_path)
-            
-            # First, extract document metadata if available
-            metadata = doc.metadata
-            if metadata:
-                meta_content = "Document Metadata:\n"
-                for key, value in metadata.items():
-                    if value and str(value).strip():
-                        meta_content += f"{key}: {value}\n"
+            try:
+                # First, extract document metadata if available
+                metadata = doc.metadata if text else None
+                if metadata:
+                    meta_content = "Document Metadata:\n"
+                    for key, value in metadata.items():
+                        if value and str(value).strip():
+                            meta_content += f"{key}: {value}\n"
+                    
+                    if len(meta_content) > 20:  # Only add if we have meaningful metadata
+                        yield {
+                            "id": str(uuid.uuid4()),
+                            "content": meta_content,
+                            "metadata": {
+                                "source": file_name,
+                                "chunk_type": "metadata"
+                            }
+                        }
                 
-                if len(meta_content) > 20:  # Only add if we have meaningful metadata
-                    chunks.append({
+                # Extract table of contents if available
+                toc = doc.get_toc() if text else None
+                if toc:
+                    toc_content = "Table of Contents:\n"
+                    for level, title, page in toc:
+                        indent = "  " * (level - 1)
+                        toc_content += f"{indent}• {title} (Page {page})\n"
+                    
+                    yield {
                         "id": str(uuid.uuid4()),
-                        "content": meta_content,
+                        "content": toc_content,
                         "metadata": {
                             "source": file_name,
-                            "chunk_type": "metadata"
+                            "chunk_type": "toc"
                         }
-                    })
-            
-            # Extract table of contents if available
-            toc = doc.get_toc()
-            if toc:
-                toc_content = "Table of Contents:\n"
-                for level, title, page in toc:
-                    indent = "  " * (level - 1)
-                    toc_content += f"{indent}• {title} (Page {page})\n"
-                
-                chunks.append({
-                    "id": str(uuid.uuid4()),
-                    "content": toc_content,
-                    "metadata": {
-                        "source": file_name,
-                        "chunk_type": "toc"
                     }
-                })
-            
-            # Process each page
-            for page_num, page in enumerate(doc):
-                text = page.get_text()
                 
-                # Skip empty pages
-                if not text.strip():
-                    continue
-                
-                # Extract page text
-                chunks.append({
-                    "id": str(uuid.uuid4()),
-                    "content": text,
-                    "metadata": {
-                        "source": file_name,
-                        "page": page_num + 1,
-                        "chunk_type": "page"
-                    }
-                })
-                
-                # Extract tables from the page if any
-                tables = page.find_tables()
-                if tables:
-                    for i, table in enumerate(tables):
-                        table_text = "Table content:\n"
-                        for row in table.extract():
-                            table_text += " | ".join([str(cell) for cell in row]) + "\n"
-                        
-                        chunks.append({
-                            "id": str(uuid.uuid4()),
-                            "content": table_text,
-                            "metadata": {
-                                "source": file_name,
-                                "page": page_num + 1,
-                                "chunk_type": "table",
-                                "table_index": i
-                            }
-                        })
-            
-            doc.close()
+                # Process each page, splitting large documents across worker processes
+                if stats is not None:
+                    stats["total_pages"] = doc.page_count
+                workers = PDF_PARSE_WORKERS if workers is None else workers
+                min_pages = PDF_PARALLEL_MIN_PAGES if min_pages is None else min_pages
+                if workers > 1 and doc.page_count >= max(min_pages, 2):
+                    for stop, chunks, fallback_pages in DocumentParser._iter_pdf_parallel(
+                            file_path, file_name, doc.page_count, workers, chunker, text, tables):
+                        _count(stats, "fallback_pages", fallback_pages)
+                        yield from chunks
+                        _count(stats, "pages_parsed", stop - next_page)
+                        next_page = stop
+                else:
+                    # Isolate failures per page: a page PyMuPDF cannot handle is re-extracted alone
+                    fallback = _PageFallback(file_path, file_name, chunker, text, tables)
+                    try:
+                        for page_num in range(doc.page_count):
+                            try:
+                                page_chunks = _page_chunks(doc[page_num], page_num, file_name, chunker, text, tables)
+                            except Exception as e:
+                                page_chunks = fallback.chunks(page_num, e)
+                                _count(stats, "fallback_pages")
+                            yield from page_chunks
+                            _count(stats, "pages_parsed")
+                            next_page = page_num + 1
+                    finally:
+                        fallback.close()
+            finally:
+                doc.close()
         except Exception as e:
-            # Fallback to pdfplumber if PyMuPDF fails
+            # Fallback to pdfplumber if PyMuPDF fails, from the first page not yet parsed
+            logger.warning(f"PyMuPDF failed on {file_name} at page {next_page + 1}, using pdfplumber: {e}")
             with pdfplumber.open(file_path) as pdf:
-                for page_num, page in enumerate(pdf.pages):
-                    text = page.extract_text() or ""
-                    if text.strip():  # Only add non-empty pages
-                        chunks.append({
-                            "id": str(uuid.uuid4()),
-                            "content": text,
-                            "metadata": {
-                                "source": file_name,
-                                "page": page_num + 1,
-                                "chunk_type": "page"
-                            }
-                        })
+                for page_num in range(next_page, len(pdf.pages)):
+                    page = pdf.pages[page_num]
+                    yield from _plumber_page_chunks(page, page_num, file_name, chunker, text, tables)
+                    _count(stats, "fallback_pages")
+                    _count(stats, "pages_parsed")
                     
-                    # Extract tables
-                    tables = page.extract_tables()
-                    if tables:
-                        for i, table in enumerate(tables):
-                            table_text = "Table content:\n"
-                            for row in table:
-                                table_text += " | ".join([str(cell or "") for cell in row]) + "\n"
-                            
-                            chunks.append({
-                                "id": str(uuid.uuid4()),
-                                "content": table_text,
-                                "metadata": {
-                                    "source": file_name,
-                                    "page": page_num + 1,
-                                    "chunk_type": "table",
-                                    "table_index": i
-                                }
-                            })
+                    # Release the page's parsed objects before moving on
+                    page.flush_cache()
+    
+    @staticmethod
+    def _iter_pdf_parallel(file_path: str, file_name: str, page_count: int, workers: int,
+                           chunker: Chunker, text: bool = True,
+                           tables: bool = True) -> Iterator[Tuple[int, List[Dict[str, Any]], int]]:
+        """
+        Parse the pages of a PDF in a process pool, yielding results in page order
         
-        return chunks
+        Only a couple of ranges per worker are in flight at a time, so finished ranges
+        waiting for an earlier one to complete stay bounded.
+
+        Args:
+            file_path: Path to the PDF
+            file_name: Original filename
+            page_count: Number of pages
+            workers: Worker processes to use
+            chunker: Splits page text over the chunk budget
+            text: Emit page text chunks
+            tables: Emit table chunks
+
+        Returns:
+            Iterator over (page after the range, chunks of the range, pages of the range
+            re-extracted with pdfplumber)
+        """
+        # A few ranges per worker, so one table-heavy range does not hold up the rest
+        step = max(1, -(-page_count // (workers * 4)))
+        ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+
+        pool = _get_pool(workers)
+        pending = deque()  # (stop, future), in page order
+        try:
+            for start, stop in ranges:
+                pending.append((stop, pool.submit(_parse_pdf_pages, file_path, file_name, start, stop, chunker, text, tables)))
+                if len(pending) >= workers * 2:
+                    stop, future = pending.popleft()
+                    yield (stop, *future.result())
+            while pending:
+                stop, future = pending.popleft()
+                yield (stop, *future.result())
+        except BrokenProcessPool:
+            _reset_pool()
+            raise
+        finally:
+            # Abandoned early (error or consumer stopped): drop ranges not yet started
+            for _, future in pending:
+                future.cancel()
+        logger.info(f"Parsed {page_count} pages of {file_name} in {len(ranges)} ranges across {workers} workers")
     
     @staticmethod
-    def _parse_docx(file_path: str, file_name: str) -> List[Dict[str, Any]]:
+    def _iter_docx(file_path: str, file_name: str, chunker: Chunker) -> Iterator[Dict[str, Any]]:
         """Parse DOCX using python-docx"""
-        chunks = []
         doc = docx.Document(file_path)
         
-        # Process by paragraphs
-        current_chunk = ""
-        current_chunk_size = 0
-        max_chunk_size = 1000  # Characters
-        
-        for para_num, para in enumerate(doc.paragraphs):
-            if para.text.strip():
-                if current_chunk_size + len(para.text) > max_chunk_size and current_chunk:
-                    # Save current chunk and start a new one
-                    chunks.append({
-                        "id": str(uuid.uuid4()),
-                        "content": current_chunk,
-                        "metadata": {
-                            "source": file_name,
-                            "chunk_type": "paragraph_group"
-                        }
-                    })
-                    current_chunk = para.text
-                    current_chunk_size = len(para.text)
-                else:
-                    # Add to current chunk
-                    if current_chunk:
-                        current_chunk += "\n\n" + para.text
-                    else:
-                        current_chunk = para.text
-                    current_chunk_size += len(para.text)
-        
-        # Add the last chunk if it exists
-        if current_chunk:
-            chunks.append({
+        # Group paragraphs into chunks
+        for content in chunker.chunks(para.text for para in doc.paragraphs):
+            yield {
                 "id": str(uuid.uuid4()),
-                "content": current_chunk,
+                "content": content,
                 "metadata": {
                     "source": file_name,
                     "chunk_type": "paragraph_group"
                 }
-            })
-        
-        return chunks
+            }
     
     @staticmethod
-    def _parse_txt(file_path: str, file_name: str) -> List[Dict[str, Any]]:
-        """Parse TXT files"""
-        chunks = []
+    def _iter_paragraphs(file, limit: int) -> Iterator[str]:
+        """
+        Split a text file on blank lines (double newlines) while reading it in blocks
         
-        with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
-            text = file.read()
-            
-            # Split by double newlines (paragraphs)
-            paragraphs = text.split('\n\n')
-            
-            current_chunk = ""
-            current_chunk_size = 0
-            max_chunk_size = 1000  # Characters
+        Yields the same paragraphs as text.split('\\n\\n') on the whole file, except that
+        a paragraph longer than limit characters is yielded in parts cut at whitespace,
+        so no more than one block and limit characters are held in memory.
+        """
+        pieces = []  # Unfinished paragraph
+        size = 0
+        carry = ""  # A trailing newline that may start the next paragraph break
+        while True:
+            block = file.read(READ_BLOCK_SIZE)
+            if not block:
+                break
+            parts = (carry + block).split('\n\n')
+            for part in parts[:-1]:
+                pieces.append(part)
+                yield "".join(pieces)
+                pieces = []
+                size = 0
             
-            for para in paragraphs:
-                if para.strip():
-                    if current_chunk_size + len(para) > max_chunk_size and current_chunk:
-                        # Save current chunk and start a new one
-                        chunks.append({
-                            "id": str(uuid.uuid4()),
-                            "content": current_chunk,
-                            "metadata": {
-                                "source": file_name,
-                                "chunk_type": "paragraph_group"
-                            }
-                        })
-                        current_chunk = para
-                        current_chunk_size = len(para)
-                    else:
-                        # Add to current chunk
-                        if current_chunk:
-                            current_chunk += "\n\n" + para
-                        else:
-                            current_chunk = para
-                        current_chunk_size += len(para)
+            # The last part may continue in the next block
+            last = parts[-1]
+            carry = "\n" if last.endswith("\n") else ""
+            if carry:
+                last = last[:-1]
+            pieces.append(last)
+            size += len(last)
             
-            # Add the last chunk if it exists
-            if current_chunk:
-                chunks.append({
+            if size > limit:
+                paragraph = "".join(pieces)
+                cut = max(paragraph.rfind(" ", 0, limit), paragraph.rfind("\n", 0, limit))
+                cut = cut + 1 if cut > 0 else limit
+                yield paragraph[:cut]
+                pieces = [paragraph[cut:]]
+                size = len(pieces[0])
+        yield "".join(pieces) + carry
+    
+    @staticmethod
+    def _iter_txt(file_path: str, file_name: str, chunker: Chunker) -> Iterator[Dict[str, Any]]:
+        """Parse TXT files"""
+        with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
+            # Split by double newlines (paragraphs) and group them into chunks
+            # Paragraphs without breaks are cut after PARAGRAPH_CHUNKS chunks' worth of text
+            limit = chunker.size * (1 if chunker.unit == "chars" else CHARS_PER_TOKEN) * PARAGRAPH_CHUNKS
+            for content in chunker.chunks(DocumentParser._iter_paragraphs(file, max(limit, READ_BLOCK_SIZE))):
+                yield {
                     "id": str(uuid.uuid4()),
-                    "content": current_chunk,
+                    "content": content,
                     "metadata": {
                         "source": file_name,
                         "chunk_type": "paragraph_group"
                     }
-                })
-        
-        return chunks
\ No newline at end of file
+                }
+
+def _parse_file(file_path: str, file_name: str, text: bool, tables: bool,
+                chunker: Chunker) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Parse a whole document in a worker process (PDF pages sequentially: the pool is
+    already busy with other documents)
+
+    Returns:
+        Chunks and parse stats
+    """
+    stats = {}
+    if os.path.splitext(file_name)[1].lower() == '.pdf':
+        chunks = DocumentParser._iter_pdf(file_path, file_name, workers=1, text=text, tables=tables,
+                                          chunker=chunker, stats=stats)
+    else:
+        chunks = DocumentParser.iter_document(file_path, file_name, text, tables, chunker, stats)
+    return list(chunks), stats
@@ -0,0 +1,135 @@
+import heapq
+from array import array
+from typing import List, Iterable, Optional
+
+def encode_positions(positions: Iterable[int]) -> bytes:
+    """
+    Encode ascending token positions as varint deltas
+
+    Args:
+        positions: Token positions, ascending
+
+    Returns:
+        LEB128 varints of the gaps between positions (the first gap is from 0)
+    """
+    encoded = bytearray()
+    previous = 0
+    for position in positions:
+        gap = position - previous
+        previous = position
+        while gap >= 0x80:
+            encoded.append((gap & 0x7F) | 0x80)
+            gap >>= 7
+        encoded.append(gap)
+    return bytes(encoded)
+
+def decode_positions(encoded) -> List[int]:
+    """
+    Decode positions written by encode_positions
+
+    Args:
+        encoded: Bytes-like varint deltas
+
+    Returns:
+        Token positions, ascending
+    """
+    positions = []
+    position = 0
+    gap = 0
+    shift = 0
+    for byte in encoded:
+        gap |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        position += gap
+        positions.append(position)
+        gap = 0
+        shift = 0
+    return positions
+
+class PositionList:
+    """
+    Delta-encoded token positions for a single term, one entry per posting of the term
+    """
+
+    __slots__ = ("offsets", "data")
+
+    def __init__(self):
+        self.offsets = array('I', [0])  # Posting index -> start of its positions in data
+        self.data = bytearray()  # Concatenated varint-encoded positions
+
+    def append(self, positions: List[int]):
+        """Append the positions of the next posting"""
+        self.data += encode_positions(positions)
+        self.offsets.append(len(self.data))
+
+    def get(self, i: int) -> List[int]:
+        """Decode the positions of the i-th posting"""
+        return decode_positions(self.data[self.offsets[i]:self.offsets[i + 1]])
+
+def phrase_match(position_lists: List[List[int]]) -> bool:
+    """
+    Check whether terms occur consecutively
+
+    Args:
+        position_lists: Positions of each phrase term, in phrase order
+
+    Returns:
+        True if some position p has term i at p + i for every term
+    """
+    if not position_lists or not all(position_lists):
+        return False
+
+    starts = set(position_lists[0])
+    for i, positions in enumerate(position_lists[1:], start=1):
+        starts &= {position - i for position in positions}
+        if not starts:
+            return False
+    return True
+
+def min_window(position_lists: List[List[int]]) -> Optional[int]:
+    """
+    Length of the shortest token window containing every term at least once
+
+    Args:
+        position_lists: Non-empty, ascending positions of each term
+
+    Returns:
+        Window length in tokens, or None if a list is empty
+    """
+    if not position_lists or not all(position_lists):
+        return None
+
+    # Advance the list holding the leftmost position until one list runs out
+    heap = [(positions[0], i, 0) for i, positions in enumerate(position_lists)]
+    heapq.heapify(heap)
+    right = max(position for position, _, _ in heap)
+    best = right - heap[0][0] + 1
+    while True:
+        left, i, j = heapq.heappop(heap)
+        best = min(best, right - left + 1)
+        if j + 1 == len(position_lists[i]):
+            return best
+        position = position_lists[i][j + 1]
+        right = max(right, position)
+        heapq.heappush(heap, (position, i, j + 1))
+
+def proximity_score(position_lists: List[List[int]], num_terms: int) -> float:
+    """
+    How closely the query terms found in a document occur together
+
+    Args:
+        position_lists: Positions of each query term present in the document
+        num_terms: Number of distinct query terms
+
+    Returns:
+        Score in [0, 1]: 1.0 when all query terms appear side by side, 0.0 when fewer than two occur
+    """
+    present = [positions for positions in position_lists if positions]
+    if len(present) < 2 or num_terms < 2:
+        return 0.0
+
+    # Tightest possible window for the present terms is len(present)
+    window = min_window(present)
+    return (len(present) - 1) / (window - 1) * len(present) / num_terms
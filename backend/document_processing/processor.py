@@ -1,24 +1,77 @@
 import os
+import time
 import tempfile
 import shutil
-from typing import List, Dict, Any, Optional, BinaryIO
+import tarfile
+import zipfile
+from typing import List, Dict, Any, Optional, BinaryIO, Iterator, Tuple
 import uuid
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from .parser import DocumentParser
-from .vectordb import VectorDatabase
+from .vectordb import ShardedVectorDatabase
+from .parse_cache import ParseCache
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+COPY_BLOCK_SIZE = 1 << 20  # Bytes copied at a time when saving an upload
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt")
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+class IngestionCancelled(Exception):
+    """Raised when a session is cleared while one of its uploads is being ingested"""
 
 class DocumentProcessor:
     """
     Process uploaded documents and store them in the vector database
     """
     
-    def __init__(self, vector_db: Optional[VectorDatabase] = None):
+    def __init__(
+        self,
+        vector_db: Optional[ShardedVectorDatabase] = None,
+        batch_size: Optional[int] = None,
+        parse_cache: Optional[ParseCache] = None,
+        table_extraction: Optional[str] = None
+    ):
         """
         Initialize the document processor
         
         Args:
-            vector_db: Vector database to use (creates a new one if None)
+            vector_db: Session-partitioned vector database to use (creates a new one if None)
+            batch_size: Chunks indexed per batch during ingestion (defaults to INGEST_BATCH_SIZE, 256)
+            parse_cache: Cache of parsed uploads (if None, one is created in PARSE_CACHE_DIR and
+                sized from PARSE_CACHE_MB, default 512; 0 disables it)
+            table_extraction: "inline" to extract PDF tables during the upload, or "deferred" to
+                index the text first and add tables from a background pass (if None, uses
+                PDF_TABLE_EXTRACTION, default "inline")
+        
+        Raises:
+            ValueError: For an unknown table extraction mode
         """
-        self.vector_db = vector_db or VectorDatabase()
+        self.vector_db = vector_db or ShardedVectorDatabase()
+        self.batch_size = batch_size or int(os.environ.get("INGEST_BATCH_SIZE", 256))
+        self.batch_max_files = int(os.environ.get("BATCH_MAX_FILES", 100))
+        self.batch_max_bytes = int(float(os.environ.get("BATCH_MAX_MB", 1024)) * 1024 * 1024)
+        
+        if parse_cache is None:
+            cache_mb = float(os.environ.get("PARSE_CACHE_MB", 512))
+            if cache_mb > 0:
+                cache_dir = os.environ.get("PARSE_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "research-agent-parse-cache")
+                parse_cache = ParseCache(cache_dir, int(cache_mb * 1024 * 1024))
+        self.parse_cache = parse_cache
+        
+        self.table_extraction = (table_extraction or os.environ.get("PDF_TABLE_EXTRACTION", "inline")).lower()
+        if self.table_extraction not in ("inline", "deferred"):
+            raise ValueError(f"Unsupported table extraction mode: {self.table_extraction}")
+        self._table_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tables")
+        
+        self._lock = threading.Lock()  # Guards uploaded_files, the counters, and shard lookups against clear_session
+        self._ingesting = {}  # session_id -> cancellation flags of its ingestions in progress
+        self.fallback_pages = 0  # PDF pages re-extracted with pdfplumber, across all uploads
         self.temp_dir = tempfile.mkdtemp()
         self.uploaded_files = {}  # session_id -> {file_id -> file_info}
     
@@ -41,39 +94,524 @@ class DocumentProcessor:
         Returns:
             Information about the processed file
         """
+        return self.ingest_file(self.save_upload(file, filename), session_id)
+    
+    def save_upload(self, file: BinaryIO, filename: str) -> Dict[str, str]:
+        """
+        Stream an upload to a temporary location, one block at a time
+        
+        Args:
+            file: File-like object
+            filename: Original filename
+            
+        Returns:
+            The saved upload (file_id, filename, path, digest), to pass to ingest_file
+        """
         # Create a unique ID for this file
         file_id = str(uuid.uuid4())
         
-        # Save the file to a temporary location
         file_extension = os.path.splitext(filename)[1].lower()
         temp_path = os.path.join(self.temp_dir, f"{file_id}{file_extension}")
         
-        with open(temp_path, 'wb') as f:
-            f.write(file.read())
+        digest = self._save_upload(file, temp_path)
+        return {"file_id": file_id, "filename": filename, "path": temp_path, "digest": digest}
+    
+    def save_batch(self, files: List[Tuple[BinaryIO, str]]) -> List[Dict[str, str]]:
+        """
+        Save the files of a bulk upload, expanding zip and tar archives
         
-        # Parse the document
-        chunks = DocumentParser.parse_document(temp_path, filename)
+        Archive members are saved under their base name; directories and members of
+        unsupported types are skipped.
         
-        # Add to vector database
-        doc_ids = self.vector_db.add_documents(chunks)
+        Args:
+            files: (file-like object, original filename) per uploaded file
+            
+        Returns:
+            The saved uploads, to pass to ingest_batch
+            
+        Raises:
+            ValueError: For an unsupported file type, an unreadable archive, or a batch over
+                BATCH_MAX_FILES files or BATCH_MAX_MB of documents (nothing is kept then)
+        """
+        uploads = []
+        try:
+            for file, filename in files:
+                if filename.lower().endswith(ARCHIVE_EXTENSIONS):
+                    members = self._archive_members(file, filename)
+                elif os.path.splitext(filename)[1].lower() in SUPPORTED_EXTENSIONS:
+                    members = iter(((file, filename),))
+                else:
+                    raise ValueError(f"Unsupported file type: {filename}")
+                
+                for member, member_name in members:
+                    if len(uploads) >= self.batch_max_files:
+                        raise ValueError(f"Batch exceeds {self.batch_max_files} files")
+                    uploads.append(self.save_upload(member, member_name))
+            
+            total_bytes = sum(os.path.getsize(upload["path"]) for upload in uploads)
+            if total_bytes > self.batch_max_bytes:
+                raise ValueError(f"Batch exceeds {self.batch_max_bytes // (1024 * 1024)} MB")
+        except Exception:
+            for upload in uploads:
+                self.discard_upload(upload)
+            raise
+        return uploads
+    
+    def _archive_members(self, file: BinaryIO, filename: str) -> Iterator[Tuple[BinaryIO, str]]:
+        """
+        Supported documents inside a zip or tar archive
+        
+        Args:
+            file: Archive file-like object (must be seekable for zip)
+            filename: Archive filename
+            
+        Returns:
+            Iterator over (member file-like object, member base name)
+            
+        Raises:
+            ValueError: If the archive cannot be read or its documents add up to more than
+                BATCH_MAX_MB uncompressed
+        """
+        total_bytes = 0
+        try:
+            if filename.lower().endswith(".zip"):
+                with zipfile.ZipFile(file) as archive:
+                    for info in archive.infolist():
+                        name = os.path.basename(info.filename)
+                        if info.is_dir() or os.path.splitext(name)[1].lower() not in SUPPORTED_EXTENSIONS:
+                            continue
+                        # Check declared sizes before inflating anything
+                        total_bytes += info.file_size
+                        if total_bytes > self.batch_max_bytes:
+                            raise ValueError(f"{filename} exceeds {self.batch_max_bytes // (1024 * 1024)} MB uncompressed")
+                        with archive.open(info) as member:
+                            yield member, name
+            else:
+                with tarfile.open(fileobj=file, mode="r:*") as archive:
+                    for info in archive:
+                        # Links and devices are skipped, only regular files are read
+                        name = os.path.basename(info.name)
+                        if not info.isfile() or os.path.splitext(name)[1].lower() not in SUPPORTED_EXTENSIONS:
+                            continue
+                        total_bytes += info.size
+                        if total_bytes > self.batch_max_bytes:
+                            raise ValueError(f"{filename} exceeds {self.batch_max_bytes // (1024 * 1024)} MB uncompressed")
+                        yield archive.extractfile(info), name
+        except (zipfile.BadZipFile, tarfile.TarError) as e:
+            raise ValueError(f"Cannot read archive {filename}: {e}")
+    
+    def discard_upload(self, upload: Dict[str, str]):
+        """
+        Remove a saved upload that will not be ingested
+        
+        Args:
+            upload: Saved upload returned by save_upload
+        """
+        try:
+            os.remove(upload["path"])
+        except OSError:
+            pass
+    
+    def ingest_file(
+        self,
+        upload: Dict[str, str],
+        session_id: str,
+        progress: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Parse and index a saved upload; chunks become searchable batch by batch
+        
+        Args:
+            upload: Saved upload returned by save_upload
+            session_id: Session ID for tracking uploads
+            progress: If given, kept up to date while ingesting (total_pages, pages_parsed
+                and fallback_pages for PDFs, chunks_indexed)
+            
+        Returns:
+            Information about the processed file
+        """
+        file_id = upload["file_id"]
+        filename = upload["filename"]
+        temp_path = upload["path"]
+        digest = upload["digest"]
+        file_extension = os.path.splitext(filename)[1].lower()
+        
+        # With deferred table extraction, PDF text becomes searchable first and tables follow
+        defer_tables = self.table_extraction == "deferred" and file_extension == ".pdf"
+        stats = progress if progress is not None else {}
+        cancelled = self._begin_ingest(session_id)
+        try:
+            doc_ids = self._index_chunks(
+                self._iter_chunks(temp_path, filename, digest, "text" if defer_tables else "", stats),
+                session_id,
+                stats,
+                cancelled
+            )
+        except Exception:
+            self._end_ingest(session_id, cancelled)
+            self.discard_upload(upload)
+            raise
+        fallback_pages = stats.get("fallback_pages", 0)
         
         # Store file info
-        if session_id not in self.uploaded_files:
-            self.uploaded_files[session_id] = {}
+        with self._lock:
+            self._end_ingest(session_id, cancelled, locked=True)
+            if cancelled.is_set():
+                # The session was cleared after the last batch; its shard went with it
+                self.discard_upload(upload)
+                raise IngestionCancelled(f"Session was cleared while {filename} was being processed")
+            if session_id not in self.uploaded_files:
+                self.uploaded_files[session_id] = {}
+            
+            self.uploaded_files[session_id][file_id] = {
+                "filename": filename,
+                "path": temp_path,
+                "chunk_count": len(doc_ids),
+                "doc_ids": doc_ids,
+                "tables_pending": defer_tables,
+                "fallback_pages": fallback_pages
+            }
+            self.fallback_pages += fallback_pages
         
-        self.uploaded_files[session_id][file_id] = {
-            "filename": filename,
-            "path": temp_path,
-            "chunk_count": len(chunks),
-            "doc_ids": doc_ids
-        }
+        if defer_tables:
+            self._table_executor.submit(self._extract_tables, session_id, file_id, temp_path, filename, digest)
         
         return {
             "file_id": file_id,
             "filename": filename,
-            "chunk_count": len(chunks)
+            "chunk_count": len(doc_ids),
+            "tables_pending": defer_tables,
+            "fallback_pages": fallback_pages
         }
     
+    def ingest_batch(
+        self,
+        uploads: List[Dict[str, str]],
+        session_id: str,
+        progress: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Parse saved uploads in parallel and index all their chunks in one batched write
+        
+        A file that fails to parse is reported in its result and does not stop the others.
+        
+        Args:
+            uploads: Saved uploads returned by save_batch or save_upload
+            session_id: Session ID for tracking uploads
+            progress: If given, kept up to date while ingesting (files_total, files_parsed,
+                chunks_indexed)
+            
+        Returns:
+            Per-file results (as from ingest_file, or file_id, filename and error) and
+            totals: files, failed, chunks, pages_parsed (none for cache hits), bytes,
+            parse/index/total seconds and throughput
+        """
+        start = time.perf_counter()
+        cancelled = self._begin_ingest(session_id)
+        stats = progress if progress is not None else {}
+        stats["files_total"] = len(uploads)
+        stats["files_parsed"] = 0
+        
+        # With deferred table extraction, PDF tables follow from the background pass as usual
+        defer = [self.table_extraction == "deferred" and os.path.splitext(upload["filename"])[1].lower() == ".pdf"
+                 for upload in uploads]
+        parts = ["text" if deferred else "" for deferred in defer]
+        chunks_per_file = [None] * len(uploads)
+        errors = [None] * len(uploads)
+        file_stats = [{} for _ in uploads]
+        
+        try:
+            # Files parsed before come from the cache, the rest are parsed together
+            to_parse = []
+            for i, upload in enumerate(uploads):
+                cached = None
+                if self.parse_cache is not None:
+                    cached = self.parse_cache.get(self._cache_key(upload, parts[i]), upload["filename"])
+                if cached is not None:
+                    chunks_per_file[i] = list(cached)
+                    stats["files_parsed"] += 1
+                else:
+                    to_parse.append(i)
+        
+            parsed = DocumentParser.parse_many(
+                [(uploads[i]["path"], uploads[i]["filename"]) for i in to_parse],
+                tables=self.table_extraction != "deferred"
+            )
+            for j, chunks, parse_stats, error in parsed:
+                i = to_parse[j]
+                if error is not None:
+                    logger.error(f"Error parsing {uploads[i]['filename']}: {error}")
+                    errors[i] = str(error)
+                else:
+                    if self.parse_cache is not None:
+                        self.parse_cache.put(self._cache_key(uploads[i], parts[i]), chunks)
+                    chunks_per_file[i] = chunks
+                    file_stats[i] = parse_stats
+                stats["files_parsed"] += 1
+            parse_seconds = time.perf_counter() - start
+        
+            # One write for the whole batch
+            index_start = time.perf_counter()
+            all_chunks = [chunk for chunks in chunks_per_file if chunks for chunk in chunks]
+            doc_ids = self._add_documents(all_chunks, session_id, cancelled)
+        except Exception:
+            self._end_ingest(session_id, cancelled)
+            for upload in uploads:
+                self.discard_upload(upload)
+            raise
+        stats["chunks_indexed"] = len(doc_ids)
+        index_seconds = time.perf_counter() - index_start
+        
+        results = []
+        offset = 0
+        with self._lock:
+            self._end_ingest(session_id, cancelled, locked=True)
+            if cancelled.is_set():
+                for upload in uploads:
+                    self.discard_upload(upload)
+                raise IngestionCancelled("Session was cleared while the batch was being processed")
+            files = self.uploaded_files.setdefault(session_id, {})
+            for i, upload in enumerate(uploads):
+                if errors[i] is not None:
+                    results.append({"file_id": upload["file_id"], "filename": upload["filename"], "error": errors[i]})
+                    continue
+                file_doc_ids = doc_ids[offset:offset + len(chunks_per_file[i])]
+                offset += len(file_doc_ids)
+                fallback_pages = file_stats[i].get("fallback_pages", 0)
+                files[upload["file_id"]] = {
+                    "filename": upload["filename"],
+                    "path": upload["path"],
+                    "chunk_count": len(file_doc_ids),
+                    "doc_ids": file_doc_ids,
+                    "tables_pending": defer[i],
+                    "fallback_pages": fallback_pages
+                }
+                self.fallback_pages += fallback_pages
+                results.append({
+                    "file_id": upload["file_id"],
+                    "filename": upload["filename"],
+                    "chunk_count": len(file_doc_ids),
+                    "tables_pending": defer[i],
+                    "fallback_pages": fallback_pages
+                })
+        
+        for i, upload in enumerate(uploads):
+            if errors[i] is not None:
+                self.discard_upload(upload)
+            elif defer[i]:
+                self._table_executor.submit(self._extract_tables, session_id, upload["file_id"],
+                                            upload["path"], upload["filename"], upload["digest"])
+        
+        seconds = time.perf_counter() - start
+        total_bytes = sum(os.path.getsize(upload["path"]) for i, upload in enumerate(uploads) if errors[i] is None)
+        pages_parsed = sum(file_stats[i].get("pages_parsed", 0) for i in range(len(uploads)))
+        logger.info(f"Indexed {len(doc_ids)} chunks from {len(uploads)} files in {seconds:.2f}s")
+        return {
+            "files": results,
+            "totals": {
+                "files": len(uploads),
+                "failed": sum(error is not None for error in errors),
+                "chunks": len(doc_ids),
+                "pages_parsed": pages_parsed,
+                "bytes": total_bytes,
+                "parse_seconds": round(parse_seconds, 3),
+                "index_seconds": round(index_seconds, 3),
+                "seconds": round(seconds, 3),
+                "files_per_second": round(len(uploads) / seconds, 2) if seconds else None,
+                "mb_per_second": round(total_bytes / (1024 * 1024) / seconds, 2) if seconds else None,
+                "chunks_per_second": round(len(doc_ids) / seconds, 1) if seconds else None
+            }
+        }
+    
+    @staticmethod
+    def _cache_key(upload: Dict[str, str], part: str = "") -> str:
+        """Parse cache key of a saved upload (see _iter_chunks)"""
+        return ParseCache.key(upload["digest"], os.path.splitext(upload["filename"])[1], DocumentParser.chunker.key, part)
+    
+    def _iter_chunks(
+        self,
+        path: str,
+        filename: str,
+        digest: str,
+        part: str = "",
+        stats: Optional[Dict[str, int]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Chunks of a saved upload, from the parse cache when the same bytes were parsed before
+        
+        Args:
+            path: Path of the saved upload
+            filename: Original filename
+            digest: Hex SHA-256 of the contents
+            part: "" for the whole document, "text" or "tables" for one of the two PDF passes
+            stats: If given, filled with parser counters (nothing is parsed on a cache hit)
+            
+        Returns:
+            Iterator over chunks with metadata
+        """
+        text = part != "tables"
+        tables = part != "text"
+        if self.parse_cache is None:
+            return DocumentParser.iter_document(path, filename, text, tables, stats=stats)
+        
+        cache_key = ParseCache.key(digest, os.path.splitext(filename)[1], DocumentParser.chunker.key, part)
+        chunks = self.parse_cache.get(cache_key, filename)
+        if chunks is None:
+            chunks = self.parse_cache.record(cache_key, DocumentParser.iter_document(path, filename, text, tables, stats=stats))
+        return chunks
+    
+    def _index_chunks(
+        self,
+        chunks: Iterator[Dict[str, Any]],
+        session_id: str,
+        stats: Optional[Dict[str, Any]] = None,
+        cancelled: Optional[threading.Event] = None
+    ) -> List[str]:
+        """
+        Index chunks in batches as they arrive, so only one batch is held in memory
+        
+        Args:
+            chunks: Chunks to index
+            session_id: Session ID
+            stats: If given, "chunks_indexed" is kept up to date
+            cancelled: Cancellation flag from _begin_ingest
+            
+        Returns:
+            IDs of the indexed chunks (none are left indexed if an error is raised)
+            
+        Raises:
+            IngestionCancelled: If the session is cleared meanwhile
+        """
+        doc_ids = []
+        try:
+            batch = []
+            for chunk in chunks:
+                batch.append(chunk)
+                if len(batch) >= self.batch_size:
+                    doc_ids.extend(self._add_documents(batch, session_id, cancelled))
+                    batch = []
+                    if stats is not None:
+                        stats["chunks_indexed"] = len(doc_ids)
+            doc_ids.extend(self._add_documents(batch, session_id, cancelled))
+            if stats is not None:
+                stats["chunks_indexed"] = len(doc_ids)
+        except Exception:
+            # Do not leave a partially indexed file (or cache entry) behind
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+            self.vector_db.delete_documents(doc_ids, session_id)
+            raise
+        return doc_ids
+    
+    def _begin_ingest(self, session_id: str) -> threading.Event:
+        """Register an ingestion into a session; returns the flag clear_session sets to cancel it"""
+        cancelled = threading.Event()
+        with self._lock:
+            self._ingesting.setdefault(session_id, []).append(cancelled)
+        return cancelled
+    
+    def _end_ingest(self, session_id: str, cancelled: threading.Event, locked: bool = False):
+        """Unregister an ingestion (locked: the caller already holds the lock)"""
+        if not locked:
+            with self._lock:
+                return self._end_ingest(session_id, cancelled, locked=True)
+        flags = self._ingesting.get(session_id, [])
+        if cancelled in flags:
+            flags.remove(cancelled)
+        if not flags:
+            self._ingesting.pop(session_id, None)
+    
+    def _add_documents(
+        self,
+        chunks: List[Dict[str, Any]],
+        session_id: str,
+        cancelled: Optional[threading.Event] = None
+    ) -> List[str]:
+        """
+        Write chunks to the session's index, unless the ingestion was cancelled
+        
+        The shard is looked up under the lock but written without it, so sessions index
+        concurrently. A session cleared meanwhile takes the written chunks with its
+        dropped shard instead of getting a new one.
+        
+        Raises:
+            IngestionCancelled: If the session was cleared since the ingestion began
+        """
+        if not chunks:
+            return []
+        with self._lock:
+            if cancelled is not None and cancelled.is_set():
+                raise IngestionCancelled("Session was cleared during ingestion")
+            shard = self.vector_db.get_shard(session_id, create=True)
+        
+        doc_ids = self.vector_db.add_documents(chunks, session_id, shard)
+        
+        with self._lock:
+            if cancelled is not None and cancelled.is_set():
+                raise IngestionCancelled("Session was cleared during ingestion")
+        return doc_ids
+    
+    def _extract_tables(self, session_id: str, file_id: str, path: str, filename: str, digest: str):
+        """
+        Background pass adding the table chunks of a PDF whose text is already indexed
+        
+        Args:
+            session_id: Session ID
+            file_id: File ID
+            path: Path of the saved upload
+            filename: Original filename
+            digest: Hex SHA-256 of the contents
+        """
+        stats = {}
+        cancelled = self._begin_ingest(session_id)
+        try:
+            doc_ids = self._index_chunks(self._iter_chunks(path, filename, digest, "tables", stats), session_id, None, cancelled)
+        except IngestionCancelled:
+            logger.info(f"Table extraction for {filename} cancelled, its session was cleared")
+            doc_ids = []
+        except Exception as e:
+            logger.error(f"Table extraction failed for {filename}: {e}")
+            doc_ids = []
+        
+        with self._lock:
+            self._end_ingest(session_id, cancelled, locked=True)
+            self.fallback_pages += stats.get("fallback_pages", 0)
+            file_info = self.uploaded_files.get(session_id, {}).get(file_id)
+            if file_info is not None:
+                file_info["doc_ids"].extend(doc_ids)
+                file_info["chunk_count"] += len(doc_ids)
+                file_info["tables_pending"] = False
+                file_info["fallback_pages"] += stats.get("fallback_pages", 0)
+        
+        if file_info is None:
+            # The file was deleted while its tables were being extracted
+            self.vector_db.delete_documents(doc_ids, session_id)
+        else:
+            logger.info(f"Added {len(doc_ids)} table chunks for {filename}")
+    
+    @staticmethod
+    def _save_upload(file: BinaryIO, path: str) -> str:
+        """
+        Copy an upload to disk block by block, hashing it on the way
+        
+        Args:
+            file: File-like object
+            path: Destination path
+            
+        Returns:
+            Hex SHA-256 of the contents
+        """
+        digest = hashlib.sha256()
+        with open(path, 'wb') as f:
+            while True:
+                block = file.read(COPY_BLOCK_SIZE)
+                if not block:
+                    break
+                digest.update(block)
+                f.write(block)
+        return digest.hexdigest()
+    
     def get_file_info(self, session_id: str, file_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Get information about uploaded files
@@ -96,13 +634,22 @@ class DocumentProcessor:
                     {
                         "file_id": fid,
                         "filename": info["filename"],
-                        "chunk_count": info["chunk_count"]
+                        "chunk_count": info["chunk_count"],
+                        "tables_pending": info.get("tables_pending", False),
+                        "fallback_pages": info.get("fallback_pages", 0)
                     }
                     for fid, info in self.uploaded_files[session_id].items()
                 ]
             }
     
-    def search_documents(self, query: str, session_id: str, top_k: int = 5) -> List[Dict[str, Any]]:
+    def search_documents(
+        self,
+        query: str,
+        session_id: str,
+        top_k: int = 5,
+        timings: Optional[Dict[str, float]] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
         """
         Search for documents similar to the query
         
@@ -110,11 +657,13 @@ class DocumentProcessor:
             query: Query text
             session_id: Session ID
             top_k: Number of results to return
+            timings: If given, filled with per-stage retrieval durations in milliseconds
+            filters: Restrict results by source, chunk_type, table_index, page_from and page_to
             
         Returns:
             List of document chunks with similarity scores
         """
-        return self.vector_db.search(query, top_k)
+        return self.vector_db.search(query, session_id, top_k, timings, filters)
     
     def delete_file(self, session_id: str, file_id: str):
         """
@@ -124,19 +673,18 @@ class DocumentProcessor:
             session_id: Session ID
             file_id: File ID to delete
         """
-        if session_id in self.uploaded_files and file_id in self.uploaded_files[session_id]:
+        # Remove from uploaded_files first, so a pending table pass sees the file is gone
+        with self._lock:
+            file_info = self.uploaded_files.get(session_id, {}).pop(file_id, None)
+        
+        if file_info is not None:
             # Delete temporary file
             try:
-                file_info = self.uploaded_files[session_id][file_id]
-                os.remove(file_info["path"])
-                
                 # Remove document IDs from vector database
                 if "doc_ids" in file_info:
-                    # Note: In a real implementation, you would remove these from the vector DB
-                    pass
+                    self.vector_db.delete_documents(file_info["doc_ids"], session_id)
                 
-                # Remove from uploaded_files
-                del self.uploaded_files[session_id][file_id]
+                os.remove(file_info["path"])
             except Exception as e:
                 print(f"Error deleting file: {e}")
     
@@ -147,13 +695,18 @@ class DocumentProcessor:
         Args:
             session_id: Session ID
         """
-        if session_id in self.uploaded_files:
+        # Remove from uploaded_files, cancel ingestions in progress and drop the session's
+        # index shard together, so no ingestion writes to it afterwards
+        with self._lock:
+            files = self.uploaded_files.pop(session_id, None)
+            for cancelled in self._ingesting.get(session_id, []):
+                cancelled.set()
+            self.vector_db.drop_session(session_id)
+        
+        if files is not None:
             # Delete temporary files
-            for file_info in self.uploaded_files[session_id].values():
+            for file_info in files.values():
                 try:
                     os.remove(file_info["path"])
                 except:
-                    pass
-            
-            # Remove from uploaded_files
-            del self.uploaded_files[session_id]
\ No newline at end of file
+                    pass
\ No newline at end of file
@@ -0,0 +1,703 @@
+import os
+import sys
+import json
+import math
+import mmap
+import heapq
+import struct
+import logging
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import MutableMapping
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator, Sequence
+from .index import InvertedIndex
+from .positions import decode_positions
+from .chunks import ChunkStore
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SEGMENT_MAGIC = b"NXSEG001"
+SEGMENT_SUFFIX = ".seg"
+MANIFEST_FILE = "manifest.json"
+TOMBSTONES_FILE = "deleted.bin"
+
+def write_segment(
+    path: str,
+    indexes: List[InvertedIndex],
+    doc_ids: List[str],
+    documents: Iterable[Optional[Dict[str, Any]]]
+):
+    """
+    Write indexes and their documents to an immutable segment file
+
+    Layout: magic, then 8-byte aligned sections (term dictionary, postings arrays,
+    optional token positions, document lengths, chunk id/content/metadata blobs with
+    offset tables), then a JSON footer describing the sections, then the footer offset
+    as uint64. Positions are kept only if every index stores them.
+
+    Args:
+        path: Segment file to create (written to a temporary file, then renamed)
+        indexes: Indexes whose ordinals are concatenated in order (may be empty for a document-only segment)
+        doc_ids: Document ID per ordinal
+        documents: Document per ordinal, None for deleted placeholders
+    """
+    bases = []
+    base = 0
+    for index in indexes:
+        bases.append(base)
+        base += len(index)
+
+    # Term dictionary sorted by UTF-8 bytes, so lookups can binary search the raw blob
+    terms = set()
+    for index in indexes:
+        terms.update(index.postings.keys())
+    encoded_terms = sorted(term.encode('utf-8') for term in terms)
+
+    term_blob = bytearray()
+    term_offsets = array('Q', [0])
+    posting_offsets = array('Q', [0])
+    max_tfs = array('I')
+    min_lengths = array('I')
+    ordinals = array('I')
+    freqs = array('I')
+    positional = bool(indexes) and all(index.positional for index in indexes)
+    position_offsets = array('Q', [0])  # posting -> start of its positions in position_blob
+    position_blob = bytearray()
+    for encoded in encoded_terms:
+        term = encoded.decode('utf-8')
+        term_blob += encoded
+        term_offsets.append(len(term_blob))
+
+        max_tf = 0
+        min_length = None
+        for index, base in zip(indexes, bases):
+            posting_list = index.postings.get(term)
+            if posting_list is None:
+                continue
+            if base:
+                ordinals.extend(ordinal + base for ordinal in posting_list.ordinals)
+            else:
+                ordinals.frombytes(posting_list.ordinals.tobytes())
+            freqs.frombytes(posting_list.freqs.tobytes())
+            if positional:
+                offsets, data = index.position_block(term)
+                start = len(position_blob)
+                position_offsets.extend(start + offset for offset in offsets[1:])
+                position_blob += data
+            max_tf = max(max_tf, posting_list.max_tf)
+            min_length = posting_list.min_length if min_length is None else min(min_length, posting_list.min_length)
+
+        posting_offsets.append(len(ordinals))
+        max_tfs.append(max_tf)
+        min_lengths.append(min_length or 0)
+
+    doc_lengths = array('I')
+    for index in indexes:
+        doc_lengths.frombytes(index.doc_lengths.tobytes())
+
+    # Chunk table: IDs, contents and remaining fields (JSON) addressed by offsets
+    id_blob, content_blob, extra_blob = bytearray(), bytearray(), bytearray()
+    id_offsets, content_offsets, extra_offsets = array('Q', [0]), array('Q', [0]), array('Q', [0])
+    for doc_id, doc in zip(doc_ids, documents):
+        id_blob += doc_id.encode('utf-8')
+        if doc is not None:
+            content_blob += doc["content"].encode('utf-8')
+            extra_blob += json.dumps({key: value for key, value in doc.items() if key not in ("id", "content")}).encode('utf-8')
+        id_offsets.append(len(id_blob))
+        content_offsets.append(len(content_blob))
+        extra_offsets.append(len(extra_blob))
+
+    sections = [
+        ("term_offsets", term_offsets), ("term_blob", term_blob),
+        ("posting_offsets", posting_offsets), ("max_tfs", max_tfs), ("min_lengths", min_lengths),
+        ("ordinals", ordinals), ("freqs", freqs), ("doc_lengths", doc_lengths),
+        ("position_offsets", position_offsets), ("position_blob", position_blob),
+        ("id_offsets", id_offsets), ("id_blob", id_blob),
+        ("content_offsets", content_offsets), ("content_blob", content_blob),
+        ("extra_offsets", extra_offsets), ("extra_blob", extra_blob),
+    ]
+
+    k1, b = (indexes[0].k1, indexes[0].b) if indexes else (1.5, 0.75)
+    footer = {
+        "byteorder": sys.byteorder,
+        "num_docs": len(doc_ids),
+        "num_terms": len(encoded_terms),
+        "total_length": sum(index.total_length for index in indexes),
+        "k1": k1,
+        "b": b,
+        "positional": positional,
+        "sections": {},
+    }
+
+    temp_path = path + ".tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(SEGMENT_MAGIC)
+        for name, data in sections:
+            typecode = data.typecode if isinstance(data, array) else 'B'
+            payload = data.tobytes() if isinstance(data, array) else bytes(data)
+            f.write(b"\0" * (-f.tell() % 8))
+            footer["sections"][name] = [f.tell(), len(payload), typecode]
+            f.write(payload)
+
+        footer_offset = f.tell()
+        f.write(json.dumps(footer).encode('utf-8'))
+        f.write(struct.pack('<Q', footer_offset))
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(temp_path, path)
+
+class SegmentPostingList:
+    """
+    Read-only posting list whose arrays are views into a memory-mapped segment
+    """
+
+    __slots__ = ("ordinals", "freqs", "max_tf", "min_length")
+
+    def __init__(self, ordinals: memoryview, freqs: memoryview, max_tf: int, min_length: int):
+        self.ordinals = ordinals
+        self.freqs = freqs
+        self.max_tf = max_tf
+        self.min_length = min_length
+
+    def __len__(self) -> int:
+        return len(self.ordinals)
+
+class SegmentPostings:
+    """
+    Read-only term -> posting list mapping backed by a segment's sorted term dictionary
+    """
+
+    def __init__(self, segment: 'Segment'):
+        self._term_offsets = segment.section("term_offsets")
+        self._term_blob = segment.section("term_blob")
+        self._posting_offsets = segment.section("posting_offsets")
+        self._max_tfs = segment.section("max_tfs")
+        self._min_lengths = segment.section("min_lengths")
+        self._ordinals = segment.section("ordinals")
+        self._freqs = segment.section("freqs")
+        self._num_terms = segment.num_terms
+
+    def __len__(self) -> int:
+        return self._num_terms
+
+    def _term_bytes(self, i: int) -> bytes:
+        return self._term_blob[self._term_offsets[i]:self._term_offsets[i + 1]].tobytes()
+
+    def _find(self, term: str) -> int:
+        """Binary search the term dictionary, returning -1 if the term is absent"""
+        target = term.encode('utf-8')
+        low, high = 0, self._num_terms
+        while low < high:
+            mid = (low + high) // 2
+            if self._term_bytes(mid) < target:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self._num_terms and self._term_bytes(low) == target:
+            return low
+        return -1
+
+    def _posting_list(self, i: int) -> SegmentPostingList:
+        start, stop = self._posting_offsets[i], self._posting_offsets[i + 1]
+        return SegmentPostingList(self._ordinals[start:stop], self._freqs[start:stop], self._max_tfs[i], self._min_lengths[i])
+
+    def get(self, term: str, default=None) -> Optional[SegmentPostingList]:
+        i = self._find(term)
+        return self._posting_list(i) if i >= 0 else default
+
+    def __getitem__(self, term: str) -> SegmentPostingList:
+        i = self._find(term)
+        if i < 0:
+            raise KeyError(term)
+        return self._posting_list(i)
+
+    def __contains__(self, term: str) -> bool:
+        return self._find(term) >= 0
+
+    def keys(self) -> Iterator[str]:
+        for i in range(self._num_terms):
+            yield self._term_bytes(i).decode('utf-8')
+
+    __iter__ = keys
+
+class Segment(InvertedIndex):
+    """
+    Immutable, memory-mapped BM25 index segment with its chunk contents
+
+    Opening a segment only maps the file; postings, lengths and chunk contents are
+    read lazily through the page cache. Tombstones are kept in memory.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open a segment file
+
+        Args:
+            path: Segment file written by write_segment
+        """
+        self.path = os.path.abspath(path)
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+        if self._view[:len(SEGMENT_MAGIC)].tobytes() != SEGMENT_MAGIC:
+            raise ValueError(f"Not a segment file: {path}")
+        footer_offset = struct.unpack('<Q', self._view[-8:].tobytes())[0]
+        footer = json.loads(self._view[footer_offset:-8].tobytes().decode('utf-8'))
+        if footer["byteorder"] != sys.byteorder:
+            raise ValueError(f"Segment {path} was written on a {footer['byteorder']}-endian machine")
+
+        self._sections = footer["sections"]
+        self.num_terms = footer["num_terms"]
+        self.num_docs = footer["num_docs"]
+        self.k1 = footer["k1"]
+        self.b = footer["b"]
+        self.total_length = footer["total_length"]
+        self.positional = footer.get("positional", False)
+        self.postings = SegmentPostings(self)
+        self.doc_lengths = self.section("doc_lengths")
+        self.deleted = bytearray(self.num_docs)
+        self.deleted_count = 0
+
+        self._id_offsets = self.section("id_offsets")
+        self._id_blob = self.section("id_blob")
+        self._content_offsets = self.section("content_offsets")
+        self._content_blob = self.section("content_blob")
+        self._extra_offsets = self.section("extra_offsets")
+        self._extra_blob = self.section("extra_blob")
+        if self.positional:
+            self._position_offsets = self.section("position_offsets")
+            self._position_blob = self.section("position_blob")
+
+    def __len__(self) -> int:
+        return self.num_docs
+
+    def section(self, name: str) -> memoryview:
+        """Typed view of a section of the mapped file"""
+        offset, length, typecode = self._sections[name]
+        return self._view[offset:offset + length].cast(typecode)
+
+    def add(self, tokens: List[str]) -> int:
+        raise TypeError("Segments are immutable")
+
+    def extend(self, other: InvertedIndex) -> range:
+        raise TypeError("Segments are immutable")
+
+    def _posting_range(self, term: str) -> Tuple[int, int]:
+        """Range of a term's postings in the segment-wide posting arrays (empty if absent)"""
+        i = self.postings._find(term)
+        if i < 0:
+            return 0, 0
+        return self.postings._posting_offsets[i], self.postings._posting_offsets[i + 1]
+
+    def term_positions(self, term: str, ordinal: int) -> Optional[List[int]]:
+        """
+        Token positions of a term in a document
+
+        Args:
+            term: Index term
+            ordinal: Ordinal within this segment
+
+        Returns:
+            Ascending positions (empty if the document lacks the term), or None if positions are not stored
+        """
+        if not self.positional:
+            return None
+        start, stop = self._posting_range(term)
+        ordinals = self.postings._ordinals
+        i = bisect_left(ordinals, ordinal, start, stop)
+        if i == stop or ordinals[i] != ordinal:
+            return []
+        return decode_positions(self._position_blob[self._position_offsets[i]:self._position_offsets[i + 1]])
+
+    def position_block(self, term: str) -> Tuple[array, memoryview]:
+        """
+        Raw positions of a term for copying into another segment
+
+        Args:
+            term: Index term
+
+        Returns:
+            (offsets, data): offsets starts at 0 and has one more entry than the term's postings
+        """
+        start, stop = self._posting_range(term)
+        first = self._position_offsets[start]
+        offsets = array('Q', (offset - first for offset in self._position_offsets[start:stop + 1]))
+        return offsets, self._position_blob[first:self._position_offsets[stop]]
+
+    def set_tombstones(self, deleted: bytes):
+        """
+        Replace the tombstone flags (one byte per document)
+
+        Args:
+            deleted: Flags loaded from disk or copied from the index this segment replaces
+        """
+        self.deleted = bytearray(deleted)
+        self.deleted_count = self.deleted.count(1)
+
+    def doc_id(self, ordinal: int) -> str:
+        """Document ID stored for an ordinal"""
+        return self._id_blob[self._id_offsets[ordinal]:self._id_offsets[ordinal + 1]].tobytes().decode('utf-8')
+
+    def metadata(self, ordinal: int) -> Optional[Dict[str, Any]]:
+        """
+        Decode a stored document's metadata without its content
+
+        Args:
+            ordinal: Ordinal within this segment
+
+        Returns:
+            Metadata dict, or None for a deleted placeholder
+        """
+        extra_start, extra_stop = self._extra_offsets[ordinal], self._extra_offsets[ordinal + 1]
+        if extra_start == extra_stop:
+            return None
+        return json.loads(self._extra_blob[extra_start:extra_stop].tobytes().decode('utf-8')).get("metadata") or {}
+
+    def document(self, ordinal: int) -> Optional[Dict[str, Any]]:
+        """
+        Decode a stored document
+
+        Args:
+            ordinal: Ordinal within this segment
+
+        Returns:
+            Document dict, or None for a deleted placeholder
+        """
+        extra_start, extra_stop = self._extra_offsets[ordinal], self._extra_offsets[ordinal + 1]
+        if extra_start == extra_stop:
+            return None
+
+        content = self._content_blob[self._content_offsets[ordinal]:self._content_offsets[ordinal + 1]]
+        doc = {"id": self.doc_id(ordinal), "content": content.tobytes().decode('utf-8')}
+        doc.update(json.loads(self._extra_blob[extra_start:extra_stop].tobytes().decode('utf-8')))
+        return doc
+
+class SegmentedIndex:
+    """
+    BM25 index made of immutable parts (usually on-disk segments) plus one appendable in-memory part
+
+    Ordinals run across the parts in order. Scoring uses corpus-wide statistics, so
+    results do not depend on how documents are split between parts.
+    """
+
+    def __init__(self, parts: List[InvertedIndex], memory: Optional[InvertedIndex] = None):
+        """
+        Initialize the segmented index
+
+        Args:
+            parts: Immutable parts, in ordinal order
+            memory: Appendable part receiving new documents (created if None)
+        """
+        self.parts = list(parts)
+        reference = self.parts[0] if self.parts else memory
+        self.k1 = reference.k1 if reference else 1.5
+        self.b = reference.b if reference else 0.75
+        positional = reference.positional if reference else False
+        self.memory = memory if memory is not None else InvertedIndex(self.k1, self.b, positional)
+
+    @property
+    def all_parts(self) -> List[InvertedIndex]:
+        return self.parts + [self.memory]
+
+    def __len__(self) -> int:
+        return sum(len(part) for part in self.all_parts)
+
+    @property
+    def total_length(self) -> int:
+        return sum(part.total_length for part in self.all_parts)
+
+    @property
+    def deleted_count(self) -> int:
+        return sum(part.deleted_count for part in self.all_parts)
+
+    @property
+    def avg_doc_length(self) -> float:
+        size = len(self)
+        return self.total_length / size if size else 0.0
+
+    @property
+    def positional(self) -> bool:
+        """Whether every part stores token positions"""
+        return all(part.positional for part in self.all_parts)
+
+    def term_positions(self, term: str, ordinal: int) -> Optional[List[int]]:
+        """
+        Token positions of a term in a document
+
+        Args:
+            term: Index term
+            ordinal: Document ordinal
+
+        Returns:
+            Ascending positions (empty if the document lacks the term), or None if positions are not indexed
+        """
+        part, local = self._locate(ordinal)
+        return part.term_positions(term, local)
+
+    def _locate(self, ordinal: int) -> Tuple[InvertedIndex, int]:
+        """Find the part holding an ordinal and the ordinal within that part"""
+        for part in self.all_parts:
+            if ordinal < len(part):
+                return part, ordinal
+            ordinal -= len(part)
+        raise IndexError("ordinal out of range")
+
+    def add(self, tokens: List[str]) -> int:
+        """
+        Index a tokenized document in the in-memory part
+
+        Args:
+            tokens: Document tokens
+
+        Returns:
+            Ordinal assigned to the document
+        """
+        offset = len(self) - len(self.memory)
+        return offset + self.memory.add(tokens)
+
+    def extend(self, other: InvertedIndex) -> range:
+        """
+        Append the documents of another index to the in-memory part
+
+        Args:
+            other: Index whose ordinals follow this index's ordinals
+
+        Returns:
+            Ordinals assigned to the appended documents
+        """
+        offset = len(self) - len(self.memory)
+        ordinals = self.memory.extend(other)
+        return range(offset + ordinals.start, offset + ordinals.stop)
+
+    def delete(self, ordinal: int):
+        """
+        Tombstone a document
+
+        Args:
+            ordinal: Document ordinal
+        """
+        part, local = self._locate(ordinal)
+        part.delete(local)
+
+    def idf(self, term: str) -> float:
+        """
+        BM25 inverse document frequency over all parts
+
+        Args:
+            term: Index term
+
+        Returns:
+            IDF weight, 0.0 for unknown terms
+        """
+        df = 0
+        for part in self.all_parts:
+            posting_list = part.postings.get(term)
+            if posting_list is not None:
+                df += len(posting_list)
+        if not df:
+            return 0.0
+        return math.log(1.0 + (len(self) - df + 0.5) / (df + 0.5))
+
+    def _query_terms(self, tokens: Iterable[str]) -> List[Tuple[str, float]]:
+        """Collapse query tokens into (term, weight) pairs for terms present in any part"""
+        query_terms = []
+        for term, qtf in Counter(tokens).items():
+            idf = self.idf(term)
+            if idf:
+                query_terms.append((term, qtf * idf))
+        return query_terms
+
+    def max_score(self, tokens: Iterable[str]) -> float:
+        """
+        Upper bound on the BM25 score any document can reach for a query
+
+        Args:
+            tokens: Query tokens
+
+        Returns:
+            Sum of the saturated term weights
+        """
+        return sum(weight for _, weight in self._query_terms(tokens)) * (self.k1 + 1.0)
+
+    def search(
+        self,
+        tokens: List[str],
+        top_k: int = 5,
+        prune: bool = True,
+        allowed: Optional[Sequence[int]] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Find the best scoring documents across all parts
+
+        Args:
+            tokens: Query tokens
+            top_k: Number of results to return
+            prune: Use MaxScore pruning within each part
+            allowed: If given, only these ordinals (ascending) can be returned
+
+        Returns:
+            List of (ordinal, score) pairs sorted by descending score
+        """
+        if top_k <= 0 or not len(self):
+            return []
+
+        query_terms = self._query_terms(tokens)
+        base = self.k1 * (1.0 - self.b)
+        slope = self.k1 * self.b / (self.avg_doc_length or 1.0)
+
+        results = []
+        offset = 0
+        for part in self.all_parts:
+            part_allowed = None
+            if allowed is not None:
+                # Slice out this part's ordinals and make them local
+                start = bisect_left(allowed, offset)
+                stop = bisect_left(allowed, offset + len(part), start)
+                if start == stop:
+                    offset += len(part)
+                    continue
+                part_allowed = array('I', (ordinal - offset for ordinal in allowed[start:stop]))
+            results.extend(
+                (offset + ordinal, score)
+                for ordinal, score in part.evaluate(query_terms, base, slope, top_k, prune, part_allowed)
+            )
+            offset += len(part)
+
+        return heapq.nlargest(top_k, results, key=lambda item: item[1])
+
+class SegmentedDocuments(MutableMapping):
+    """
+    Document ID -> document mapping that serves flushed documents from segments on demand
+    and keeps only newer documents in memory
+    """
+
+    def __init__(self, documents: Optional[Dict[str, Dict[str, Any]]] = None):
+        """
+        Initialize the mapping
+
+        Args:
+            documents: In-memory documents to start with
+        """
+        # doc_id -> document held in memory
+        self.overlay = documents if isinstance(documents, ChunkStore) else ChunkStore(documents)
+        self.locations = {}  # doc_id -> (segment, ordinal within segment)
+
+    def attach(self, segment: Segment, entries: Iterable[Tuple[str, int]]):
+        """
+        Serve documents from a segment, dropping any in-memory copies
+
+        Args:
+            segment: Segment holding the documents
+            entries: (doc_id, ordinal within segment) pairs
+        """
+        for doc_id, ordinal in entries:
+            self.locations[doc_id] = (segment, ordinal)
+            self.overlay.discard(doc_id)
+
+    def segments(self) -> set:
+        """Segments currently referenced"""
+        return {segment for segment, _ in self.locations.values()}
+
+    def __getitem__(self, doc_id: str) -> Dict[str, Any]:
+        doc = self.overlay.get(doc_id)
+        if doc is not None:
+            return doc
+        segment, ordinal = self.locations[doc_id]
+        return segment.document(ordinal)
+
+    def __setitem__(self, doc_id: str, doc: Dict[str, Any]):
+        self.locations.pop(doc_id, None)
+        self.overlay[doc_id] = doc
+
+    def __delitem__(self, doc_id: str):
+        if not self.overlay.discard(doc_id) and self.locations.pop(doc_id, None) is None:
+            raise KeyError(doc_id)
+
+    def __contains__(self, doc_id) -> bool:
+        return doc_id in self.overlay or doc_id in self.locations
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.overlay
+        yield from self.locations
+
+    def __len__(self) -> int:
+        return len(self.overlay) + len(self.locations)
+
+def read_manifest(directory: str) -> Optional[Dict[str, Any]]:
+    """
+    Read a saved database's manifest
+
+    Args:
+        directory: Database directory
+
+    Returns:
+        Manifest dict, or None if the directory has no segment manifest
+    """
+    path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def write_manifest(directory: str, segments: List[Segment], tombstones: bytes):
+    """
+    Atomically record which segment files make up a database, plus its tombstones
+
+    Segment files in the directory that are no longer listed are removed afterwards.
+
+    Args:
+        directory: Database directory
+        segments: Segments in ordinal order
+        tombstones: One byte per document across all segments
+    """
+    tombstones_path = os.path.join(directory, TOMBSTONES_FILE)
+    with open(tombstones_path + ".tmp", 'wb') as f:
+        f.write(tombstones)
+    os.replace(tombstones_path + ".tmp", tombstones_path)
+
+    manifest = {
+        "version": 1,
+        "segments": [{"file": os.path.basename(segment.path), "docs": len(segment)} for segment in segments],
+        "tombstones": TOMBSTONES_FILE,
+    }
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    with open(manifest_path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+    # Remove segments no longer referenced (may fail on platforms that lock mapped files)
+    listed = {entry["file"] for entry in manifest["segments"]}
+    for name in os.listdir(directory):
+        if name.endswith(SEGMENT_SUFFIX) and name not in listed:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError as e:
+                logger.warning(f"Could not remove old segment {name}: {e}")
+
+def open_segments(directory: str, manifest: Dict[str, Any]) -> List[Segment]:
+    """
+    Open the segments listed in a manifest and restore their tombstones
+
+    Args:
+        directory: Database directory
+        manifest: Manifest from read_manifest
+
+    Returns:
+        Segments in ordinal order
+    """
+    with open(os.path.join(directory, manifest["tombstones"]), 'rb') as f:
+        tombstones = f.read()
+
+    segments = []
+    offset = 0
+    for entry in manifest["segments"]:
+        segment = Segment(os.path.join(directory, entry["file"]))
+        segment.set_tombstones(tombstones[offset:offset + len(segment)])
+        offset += len(segment)
+        segments.append(segment)
+    return segments
@@ -1,12 +1,26 @@
 import os
 import re
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Callable, Sequence
 import pickle
 import uuid
 import tempfile
 import logging
 import math
-from collections import Counter
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .index import InvertedIndex
+from .cache import QueryCache
+from .dense import DenseIndex, HashingEmbedder
+from .chunks import ChunkStore
+from .locks import ReadWriteLock
+from .filters import MetadataIndex
+from .positions import phrase_match, proximity_score
+from .hybrid import HybridIndex, reciprocal_rank_fusion, weighted_fusion
+from .segment import (
+    Segment, SegmentedIndex, SegmentedDocuments, SEGMENT_SUFFIX,
+    write_segment, read_manifest, write_manifest, open_segments
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -14,16 +28,43 @@ logger = logging.getLogger(__name__)
 
 class SimpleVectorDatabase:
     """
-    Very simple in-memory vector database using basic keyword matching
+    Very simple in-memory vector database using BM25 keyword matching
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        compaction_threshold: float = 0.25,
+        max_segments: int = 8,
+        positional: Optional[bool] = None,
+        proximity_weight: Optional[float] = None
+    ):
         """
         Initialize the simple vector database
+        
+        Args:
+            compaction_threshold: Fraction of deleted documents that triggers a background index rebuild
+            max_segments: Number of on-disk segments that triggers a background merge after save
+            positional: Index token positions for "quoted phrase" queries and proximity scoring
+                (if None, uses POSITIONAL_INDEX)
+            proximity_weight: How far a perfect proximity match lifts a score towards 1.0
+                (if None, uses PROXIMITY_WEIGHT, default 0.3)
         """
-        self.documents = {}  # id -> document mapping
-        self.document_ids = []  # List of document IDs in order of addition
-        self.index = {}  # word -> [doc_ids]
+        if positional is None:
+            positional = os.environ.get("POSITIONAL_INDEX", "false").lower() in ("1", "true", "yes")
+        self.positional = positional
+        self.proximity_weight = proximity_weight if proximity_weight is not None else float(os.environ.get("PROXIMITY_WEIGHT", 0.3))
+        self.documents = ChunkStore()  # id -> document mapping (live documents only)
+        self.document_ids = []  # ordinal -> document ID, in order of addition
+        self.ordinals = {}  # document ID -> ordinal
+        self.index = self._create_index()  # document ordinal -> searchable representation
+        self.metadata = MetadataIndex()  # metadata value -> document ordinals, for filtered search
+        self.compaction_threshold = compaction_threshold
+        self.max_segments = max_segments
+        self.directory = None  # Directory of the last save/load
+        self._lock = threading.RLock()  # Serializes writers, compaction and saves
+        self._rwlock = ReadWriteLock()  # Searches read shared; index changes and swaps are exclusive
+        self._compacting = False
+        self._merging = False
         self.stop_words = {
             'a', 'an', 'the', 'and', 'or', 'but', 'if', 'because', 'as', 'what',
             'when', 'where', 'how', 'why', 'which', 'who', 'whom', 'this', 'that',
@@ -38,6 +79,104 @@ class SimpleVectorDatabase:
             'same', 'so', 'than', 'too', 'very', 's', 't', 'just', 'don', 'now'
         }
     
+    def _create_index(self) -> InvertedIndex:
+        """Create an empty index (term -> postings of document ordinals)"""
+        return InvertedIndex(positional=self.positional)
+    
+    def _prepare_batch(self, token_lists: List[List[str]]) -> InvertedIndex:
+        """Index a batch of tokenized documents on its own, without touching the shared index"""
+        batch = InvertedIndex(positional=self.positional)
+        for tokens in token_lists:
+            batch.add(tokens)
+        return batch
+    
+    def _add_batch(self, index: InvertedIndex, batch: InvertedIndex):
+        """Append a prepared batch to an index; ordinals are assigned in order"""
+        index.extend(batch)
+    
+    def _index_tokens(self, index: InvertedIndex, token_lists: List[List[str]]):
+        """Index tokenized documents; ordinals are assigned in order"""
+        self._add_batch(index, self._prepare_batch(token_lists))
+    
+    def _lexical_index(self, index) -> InvertedIndex:
+        """BM25 part of an index, the part saved as segments"""
+        return index
+    
+    def _with_lexical(self, index, lexical: InvertedIndex):
+        """An index like the given one with its BM25 part replaced"""
+        return lexical
+    
+    def _rank(
+        self,
+        index: InvertedIndex,
+        query_tokens: List[str],
+        top_k: int,
+        timings: Optional[Dict[str, float]] = None,
+        allowed: Optional[Sequence[int]] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Rank documents for a query (timings receives any sub-stage durations)
+        
+        Returns:
+            List of (ordinal, score) pairs with scores in [0, 1], best first,
+            restricted to the allowed ordinals if given
+        """
+        top_docs = index.search(query_tokens, top_k, allowed=allowed)
+        
+        # Normalize scores into [0, 1) by the best score the query could reach
+        max_score = index.max_score(query_tokens) or 1.0  # Avoid division by zero
+        return [(ordinal, score / max_score) for ordinal, score in top_docs]
+    
+    def _rerank_positional(
+        self,
+        index: InvertedIndex,
+        candidates: List[Tuple[int, float]],
+        query_tokens: List[str],
+        phrases: List[List[str]],
+        top_k: int
+    ) -> List[Tuple[int, float]]:
+        """
+        Filter candidates by quoted phrases and boost those whose query terms occur close together
+        
+        Args:
+            index: Positional index the candidates came from
+            candidates: (ordinal, score) pairs with scores in [0, 1]
+            query_tokens: Query tokens
+            phrases: Tokenized phrases every result must contain
+            top_k: Number of results to return
+            
+        Returns:
+            List of (ordinal, score) pairs with scores in [0, 1], best first
+        """
+        terms = list(dict.fromkeys(query_tokens))
+        reranked = []
+        for ordinal, score in candidates:
+            # Decode each term's positions at most once per candidate
+            positions = {term: index.term_positions(term, ordinal) for term in terms}
+            if not all(phrase_match([positions[term] for term in phrase]) for phrase in phrases):
+                continue
+            
+            proximity = proximity_score(list(positions.values()), len(terms))
+            reranked.append((ordinal, score + self.proximity_weight * proximity * (1.0 - score)))
+        
+        reranked.sort(key=lambda item: item[1], reverse=True)
+        return reranked[:top_k]
+    
+    def _parse_query(self, query: str) -> Tuple[List[str], List[List[str]]]:
+        """
+        Split a query into its tokens and its "quoted phrases"
+        
+        Returns:
+            (tokens of the whole query, tokens of each phrase)
+        """
+        phrases = [self._tokenize(phrase) for phrase in re.findall(r'"([^"]+)"', query)]
+        return self._tokenize(query), [phrase for phrase in phrases if phrase]
+    
+    def query_key(self, query: str) -> Tuple:
+        """Normalized form of a query; queries with equal keys return equal results"""
+        tokens, phrases = self._parse_query(query)
+        return tuple(tokens), tuple(tuple(phrase) for phrase in phrases)
+    
     def _tokenize(self, text: str) -> List[str]:
         """
         Simple tokenization: lowercase, remove punctuation, split by whitespace, remove stop words
@@ -63,77 +202,210 @@ class SimpleVectorDatabase:
         if not documents:
             return []
         
-        # Store documents and build index
-        doc_ids = []
-        for doc in documents:
-            doc_id = doc.get("id", str(uuid.uuid4()))
-            self.documents[doc_id] = doc
-            self.document_ids.append(doc_id)
-            doc_ids.append(doc_id)
-            
-            # Index the document
-            tokens = self._tokenize(doc["content"])
-            for token in tokens:
-                if token not in self.index:
-                    self.index[token] = []
-                if doc_id not in self.index[token]:
-                    self.index[token].append(doc_id)
+        # The expensive part (tokenizing, indexing the batch) runs without any lock
+        batch = self._prepare_batch([self._tokenize(doc["content"]) for doc in documents])
+        
+        with self._lock:
+            # Store documents; re-adding an ID replaces the earlier version
+            doc_ids = []
+            replaced = []
+            for doc in documents:
+                doc_id = doc.get("id", str(uuid.uuid4()))
+                if doc_id in self.ordinals:
+                    replaced.append(self.ordinals[doc_id])
+                self.documents[doc_id] = doc
+                self.ordinals[doc_id] = len(self.document_ids) + len(doc_ids)
+                doc_ids.append(doc_id)
+            
+            # Publish the batch in one step: a search sees all of it or none of it.
+            # Ordinals line up with document_ids
+            with self._rwlock.write():
+                self._add_batch(self.index, batch)
+                self.metadata.add(doc.get("metadata") for doc in documents)
+                self.document_ids.extend(doc_ids)
+                for ordinal in replaced:
+                    self.index.delete(ordinal)
         
         logger.info(f"Added {len(documents)} documents to vector database")
         return doc_ids
     
-    def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+    def delete_documents(self, doc_ids: List[str]) -> int:
+        """
+        Delete documents by ID
+        
+        Deleted documents are tombstoned in the index and skipped by searches right away;
+        their postings are dropped by a background compaction once enough have piled up.
+        
+        Args:
+            doc_ids: IDs of the documents to delete
+            
+        Returns:
+            Number of documents deleted
+        """
+        deleted = 0
+        with self._lock, self._rwlock.write():
+            for doc_id in doc_ids:
+                ordinal = self.ordinals.pop(doc_id, None)
+                if ordinal is None:
+                    continue
+                self.index.delete(ordinal)
+                del self.documents[doc_id]
+                deleted += 1
+            
+            if deleted and self._needs_compaction():
+                self._compacting = True
+                threading.Thread(target=self.compact, daemon=True).start()
+        
+        if deleted:
+            logger.info(f"Deleted {deleted} documents from vector database")
+        return deleted
+    
+    def _needs_compaction(self) -> bool:
+        """Check whether the tombstone ratio has passed the compaction threshold"""
+        if self._compacting or not len(self.index):
+            return False
+        return self.index.deleted_count / len(self.index) > self.compaction_threshold
+    
+    def compact(self):
+        """
+        Rebuild the index without tombstoned documents
+        
+        The new index is built from a snapshot while searches keep using the current one;
+        documents added or deleted meanwhile are applied before the new index is swapped in.
+        """
+        try:
+            with self._lock:
+                snapshot_size = len(self.document_ids)
+                live = [
+                    (ordinal, doc_id) for ordinal, doc_id in enumerate(self.document_ids)
+                    if self.ordinals.get(doc_id) == ordinal
+                ]
+                documents = [self.documents[doc_id] for _, doc_id in live]
+            
+            # Rebuild outside the lock so searches and writers are not blocked
+            index = self._create_index()
+            self._index_tokens(index, [self._tokenize(doc["content"]) for doc in documents])
+            metadata = MetadataIndex()
+            metadata.add(doc.get("metadata") for doc in documents)
+            
+            with self._lock:
+                # Catch up with documents added since the snapshot (already-dead ones as empty placeholders)
+                added = list(enumerate(self.document_ids[snapshot_size:], start=snapshot_size))
+                documents = [
+                    self.documents[doc_id] if self.ordinals.get(doc_id) == old_ordinal else None
+                    for old_ordinal, doc_id in added
+                ]
+                self._index_tokens(index, [self._tokenize(doc["content"]) if doc else [] for doc in documents])
+                metadata.add(doc.get("metadata") if doc else None for doc in documents)
+                
+                # Renumber, tombstoning documents deleted or replaced since the snapshot
+                document_ids = []
+                ordinals = {}
+                for old_ordinal, doc_id in live + added:
+                    if self.ordinals.get(doc_id) == old_ordinal:
+                        ordinals[doc_id] = len(document_ids)
+                    else:
+                        index.delete(len(document_ids))
+                    document_ids.append(doc_id)
+                
+                removed = len(self.document_ids) - len(document_ids)
+                with self._rwlock.write():
+                    self.index, self.document_ids, self.ordinals = index, document_ids, ordinals
+                    self.metadata = metadata
+            
+            logger.info(f"Compacted vector database: dropped {removed} deleted documents")
+        finally:
+            self._compacting = False
+    
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        timings: Optional[Dict[str, float]] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
         """
         Search for documents similar to the query
         
         Args:
             query: Query text
             top_k: Number of results to return
+            timings: If given, filled with per-stage durations in milliseconds
+            filters: Restrict results by metadata: source, chunk_type, table_index (exact)
+                and page_from, page_to (inclusive)
             
         Returns:
             List of document chunks with similarity scores
         """
-        if not self.document_ids:
-            return []
+        start = time.perf_counter()
         
         # Tokenize query
-        query_tokens = self._tokenize(query)
+        query_tokens, phrases = self._parse_query(query)
+        tokenized = time.perf_counter()
         
-        # Count document matches
-        doc_scores = Counter()
-        
-        # For each token in the query, find matching documents
-        for token in query_tokens:
-            if token in self.index:
-                for doc_id in self.index[token]:
-                    doc_scores[doc_id] += 1
-        
-        # Normalize scores by query length
-        query_len = len(query_tokens) or 1  # Avoid division by zero
-        for doc_id in doc_scores:
-            doc_scores[doc_id] = doc_scores[doc_id] / query_len
-        
-        # Get top-k documents
-        top_docs = doc_scores.most_common(top_k)
+        # Rank against a consistent state: writers only change the index while no search holds the read lock
+        with self._rwlock.read():
+            index, document_ids = self.index, self.document_ids
+            if not document_ids:
+                return []
+            
+            # Filters select the candidate ordinals before anything is scored
+            allowed = None
+            if filters:
+                filtering = time.perf_counter()
+                allowed = self.metadata.select(filters)
+                if timings is not None:
+                    timings["filter_ms"] = (time.perf_counter() - filtering) * 1000
+                if not allowed:
+                    return []
+            
+            # Get top-k document ordinals; phrases and proximity re-rank a deeper candidate list
+            positional = getattr(index, "positional", False) and (phrases or len(set(query_tokens)) > 1)
+            if positional:
+                candidates = self._rank(index, query_tokens, max(top_k * 4, 20), timings, allowed)
+                reranking = time.perf_counter()
+                top_docs = self._rerank_positional(index, candidates, query_tokens, phrases, top_k)
+                if timings is not None:
+                    timings["positions_ms"] = (time.perf_counter() - reranking) * 1000
+            else:
+                top_docs = self._rank(index, query_tokens, top_k, timings, allowed)
+        ranked = time.perf_counter()
         
-        # Format results
+        # Format results, skipping documents deleted while the query ran; each
+        # lookup builds a fresh dict, so only the top-k chunks are ever materialized
         results = []
-        for doc_id, score in top_docs:
-            doc = self.documents[doc_id].copy()
+        for ordinal, score in top_docs:
+            doc = self.documents.get(document_ids[ordinal])
+            if doc is None:
+                continue
             doc["score"] = float(score)
             results.append(doc)
         
+        if timings is not None:
+            finished = time.perf_counter()
+            timings["tokenize_ms"] = (tokenized - start) * 1000
+            timings["rank_ms"] = (ranked - tokenized) * 1000
+            timings["format_ms"] = (finished - ranked) * 1000
+            timings["total_ms"] = (finished - start) * 1000
+        
         return results
     
     def clear(self):
         """Clear the database"""
-        self.documents = {}
-        self.document_ids = []
-        self.index = {}
+        with self._lock, self._rwlock.write():
+            self.documents = ChunkStore()
+            self.document_ids = []
+            self.ordinals = {}
+            self.metadata = MetadataIndex()
+            self.index = self._create_index()
     
     def save(self, directory: str) -> str:
         """
-        Save the vector database to disk
+        Save the vector database to disk as memory-mappable segments
+        
+        Segments already saved in the directory are kept as they are; only documents
+        added since then are written, as a new segment. Tombstones and the segment
+        list are rewritten atomically.
         
         Args:
             directory: Directory to save to
@@ -141,34 +413,636 @@ class SimpleVectorDatabase:
         Returns:
             Path to the saved database
         """
+        directory = os.path.abspath(directory)
         os.makedirs(directory, exist_ok=True)
         
-        # Save index, documents and document_ids
-        db_path = os.path.join(directory, "db.pkl")
-        with open(db_path, 'wb') as f:
-            pickle.dump((self.index, self.documents, self.document_ids), f)
+        with self._lock:
+            lexical = self._lexical_index(self.index)
+            index = lexical if isinstance(lexical, SegmentedIndex) else SegmentedIndex([], lexical)
+            if not isinstance(self.documents, SegmentedDocuments):
+                self.documents = SegmentedDocuments(self.documents)
+            
+            segments = []
+            offset = 0
+            for part in index.all_parts:
+                if isinstance(part, Segment) and os.path.dirname(part.path) == directory:
+                    segments.append(part)
+                elif len(part):
+                    segments.append(self._write_part(directory, part, offset))
+                offset += len(part)
+            
+            # Searches now read the flushed documents through the mapped segments
+            with self._rwlock.write():
+                self.index = self._with_lexical(self.index, SegmentedIndex(segments, InvertedIndex(index.k1, index.b, self.positional)))
+            write_manifest(directory, segments, b"".join(bytes(segment.deleted) for segment in segments))
+            self.directory = directory
+            
+            if len(segments) > self.max_segments and not self._merging:
+                self._merging = True
+                threading.Thread(target=self.merge_segments, daemon=True).start()
         
         return directory
     
+    def _write_part(self, directory: str, part: InvertedIndex, offset: int) -> Segment:
+        """Write one index part and its live documents to a new segment in the directory"""
+        doc_ids = self.document_ids[offset:offset + len(part)]
+        live = [self.ordinals.get(doc_id) == offset + i for i, doc_id in enumerate(doc_ids)]
+        documents = [self.documents[doc_id] if alive else None for doc_id, alive in zip(doc_ids, live)]
+        
+        path = os.path.join(directory, f"seg-{uuid.uuid4().hex[:16]}{SEGMENT_SUFFIX}")
+        write_segment(path, [part], doc_ids, documents)
+        
+        segment = Segment(path)
+        segment.set_tombstones(part.deleted)
+        self.documents.attach(segment, [(doc_id, i) for i, (doc_id, alive) in enumerate(zip(doc_ids, live)) if alive])
+        return segment
+    
+    def merge_segments(self):
+        """
+        Merge the saved segments into one in the background
+        
+        The merged segment is written while searches keep using the existing ones, then
+        swapped in if no compaction replaced the index meanwhile. Ordinals are preserved.
+        """
+        try:
+            with self._lock:
+                index, directory = self.index, self.directory
+                lexical = self._lexical_index(index)
+                if not isinstance(lexical, SegmentedIndex) or len(lexical.parts) < 2:
+                    return
+                segments = list(lexical.parts)
+                size = sum(len(segment) for segment in segments)
+                doc_ids = self.document_ids[:size]
+                live = [self.ordinals.get(doc_id) == ordinal for ordinal, doc_id in enumerate(doc_ids)]
+            
+            # Read documents from the mapped segments outside the lock
+            documents = []
+            for segment in segments:
+                documents.extend(segment.document(ordinal) for ordinal in range(len(segment)))
+            documents = [doc if alive else None for doc, alive in zip(documents, live)]
+            
+            path = os.path.join(directory, f"seg-{uuid.uuid4().hex[:16]}{SEGMENT_SUFFIX}")
+            write_segment(path, segments, doc_ids, documents)
+            merged = Segment(path)
+            
+            with self._lock:
+                if self.index is not index or self.directory != directory:
+                    os.remove(path)
+                    return
+                
+                # Carry over tombstones set while merging
+                merged.set_tombstones(b"".join(bytes(segment.deleted) for segment in segments))
+                self.documents.attach(merged, [
+                    (doc_id, ordinal) for ordinal, doc_id in enumerate(doc_ids)
+                    if self.ordinals.get(doc_id) == ordinal
+                ])
+                with self._rwlock.write():
+                    self.index = self._with_lexical(index, SegmentedIndex([merged], lexical.memory))
+                write_manifest(directory, [merged], bytes(merged.deleted))
+            
+            logger.info(f"Merged {len(segments)} segments ({size} documents)")
+        finally:
+            self._merging = False
+    
     @classmethod
-    def load(cls, directory: str) -> 'SimpleVectorDatabase':
+    def load(cls, directory: str, **kwargs) -> 'SimpleVectorDatabase':
         """
         Load a vector database from disk
         
+        Segments are memory-mapped, so loading does not read postings or chunk contents
+        up front; pages are read when searches touch them. Whether token positions are
+        indexed follows the saved segments rather than the positional option.
+        
         Args:
             directory: Directory to load from
+            **kwargs: Options passed to the constructor
             
         Returns:
             Loaded SimpleVectorDatabase
         """
-        db = cls()
+        db = cls(**kwargs)
+        directory = os.path.abspath(directory)
+        
+        manifest = read_manifest(directory)
+        if manifest is None:
+            # Older databases were pickled; rebuild the index from their documents
+            db_path = os.path.join(directory, "db.pkl")
+            with open(db_path, 'rb') as f:
+                _, documents, document_ids = pickle.load(f)
+            db.add_documents([documents[doc_id] for doc_id in document_ids if doc_id in documents])
+            return db
+        
+        segments = open_segments(directory, manifest)
+        if segments:
+            # New documents must match the saved ones, whatever POSITIONAL_INDEX says now
+            db.positional = all(segment.positional for segment in segments)
+        db.index = db._with_lexical(db.index, SegmentedIndex(segments, InvertedIndex(positional=db.positional)))
+        db.documents = SegmentedDocuments()
+        for segment in segments:
+            entries = []
+            for ordinal in range(len(segment)):
+                doc_id = segment.doc_id(ordinal)
+                if not segment.deleted[ordinal]:
+                    db.ordinals[doc_id] = len(db.document_ids)
+                    entries.append((doc_id, ordinal))
+                db.document_ids.append(doc_id)
+            db.documents.attach(segment, entries)
+            db.metadata.add(segment.metadata(ordinal) if not segment.deleted[ordinal] else None for ordinal in range(len(segment)))
+        db.directory = directory
+        
+        return db
+
+class DenseVectorDatabase(SimpleVectorDatabase):
+    """
+    In-memory vector database ranking by cosine similarity of locally computed hashed TF-IDF vectors
+    """
+    
+    def __init__(
+        self,
+        dim: Optional[int] = None,
+        ann_index: Optional[str] = None,
+        nlist: Optional[int] = None,
+        nprobe: Optional[int] = None,
+        **kwargs
+    ):
+        """
+        Initialize the dense vector database
+        
+        Args:
+            dim: Embedding dimension (if None, uses the EMBEDDING_DIM environment variable)
+            ann_index: "ivf" for approximate search, "none" for exact (if None, uses ANN_INDEX)
+            nlist: Number of IVF lists (if None, uses ANN_NLIST or sizes them from the corpus)
+            nprobe: IVF lists scanned per query (if None, uses ANN_NPROBE, default 8)
+            **kwargs: Options passed to SimpleVectorDatabase
+        """
+        self.dim = dim or int(os.environ.get("EMBEDDING_DIM", 1024))
+        self.ann_index = (ann_index or os.environ.get("ANN_INDEX", "none")).lower()
+        if self.ann_index not in ("none", "ivf"):
+            raise ValueError(f"Unsupported ANN index: {self.ann_index}")
+        self.nlist = nlist or int(os.environ.get("ANN_NLIST", 0)) or None
+        self.nprobe = nprobe or int(os.environ.get("ANN_NPROBE", 8))
+        self.embedder = HashingEmbedder(self.dim)
+        self._training = False
+        super().__init__(**kwargs)
+    
+    def _create_index(self) -> DenseIndex:
+        """Create an empty dense index"""
+        return DenseIndex(self.dim, ann=self.ann_index == "ivf", nlist=self.nlist, nprobe=self.nprobe)
+    
+    def _dense_index(self, index: DenseIndex) -> DenseIndex:
+        """The dense part of an index"""
+        return index
+    
+    def _prepare_batch(self, token_lists: List[List[str]]):
+        """Embed a batch of tokenized documents"""
+        return self.embedder.embed_batch(token_lists, normalize=True)
+    
+    def _add_batch(self, index: DenseIndex, batch):
+        """Store embedded documents; ordinals are assigned in order"""
+        index.add_vectors(batch)
+    
+    def _rank(
+        self,
+        index: DenseIndex,
+        query_tokens: List[str],
+        top_k: int,
+        timings: Optional[Dict[str, float]] = None,
+        allowed: Optional[Sequence[int]] = None
+    ) -> List[Tuple[int, float]]:
+        """Rank documents by cosine similarity to the query"""
+        return index.search(query_tokens, top_k, allowed)
+    
+    def add_documents(self, documents: List[Dict[str, Any]]) -> List[str]:
+        """
+        Add documents to the vector database, training the IVF index in the background once it is due
+        
+        Args:
+            documents: List of document chunks with content and metadata
+            
+        Returns:
+            List of document IDs
+        """
+        doc_ids = super().add_documents(documents)
+        self._start_training()
+        return doc_ids
+    
+    def compact(self):
+        """Rebuild the index without tombstoned documents, then train its IVF index in the background"""
+        super().compact()
+        self._start_training()
+    
+    def _start_training(self):
+        """Start a background IVF training if the index needs one and none is running"""
+        with self._lock:
+            ann = self._dense_index(self.index).ann
+            if self._training or ann is None or not ann.needs_training:
+                return
+            self._training = True
+        threading.Thread(target=self.train_ann, daemon=True).start()
+    
+    def train_ann(self):
+        """
+        Train the IVF index
+        
+        k-means runs on a snapshot of the vectors while searches keep using the current
+        lists (or exact search); vectors added meanwhile are assigned before the trained
+        lists are swapped in.
+        """
+        try:
+            with self._lock:
+                dense = self._dense_index(self.index)
+                size = len(dense)
+            
+            # The slow part runs without any lock
+            centroids, lists = dense.ann.fit(size)
+            
+            with self._lock:
+                # A compaction or clear replaced the index: it is trained on its own
+                if self._dense_index(self.index) is not dense:
+                    return
+                dense.ann.assign(size, len(dense), centroids, lists)
+                with self._rwlock.write():
+                    dense.ann.install(centroids, lists, size)
+        finally:
+            self._training = False
+        
+        # The store may have grown enough during training to need another one
+        self._start_training()
+    
+    def save(self, directory: str) -> str:
+        """
+        Save the vector database to disk
+        
+        Chunks go to a document-only segment and vectors to a memory-mappable .npy file.
+        
+        Args:
+            directory: Directory to save to
+            
+        Returns:
+            Path to the saved database
+        """
+        directory = os.path.abspath(directory)
+        os.makedirs(directory, exist_ok=True)
+        
+        with self._lock:
+            live = [self.ordinals.get(doc_id) == ordinal for ordinal, doc_id in enumerate(self.document_ids)]
+            documents = [self.documents[doc_id] if alive else None for doc_id, alive in zip(self.document_ids, live)]
+            
+            path = os.path.join(directory, f"documents{SEGMENT_SUFFIX}")
+            write_segment(path, [], self.document_ids, documents)
+            self.index.save(directory)
+            
+            # Serve chunk contents from the mapped segment from now on
+            segment = Segment(path)
+            self.documents = SegmentedDocuments()
+            self.documents.attach(segment, [(doc_id, i) for i, (doc_id, alive) in enumerate(zip(self.document_ids, live)) if alive])
+            self.directory = directory
+        
+        return directory
+    
+    @classmethod
+    def load(cls, directory: str, **kwargs) -> 'DenseVectorDatabase':
+        """
+        Load a vector database from disk, memory-mapping vectors and chunk contents
+        
+        Args:
+            directory: Directory to load from
+            **kwargs: Options passed to the constructor
+            
+        Returns:
+            Loaded DenseVectorDatabase
+        """
+        db = cls(**kwargs)
+        directory = os.path.abspath(directory)
+        
+        db.index = DenseIndex.load(directory, ann=db.ann_index == "ivf", nlist=db.nlist, nprobe=db.nprobe)
+        db.dim = db.index.store.dim
+        
+        segment = Segment(os.path.join(directory, f"documents{SEGMENT_SUFFIX}"))
+        db.documents = SegmentedDocuments()
+        entries = []
+        for ordinal in range(len(segment)):
+            doc_id = segment.doc_id(ordinal)
+            if not db.index.store.deleted[ordinal]:
+                db.ordinals[doc_id] = ordinal
+                entries.append((doc_id, ordinal))
+            db.document_ids.append(doc_id)
+        db.documents.attach(segment, entries)
+        db.metadata.add(segment.metadata(ordinal) if not db.index.store.deleted[ordinal] else None for ordinal in range(len(segment)))
+        db.directory = directory
+        
+        return db
+
+# Runs the lexical half of hybrid searches while the calling thread runs the dense half
+_hybrid_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="hybrid-search")
+
+class HybridVectorDatabase(DenseVectorDatabase):
+    """
+    In-memory vector database combining BM25 keyword matching with dense hashed TF-IDF similarity
+    
+    Exact technical terms and IDs are caught by the lexical ranking, paraphrases by the
+    dense one. Both run concurrently over the same chunk store and are fused into one list.
+    """
+    
+    def __init__(
+        self,
+        fusion: Optional[str] = None,
+        alpha: Optional[float] = None,
+        candidate_factor: int = 4,
+        **kwargs
+    ):
+        """
+        Initialize the hybrid vector database
+        
+        Args:
+            fusion: "rrf" (reciprocal rank fusion) or "weighted" (if None, uses HYBRID_FUSION, default "rrf")
+            alpha: Lexical weight for weighted fusion (if None, uses HYBRID_ALPHA, default 0.5)
+            candidate_factor: Each ranking contributes top_k * candidate_factor candidates to the fusion
+            **kwargs: Options passed to DenseVectorDatabase
+        """
+        self.fusion = (fusion or os.environ.get("HYBRID_FUSION", "rrf")).lower()
+        if self.fusion not in ("rrf", "weighted"):
+            raise ValueError(f"Unsupported fusion method: {self.fusion}")
+        self.alpha = alpha if alpha is not None else float(os.environ.get("HYBRID_ALPHA", 0.5))
+        self.candidate_factor = candidate_factor
+        super().__init__(**kwargs)
+    
+    def _create_index(self) -> HybridIndex:
+        """Create empty lexical and dense indexes"""
+        return HybridIndex(SimpleVectorDatabase._create_index(self), super()._create_index())
+    
+    def _prepare_batch(self, token_lists: List[List[str]]) -> Tuple[InvertedIndex, Any]:
+        """Build the lexical and dense parts of a batch"""
+        return SimpleVectorDatabase._prepare_batch(self, token_lists), super()._prepare_batch(token_lists)
+    
+    def _add_batch(self, index: HybridIndex, batch: Tuple[InvertedIndex, Any]):
+        """Append a prepared batch to both indexes"""
+        lexical, vectors = batch
+        index.lexical.extend(lexical)
+        index.dense.add_vectors(vectors)
+    
+    def _rank(
+        self,
+        index: HybridIndex,
+        query_tokens: List[str],
+        top_k: int,
+        timings: Optional[Dict[str, float]] = None,
+        allowed: Optional[Sequence[int]] = None
+    ) -> List[Tuple[int, float]]:
+        """Rank with both indexes concurrently and fuse the rankings"""
+        depth = top_k * self.candidate_factor
+        
+        def timed(rank, stage_index):
+            start = time.perf_counter()
+            ranking = rank(self, stage_index, query_tokens, depth, None, allowed)
+            return ranking, (time.perf_counter() - start) * 1000
+        
+        lexical_future = _hybrid_executor.submit(timed, SimpleVectorDatabase._rank, index.lexical)
+        dense, dense_ms = timed(DenseVectorDatabase._rank, index.dense)
+        lexical, lexical_ms = lexical_future.result()
+        
+        start = time.perf_counter()
+        if self.fusion == "rrf":
+            fused = reciprocal_rank_fusion([lexical, dense])
+        else:
+            fused = weighted_fusion(lexical, dense, self.alpha)
+        
+        if timings is not None:
+            timings["lexical_ms"] = lexical_ms
+            timings["dense_ms"] = dense_ms
+            timings["fusion_ms"] = (time.perf_counter() - start) * 1000
+        
+        return fused[:top_k]
+    
+    def _dense_index(self, index: HybridIndex) -> DenseIndex:
+        """The dense part of an index"""
+        return index.dense
+    
+    def _lexical_index(self, index: HybridIndex) -> InvertedIndex:
+        """BM25 part of the hybrid index"""
+        return index.lexical
+    
+    def _with_lexical(self, index: HybridIndex, lexical: InvertedIndex) -> HybridIndex:
+        """The hybrid index with its BM25 part replaced, sharing the dense part"""
+        return HybridIndex(lexical, index.dense)
+    
+    def save(self, directory: str) -> str:
+        """
+        Save the vector database to disk
+        
+        The lexical index and chunks are saved as segments (see SimpleVectorDatabase.save),
+        the vectors as by DenseVectorDatabase.save, under the same lock so both agree.
         
-        # Load index, documents and document_ids
-        db_path = os.path.join(directory, "db.pkl")
-        with open(db_path, 'rb') as f:
-            db.index, db.documents, db.document_ids = pickle.load(f)
+        Args:
+            directory: Directory to save to
+            
+        Returns:
+            Path to the saved database
+        """
+        directory = os.path.abspath(directory)
+        with self._lock:
+            SimpleVectorDatabase.save(self, directory)
+            self.index.dense.save(directory)
+        return directory
+    
+    @classmethod
+    def load(cls, directory: str, **kwargs) -> 'HybridVectorDatabase':
+        """
+        Load a vector database from disk, memory-mapping segments and vectors
+        
+        Args:
+            directory: Directory to load from
+            **kwargs: Options passed to the constructor
+            
+        Returns:
+            Loaded HybridVectorDatabase
+            
+        Raises:
+            ValueError: If the saved lexical and dense indexes disagree on the document count
+        """
+        directory = os.path.abspath(directory)
+        db = SimpleVectorDatabase.load.__func__(cls, directory, **kwargs)
+        if read_manifest(directory) is None:
+            # Rebuilt from an older pickled database, vectors included
+            return db
         
+        dense = DenseIndex.load(directory, ann=db.ann_index == "ivf", nlist=db.nlist, nprobe=db.nprobe)
+        if len(dense) != len(db.index.lexical):
+            raise ValueError(f"Saved dense index has {len(dense)} documents, lexical index {len(db.index.lexical)}")
+        db.index = HybridIndex(db.index.lexical, dense)
+        db.dim = dense.store.dim
         return db
 
+# Available search backends, selected by name
+VECTOR_BACKENDS = {
+    "keyword": SimpleVectorDatabase,
+    "dense": DenseVectorDatabase,
+    "hybrid": HybridVectorDatabase,
+}
+
+def create_vector_database(backend: Optional[str] = None, **kwargs) -> SimpleVectorDatabase:
+    """
+    Create a vector database for the configured backend
+    
+    Args:
+        backend: Backend name (if None, uses the VECTOR_BACKEND environment variable, default "keyword")
+        **kwargs: Options passed to the backend constructor
+        
+    Returns:
+        Empty vector database
+    """
+    backend = (backend or os.environ.get("VECTOR_BACKEND", "keyword")).lower()
+    if backend not in VECTOR_BACKENDS:
+        raise ValueError(f"Unsupported vector backend: {backend}. Available: {', '.join(VECTOR_BACKENDS)}")
+    
+    return VECTOR_BACKENDS[backend](**kwargs)
+
+class ShardedVectorDatabase:
+    """
+    Vector database partitioned by session: each session gets its own index and document store,
+    so a search only touches the caller's documents
+    """
+    
+    def __init__(
+        self,
+        factory: Optional[Callable[[], SimpleVectorDatabase]] = None,
+        cache: Optional[QueryCache] = None
+    ):
+        """
+        Initialize the sharded vector database
+        
+        Args:
+            factory: Creates an empty shard (if None, uses the configured backend)
+            cache: Search result cache (if None, one is sized from QUERY_CACHE_MB, default 32; 0 disables it)
+        """
+        self.factory = factory or create_vector_database
+        self.shards = {}  # session_id -> vector database
+        self._lock = threading.Lock()  # Guards shard creation
+        
+        if cache is None:
+            cache_mb = float(os.environ.get("QUERY_CACHE_MB", 32))
+            cache = QueryCache(int(cache_mb * 1024 * 1024)) if cache_mb > 0 else None
+        self.cache = cache
+    
+    def get_shard(self, session_id: str, create: bool = False) -> Optional[SimpleVectorDatabase]:
+        """
+        Get the shard for a session
+        
+        Args:
+            session_id: Session ID
+            create: Create an empty shard if the session has none
+            
+        Returns:
+            The session's vector database, or None
+        """
+        shard = self.shards.get(session_id)
+        if shard is None and create:
+            # Two uploads starting a session together must end up in the same shard
+            with self._lock:
+                shard = self.shards.get(session_id)
+                if shard is None:
+                    shard = self.shards[session_id] = self.factory()
+        return shard
+    
+    def add_documents(
+        self,
+        documents: List[Dict[str, Any]],
+        session_id: str,
+        shard: Optional[SimpleVectorDatabase] = None
+    ) -> List[str]:
+        """
+        Add documents to a session's shard
+        
+        Args:
+            documents: List of document chunks with content and metadata
+            session_id: Session ID
+            shard: Shard to write to, as returned by get_shard (if None, the session's
+                shard, created if needed); if the session is dropped meanwhile, the
+                documents go with it instead of recreating the shard
+            
+        Returns:
+            List of document IDs
+        """
+        if not documents:
+            return []
+        if shard is None:
+            shard = self.get_shard(session_id, create=True)
+        doc_ids = shard.add_documents(documents)
+        if self.cache is not None and self.shards.get(session_id) is shard:
+            self.cache.invalidate(session_id)
+        return doc_ids
+    
+    def search(
+        self,
+        query: str,
+        session_id: str,
+        top_k: int = 5,
+        timings: Optional[Dict[str, float]] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Search a session's documents
+        
+        Args:
+            query: Query text
+            session_id: Session ID
+            top_k: Number of results to return
+            timings: If given, filled with per-stage durations in milliseconds (left empty
+                on a cache hit; hits are counted in the cache's stats)
+            filters: Metadata filters (see SimpleVectorDatabase.search)
+            
+        Returns:
+            List of document chunks with similarity scores
+        """
+        shard = self.get_shard(session_id)
+        if shard is None:
+            return []
+        if self.cache is None:
+            return shard.search(query, top_k, timings, filters)
+        
+        # Rephrasings that normalize to the same tokens share an entry
+        key = (shard.query_key(query), top_k, tuple(sorted((filters or {}).items())))
+        results = self.cache.get(session_id, key)
+        if results is None:
+            generation = self.cache.generation(session_id)
+            results = shard.search(query, top_k, timings, filters)
+            self.cache.put(session_id, key, results, generation)
+        return results
+    
+    def delete_documents(self, doc_ids: List[str], session_id: str) -> int:
+        """
+        Delete documents from a session's shard
+        
+        Args:
+            doc_ids: IDs of the documents to delete
+            session_id: Session ID
+            
+        Returns:
+            Number of documents deleted
+        """
+        shard = self.get_shard(session_id)
+        if shard is None:
+            return 0
+        deleted = shard.delete_documents(doc_ids)
+        if deleted and self.cache is not None:
+            self.cache.invalidate(session_id)
+        return deleted
+    
+    def drop_session(self, session_id: str):
+        """
+        Drop a session's shard and everything indexed in it
+        
+        Args:
+            session_id: Session ID
+        """
+        self.shards.pop(session_id, None)
+        if self.cache is not None:
+            self.cache.drop(session_id)
+    
+    def clear(self):
+        """Clear every shard"""
+        for session_id in list(self.shards):
+            self.drop_session(session_id)
+
 # Alias for backward compatibility
 VectorDatabase = SimpleVectorDatabase
\ No newline at end of file
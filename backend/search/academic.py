@@ -1,28 +1,91 @@
 import arxiv
 import requests
 from Bio import Entrez
+import os
 import time
-from typing import List, Dict, Any, Optional
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from typing import List, Dict, Any, Optional, Callable
 import logging
+from .result_cache import SearchCache
+from .singleflight import SingleFlight
+from .rate_limit import RateLimiter, get_limiter
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class DeadlineExceeded(Exception):
+    """Raised inside a provider whose search_all call has stopped waiting for it"""
+
 class AcademicSearch:
     """
     Search for academic papers from online sources (arXiv, PubMed)
+    
+    Sources are kept in a registry of providers, functions taking (query, max_results)
+    and returning papers; search_all queries them all concurrently.
     """
     
-    def __init__(self, email: str = "user@example.com"):
+    def __init__(
+        self,
+        email: str = "user@example.com",
+        deadline: Optional[float] = None,
+        workers: Optional[int] = None,
+        cache: Optional[SearchCache] = None
+    ):
         """
         Initialize the academic search
         
         Args:
             email: Email for PubMed API (required by NCBI)
+            deadline: Seconds search_all waits for the sources (if None, uses SEARCH_DEADLINE, default 8)
+            workers: Threads querying sources (if None, uses SEARCH_WORKERS, default 16)
+            cache: Cache of results per source (if None, one is created at SEARCH_CACHE_PATH with
+                SEARCH_CACHE_TTL, SEARCH_CACHE_STALE_TTL and SEARCH_CACHE_MB; 0 MB disables it)
         """
         self.email = email
         Entrez.email = email
+        Entrez.api_key = os.environ.get("NCBI_API_KEY") or None
+        
+        # NCBI allows 3 requests per second without an API key, 10 with one; arXiv asks for one every 3 seconds
+        self.ncbi_limiter = get_limiter("ncbi", 10 if Entrez.api_key else 3)
+        self.arxiv_limiter = get_limiter("arxiv", 1 / 3)
+        
+        if cache is None:
+            cache_mb = float(os.environ.get("SEARCH_CACHE_MB", 64))
+            if cache_mb > 0:
+                cache = SearchCache(
+                    os.environ.get("SEARCH_CACHE_PATH") or os.path.join(tempfile.gettempdir(), "research-agent-search-cache.sqlite3"),
+                    ttl=float(os.environ.get("SEARCH_CACHE_TTL", 86400)),
+                    stale_ttl=float(os.environ.get("SEARCH_CACHE_STALE_TTL", 604800)),
+                    max_bytes=int(cache_mb * 1024 * 1024)
+                )
+        self.cache = cache
+        self._refreshing = set()  # Cache keys being refreshed in the background
+        self._refresh_lock = threading.Lock()
+        self.refreshes = 0
+        self.flights = SingleFlight()  # Coalesces identical concurrent search_all calls
+        self._local = threading.local()  # Deadline of the provider call running in this thread
+        self.deadline = deadline if deadline is not None else float(os.environ.get("SEARCH_DEADLINE", 8))
+        # Sources that miss the deadline keep their thread until the request returns
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers or int(os.environ.get("SEARCH_WORKERS", 16)),
+            thread_name_prefix="academic-search"
+        )
+        self.providers = {}  # name -> search function, in merge order
+        self.register_provider("arxiv", self.search_arxiv)
+        self.register_provider("pubmed", self.search_pubmed)
+    
+    def register_provider(self, name: str, search: Callable[[str, int], List[Dict[str, Any]]]):
+        """
+        Add a source queried by search_all (or replace one with the same name)
+        
+        Args:
+            name: Source name, used in timings
+            search: Called with (query, max_results); returns paper information
+        """
+        self.providers[name] = search
     
     def search_arxiv(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
         """
@@ -42,6 +105,8 @@ class AcademicSearch:
                 sort_by=arxiv.SortCriterion.Relevance
             )
             
+            self._acquire(self.arxiv_limiter)
+            
             results = []
             for paper in search.results():
                 results.append({
@@ -55,6 +120,8 @@ class AcademicSearch:
                 })
             
             return results
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error searching arXiv: {e}")
             return []
@@ -72,6 +139,7 @@ class AcademicSearch:
         """
         try:
             # Search for IDs
+            self._acquire(self.ncbi_limiter)
             handle = Entrez.esearch(db="pubmed", term=query, retmax=max_results)
             record = Entrez.read(handle)
             handle.close()
@@ -82,6 +150,7 @@ class AcademicSearch:
                 return []
             
             # Fetch details
+            self._acquire(self.ncbi_limiter)
             handle = Entrez.efetch(db="pubmed", id=id_list, retmode="xml")
             records = Entrez.read(handle)
             handle.close()
@@ -126,30 +195,188 @@ class AcademicSearch:
                 })
             
             return results
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error searching PubMed: {e}")
             return []
     
-    def search_all(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
+    def search_all(
+        self,
+        query: str,
+        max_results: int = 5,
+        deadline: Optional[float] = None,
+        timings: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
         """
-        Search all sources for papers
+        Search all sources for papers, concurrently
+        
+        Identical searches already in flight (same normalized query, max_results and
+        deadline) are joined instead of being sent upstream again.
         
         Args:
             query: Search query
             max_results: Maximum number of results to return per source
+            deadline: Seconds to wait for the sources (defaults to self.deadline); sources
+                that have not answered by then are left out
+            timings: If given, filled with per-source latency ("<name>_ms"), "total_ms",
+                the names of the sources that missed the deadline ("timed_out"), of
+                those answered from the cache ("cached"), and whether the results came
+                from another caller's search ("coalesced")
             
         Returns:
             List of paper information
         """
-        arxiv_results = self.search_arxiv(query, max_results)
-        pubmed_results = self.search_pubmed(query, max_results)
+        deadline = self.deadline if deadline is None else deadline
+        key = (" ".join(query.lower().split()), max_results, deadline)
+        (papers, search_timings), coalesced = self.flights.do(key, self._search_all, query, max_results, deadline)
+        if timings is not None:
+            timings.update(search_timings)
+            timings["coalesced"] = coalesced
+        return list(papers)
+    
+    def _search_all(self, query: str, max_results: int, deadline: float):
+        """
+        Fan a search out to every provider and merge what arrives before the deadline
+        
+        Returns:
+            Merged paper information and timings (see search_all)
+        """
+        start = time.perf_counter()
+        expires = time.monotonic() + deadline
+        timings = {}
+        
+        # Cached sources answer at once (stale ones are refreshed in the background), the rest are queried
+        outcomes = {}
+        cached = []
+        for name, search in self.providers.items():
+            cache_key = SearchCache.key(name, query, max_results)
+            entry = self.cache.get(cache_key) if self.cache is not None else None
+            if entry is None:
+                outcomes[name] = self._executor.submit(self._timed, name, search, query, max_results, cache_key, expires)
+                continue
+            results, fresh = entry
+            if not fresh:
+                self._refresh(name, search, query, max_results, cache_key)
+            outcomes[name] = (results, (time.perf_counter() - start) * 1000)
+            cached.append(name)
+        wait([outcome for outcome in outcomes.values() if isinstance(outcome, Future)], timeout=deadline)
+        
+        source_results = []
+        timed_out = []
+        for name, outcome in outcomes.items():
+            if isinstance(outcome, Future):
+                if not outcome.done():
+                    # Drop it if it has not started; a running provider gives up at its next deadline check
+                    outcome.cancel()
+                    timed_out.append(name)
+                    continue
+                outcome = outcome.result()
+            results, elapsed_ms = outcome
+            source_results.append(results)
+            timings[f"{name}_ms"] = elapsed_ms
+        if timed_out:
+            logger.warning(f"No results from {', '.join(timed_out)} within {deadline}s")
+        timings["timed_out"] = timed_out
+        timings["cached"] = cached
+        timings["total_ms"] = (time.perf_counter() - start) * 1000
         
         # Combine and sort by relevance (assuming the APIs return in relevance order)
         combined = []
-        for i in range(max(len(arxiv_results), len(pubmed_results))):
-            if i < len(arxiv_results):
-                combined.append(arxiv_results[i])
-            if i < len(pubmed_results):
-                combined.append(pubmed_results[i])
+        for i in range(max((len(results) for results in source_results), default=0)):
+            for results in source_results:
+                if i < len(results):
+                    combined.append(results[i])
+        
+        return combined[:max_results * len(self.providers)], timings  # Limit total results
+    
+    def _timed(
+        self,
+        name: str,
+        search: Callable[[str, int], List[Dict[str, Any]]],
+        query: str,
+        max_results: int,
+        cache_key: Optional[str] = None,
+        expires: Optional[float] = None
+    ):
+        """
+        Run one provider and cache what it found
         
-        return combined[:max_results * 2]  # Limit total results
\ No newline at end of file
+        Args:
+            expires: time.monotonic() after which the caller no longer waits; the built-in
+                providers check it before each request and give up once it has passed
+        
+        Returns:
+            Its results (none if it failed or ran out of time) and its latency in milliseconds
+        """
+        start = time.perf_counter()
+        self._local.expires = expires
+        try:
+            self._check_deadline()
+            results = search(query, max_results)
+        except DeadlineExceeded:
+            logger.info(f"Abandoned {name} search past its deadline")
+            results = []
+        except Exception as e:
+            logger.error(f"Error searching {name}: {e}")
+            results = []
+        finally:
+            self._local.expires = None
+        # Providers report errors as no results, so empty answers are not cached
+        if results and cache_key is not None and self.cache is not None:
+            try:
+                self.cache.put(cache_key, results)
+            except Exception as e:
+                logger.error(f"Error caching {name} results: {e}")
+        return results, (time.perf_counter() - start) * 1000
+    
+    def _check_deadline(self):
+        """
+        Give up on the provider call running in this thread if its caller stopped waiting
+        
+        Raises:
+            DeadlineExceeded: If the deadline has passed
+        """
+        expires = getattr(self._local, "expires", None)
+        if expires is not None and time.monotonic() >= expires:
+            raise DeadlineExceeded()
+    
+    def _acquire(self, limiter: RateLimiter):
+        """
+        Wait for a rate limiter, but no longer than the deadline of the provider call
+        
+        Raises:
+            DeadlineExceeded: If the wait would outlast the deadline (no token is used up)
+        """
+        expires = getattr(self._local, "expires", None)
+        timeout = None if expires is None else max(0.0, expires - time.monotonic())
+        if limiter.acquire(timeout) is None:
+            raise DeadlineExceeded(f"{limiter.name} rate limit would exceed the deadline")
+        self._check_deadline()
+    
+    def _refresh(
+        self,
+        name: str,
+        search: Callable[[str, int], List[Dict[str, Any]]],
+        query: str,
+        max_results: int,
+        cache_key: str
+    ):
+        """Re-run a provider in the background to update a stale cache entry, once per key at a time"""
+        with self._refresh_lock:
+            if cache_key in self._refreshing:
+                return
+            self._refreshing.add(cache_key)
+            self.refreshes += 1
+        
+        def done(_):
+            with self._refresh_lock:
+                self._refreshing.discard(cache_key)
+        
+        self._executor.submit(self._timed, name, search, query, max_results, cache_key).add_done_callback(done)
+    
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Search cache counters, including background refreshes (None if caching is disabled)"""
+        if self.cache is None:
+            return None
+        return {**self.cache.stats(), "refreshes": self.refreshes}
\ No newline at end of file
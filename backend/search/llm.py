@@ -5,11 +5,19 @@ import requests
 import logging
 import json
 import re
+import hashlib
+import math
+from email.utils import parsedate_to_datetime
+from .singleflight import SingleFlight
+from .rate_limit import get_limiter
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class RateLimited(Exception):
+    """Raised when the Groq rate limit would keep a request waiting longer than allowed"""
+
 class LLMService:
     """
     LLM service for answering questions based on context using Groq API
@@ -32,6 +40,16 @@ class LLMService:
         # Model to use
         self.model = "llama3-70b-8192"
         
+        # Coalesces identical concurrent answer_question calls
+        self.flights = SingleFlight()
+        
+        # Paces requests to stay under the API's rate limit (30 requests per minute on the free tier)
+        self.limiter = get_limiter("groq", 0.5, 5)
+        
+        # Longest waits for a rate limiter token and for a 429's Retry-After, in seconds
+        self.rate_limit_timeout = float(os.environ.get("GROQ_RATE_LIMIT_TIMEOUT", 30))
+        self.max_retry_after = float(os.environ.get("GROQ_MAX_RETRY_AFTER", 30))
+        
         # Template for answering questions
         self.qa_template = """You are a helpful research assistant. Your task is to provide accurate, detailed answers based on the provided context.
 
@@ -67,6 +85,9 @@ Remember to provide a well-structured answer with proper formatting and citation
         """
         Answer a question based on context using Groq API
         
+        Concurrent calls with the same question (ignoring case and whitespace) and the
+        same context share one API call.
+        
         Args:
             question: Question to answer
             context: Context for answering the question
@@ -74,6 +95,14 @@ Remember to provide a well-structured answer with proper formatting and citation
         Returns:
             Answer to the question
         """
+        key = hashlib.sha256(
+            f"{self.model}\0{' '.join(question.lower().split())}\0{context}".encode("utf-8")
+        ).hexdigest()
+        answer, _ = self.flights.do(key, self._answer_question, question, context)
+        return answer
+    
+    def _answer_question(self, question: str, context: str) -> str:
+        """Answer a question with one Groq API request (with retries), or the fallback answer"""
         try:
             # Log the question for debugging
             logger.info(f"Processing question: {question[:100]}...")
@@ -99,6 +128,7 @@ Remember to provide a well-structured answer with proper formatting and citation
             
             while retry_count < max_retries:
                 try:
+                    self._acquire()
                     response = requests.post(
                         self.api_url, 
                         headers=self.headers, 
@@ -123,7 +153,7 @@ Remember to provide a well-structured answer with proper formatting and citation
                     
                     elif response.status_code == 429:  # Rate limit
                         retry_count += 1
-                        wait_time = 2 ** retry_count  # Exponential backoff
+                        wait_time = self._retry_after(response, retry_count)
                         logger.warning(f"Rate limited. Retrying in {wait_time} seconds...")
                         time.sleep(wait_time)
                     
@@ -140,10 +170,51 @@ Remember to provide a well-structured answer with proper formatting and citation
             logger.error("Failed to get response from LLM API after retries")
             return self._fallback_answer(question, context)
             
+        except RateLimited as e:
+            logger.warning(f"{e}, answering without the LLM")
+            return self._fallback_answer(question, context)
         except Exception as e:
             logger.error(f"Error answering question: {e}")
             return self._fallback_answer(question, context)
             
+    def _acquire(self):
+        """
+        Wait for the Groq rate limiter, but no longer than rate_limit_timeout
+        
+        Raises:
+            RateLimited: If the wait would be longer (no token is used up)
+        """
+        if self.limiter.acquire(self.rate_limit_timeout) is None:
+            raise RateLimited(f"{self.limiter.name} rate limit would exceed {self.rate_limit_timeout}s")
+    
+    def _retry_after(self, response: requests.Response, retry_count: int) -> float:
+        """
+        Seconds to wait before retrying a rate-limited request
+        
+        Uses the Retry-After header (in seconds or as an HTTP date) when it is valid, else
+        exponential backoff, and never more than max_retry_after.
+        
+        Args:
+            response: The 429 response
+            retry_count: Retries made so far, including this one
+            
+        Returns:
+            Seconds to wait
+        """
+        header = response.headers.get("retry-after")
+        wait_time = None
+        if header:
+            try:
+                wait_time = float(header)
+            except ValueError:
+                try:
+                    wait_time = parsedate_to_datetime(header).timestamp() - time.time()
+                except (TypeError, ValueError):
+                    logger.warning(f"Ignoring invalid Retry-After header: {header!r}")
+        if wait_time is None or not math.isfinite(wait_time):
+            wait_time = 2 ** retry_count  # Exponential backoff
+        return min(max(0.0, wait_time), self.max_retry_after)
+    
     def _post_process_answer(self, answer: str, question: str) -> str:
         """
         Post-process the answer to ensure proper formatting
@@ -0,0 +1,172 @@
+import os
+import time
+import struct
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: limiters stay per process
+    fcntl = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Bucket state in a shared file: tokens available (negative when requests are queued) and refill time
+STATE_FORMAT = "dd"
+
+class RateLimiter:
+    """
+    Token bucket limiting requests to one upstream API
+
+    Tokens refill at `rate` per second up to `burst`. acquire() takes a token, and when
+    none is left it reserves the next one and sleeps until then, so callers queue in
+    arrival order instead of being rejected (unless the wait would exceed their
+    timeout). The bucket is shared by all threads of the process and, when given a
+    state file, by every process using the same file.
+    """
+
+    def __init__(self, name: str, rate: float, burst: Optional[float] = None, state_path: Optional[str] = None):
+        """
+        Initialize the rate limiter
+
+        Args:
+            name: Upstream name, for logs and stats
+            rate: Requests per second
+            burst: Requests allowed at once after an idle period (defaults to max(1, rate))
+            state_path: File holding the bucket, to share it across processes (POSIX only)
+        """
+        self.name = name
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._refilled_at = time.time()
+        self.acquired = 0
+        self.queued = 0
+        self.timeouts = 0  # Requests refused because the wait would exceed their timeout
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+        self._fd = None
+        if state_path is not None:
+            if fcntl is None:
+                logger.warning(f"File locking unavailable, {name} rate limit applies per process")
+            else:
+                self._fd = os.open(state_path, os.O_RDWR | os.O_CREAT, 0o644)
+
+    def _reserve(self, timeout: Optional[float]) -> Optional[float]:
+        """
+        Take a token, or reserve the next one (caller holds the lock)
+        
+        Returns:
+            Seconds to wait, or None (and nothing reserved) if that would exceed the timeout
+        """
+        now = time.time()
+        tokens, refilled_at = self._tokens, self._refilled_at
+        if self._fd is not None:
+            state = os.pread(self._fd, struct.calcsize(STATE_FORMAT), 0)
+            if len(state) == struct.calcsize(STATE_FORMAT):
+                tokens, refilled_at = struct.unpack(STATE_FORMAT, state)
+
+        tokens = min(self.burst, tokens + max(0.0, now - refilled_at) * self.rate) - 1
+        wait = max(0.0, -tokens / self.rate)
+        if timeout is not None and wait > timeout:
+            return None
+        self._tokens, self._refilled_at = tokens, now
+        if self._fd is not None:
+            os.pwrite(self._fd, struct.pack(STATE_FORMAT, tokens, now), 0)
+        return wait
+
+    def acquire(self, timeout: Optional[float] = None) -> Optional[float]:
+        """
+        Wait for permission to send one request
+
+        Args:
+            timeout: Longest acceptable wait in seconds (None waits as long as needed)
+
+        Returns:
+            Seconds spent queueing, or None without waiting (or using up a token) if the
+            request could not be let through within the timeout
+        """
+        with self._lock:
+            if self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+                try:
+                    wait = self._reserve(timeout)
+                finally:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                wait = self._reserve(timeout)
+            if wait is None:
+                self.timeouts += 1
+                return None
+            self.acquired += 1
+            if wait > 0:
+                self.queued += 1
+                self.wait_seconds += wait
+                self.max_wait_seconds = max(self.max_wait_seconds, wait)
+
+        if wait > 0:
+            if wait >= 1:
+                logger.info(f"Queueing {self.name} request for {wait:.1f}s")
+            time.sleep(wait)
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        """Requests let through, how many queued, and the queueing delay"""
+        with self._lock:
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "shared": self._fd is not None,
+                "acquired": self.acquired,
+                "queued": self.queued,
+                "timeouts": self.timeouts,
+                "wait_seconds": round(self.wait_seconds, 3),
+                "mean_wait_ms": round(self.wait_seconds / self.acquired * 1000, 1) if self.acquired else 0.0,
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 1),
+            }
+
+_limiters = {}  # name -> RateLimiter
+_limiters_lock = threading.Lock()
+
+def get_limiter(name: str, default_rate: float, default_burst: Optional[float] = None) -> RateLimiter:
+    """
+    Process-wide limiter for an upstream, created on first use
+
+    The rate and burst can be overridden with <NAME>_RATE_LIMIT (requests per second) and
+    <NAME>_RATE_BURST; if RATE_LIMIT_DIR is set, the bucket is kept in a file there and
+    shared with other processes.
+
+    Args:
+        name: Upstream name, e.g. "ncbi"
+        default_rate: Requests per second when not configured
+        default_burst: Burst when not configured (defaults to max(1, rate))
+
+    Returns:
+        The limiter
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            rate = float(os.environ.get(f"{name.upper()}_RATE_LIMIT") or default_rate)
+            burst = os.environ.get(f"{name.upper()}_RATE_BURST")
+            state_dir = os.environ.get("RATE_LIMIT_DIR")
+            if state_dir:
+                os.makedirs(state_dir, exist_ok=True)
+            limiter = _limiters[name] = RateLimiter(
+                name,
+                rate,
+                float(burst) if burst else default_burst,
+                os.path.join(state_dir, f"{name}.bucket") if state_dir else None
+            )
+        return limiter
+
+def limiter_stats() -> Dict[str, Dict[str, Any]]:
+    """Stats of every limiter created so far"""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.stats() for limiter in limiters}
@@ -0,0 +1,134 @@
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class SearchCache:
+    """
+    Persistent cache of academic search results in SQLite
+
+    Entries are keyed by source, normalized query and max_results. An entry is fresh for
+    `ttl` seconds, then stale for another `stale_ttl` seconds: a stale entry is still
+    served, and the caller refreshes it in the background. Least recently used entries
+    are evicted once the cache outgrows its size budget. The database is opened in WAL
+    mode, so several worker processes can share one file.
+    """
+
+    def __init__(self, path: str, ttl: float = 86400, stale_ttl: float = 604800, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Initialize the search cache
+
+        Args:
+            path: SQLite database file (created if missing)
+            ttl: Seconds an entry is served without a refresh
+            stale_ttl: Further seconds an expired entry is served while it is refreshed
+            max_bytes: Budget for the stored results
+        """
+        self.path = path
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, results TEXT NOT NULL, size INTEGER NOT NULL, "
+            "stored_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS results_used_at ON results (used_at)")
+
+    @staticmethod
+    def key(source: str, query: str, max_results: int) -> str:
+        """
+        Cache key of a search
+
+        Args:
+            source: Provider name
+            query: Search query (case and whitespace are ignored)
+            max_results: Maximum number of results requested
+
+        Returns:
+            Key of the entry
+        """
+        return f"{source}|{max_results}|{' '.join(query.lower().split())}"
+
+    def get(self, key: str) -> Optional[Tuple[List[Dict[str, Any]], bool]]:
+        """
+        Look up cached results
+
+        Args:
+            key: Cache key (see key())
+
+        Returns:
+            (results, fresh) where fresh is False for a stale entry that should be
+            refreshed, or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT results, stored_at FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl + self.stale_ttl:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE results SET used_at = ? WHERE key = ?", (now, key))
+            fresh = now - row[1] <= self.ttl
+            if fresh:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+        return json.loads(row[0]), fresh
+
+    def put(self, key: str, results: List[Dict[str, Any]]):
+        """
+        Store results, replacing any previous entry
+
+        Args:
+            key: Cache key (see key())
+            results: Paper information as returned by the provider
+        """
+        data = json.dumps(results, default=str)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (key, results, size, stored_at, used_at) VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), now, now)
+            )
+            self._evict()
+
+    def _evict(self):
+        """Remove expired entries, then least recently used ones until the cache fits its budget (caller holds the lock)"""
+        self._db.execute("DELETE FROM results WHERE stored_at < ?", (time.time() - self.ttl - self.stale_ttl,))
+        size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if size <= self.max_bytes:
+            return
+        for key, entry_size in self._db.execute("SELECT key, size FROM results ORDER BY used_at").fetchall():
+            if size <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+            size -= entry_size
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters and current size"""
+        with self._lock:
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": entries,
+                "bytes": size,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,77 @@
+import threading
+from typing import Dict, Any, Callable, Hashable, Tuple
+
+class _Call:
+    """A call in flight, shared by everyone asking for the same key"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls into one
+
+    The first caller for a key runs the function; callers arriving with the same key
+    while it runs wait for it and get the same result (or exception). Nothing is kept
+    once the call returns, so this is not a cache: the next call for the key runs again.
+    Shared results are returned as-is, so callers must not mutate them.
+    """
+
+    def __init__(self):
+        """Initialize the coalescing layer"""
+        self._calls = {}  # key -> _Call
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, function: Callable[..., Any], *args, **kwargs) -> Tuple[Any, bool]:
+        """
+        Run a function, or join an identical call already running
+
+        Args:
+            key: Identifies identical calls (normalized inputs)
+            function: Called with *args and **kwargs if no call for the key is running
+
+        Returns:
+            The result and whether it was shared with a call started by another caller
+
+        Raises:
+            Whatever the function raised
+        """
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = function(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def stats(self) -> Dict[str, Any]:
+        """Calls made, upstream calls saved by coalescing, and calls currently in flight"""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "upstream_calls": self.calls - self.coalesced,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+            }
@@ -0,0 +1,78 @@
+import time
+
+import numpy as np
+
+from document_processing.ann import IVFIndex
+from document_processing.dense import VectorStore
+from document_processing.vectordb import DenseVectorDatabase, HybridVectorDatabase
+
+def make_vectors(count: int, dim: int = 32, clusters: int = 20, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centres[rng.integers(0, clusters, count)] + 0.3 * rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def test_untrained_index_searches_exactly():
+    store = VectorStore(32)
+    ivf = IVFIndex(store, min_train_size=100)
+    ivf.add(store.add(make_vectors(50)))
+    assert not ivf.needs_training and not ivf.is_trained
+    query = make_vectors(1, seed=1)[0]
+    assert ivf.search(query, 5) == store.search(query, 5)
+
+def test_training_is_left_to_the_caller():
+    store = VectorStore(32)
+    ivf = IVFIndex(store, min_train_size=100, retrain_factor=2.0)
+    ivf.add(store.add(make_vectors(150)))
+    assert ivf.needs_training and not ivf.is_trained
+
+    ivf.train()
+    assert ivf.trained_size == 150 and not ivf.needs_training
+    ivf.add(store.add(make_vectors(100, seed=2)))
+    assert sum(len(ordinals) for ordinals in ivf.lists) == 250
+    ivf.add(store.add(make_vectors(100, seed=3)))
+    assert ivf.needs_training
+
+def test_install_after_fit_catches_up():
+    store = VectorStore(32)
+    ivf = IVFIndex(store, nlist=10, min_train_size=100)
+    store.add(make_vectors(300))
+    centroids, lists = ivf.fit(300)
+    store.add(make_vectors(50, seed=4))  # Added while training
+
+    ivf.assign(300, len(store), centroids, lists)
+    ivf.install(centroids, lists, 300)
+    listed = np.sort(np.concatenate([np.frombuffer(ordinals, dtype=np.uint32) for ordinals in ivf.lists]))
+    assert listed.tolist() == list(range(350))
+
+def test_recall_with_all_lists_probed():
+    store = VectorStore(32)
+    ivf = IVFIndex(store, nlist=16, min_train_size=100)
+    ivf.add(store.add(make_vectors(2000)))
+    ivf.train()
+    for query in make_vectors(20, seed=5):
+        exact = [ordinal for ordinal, _ in store.search(query, 10)]
+        assert [ordinal for ordinal, _ in ivf.search(query, 10, nprobe=16)] == exact
+        assert len(ivf.search(query, 10, nprobe=2)) == 10
+
+def make_documents(count: int):
+    rng = np.random.default_rng(0)
+    return [
+        {"id": f"doc{i}", "content": " ".join(f"word{n}" for n in rng.integers(0, 300, 20)), "metadata": {}}
+        for i in range(count)
+    ]
+
+def test_database_trains_in_background():
+    for backend in (DenseVectorDatabase, HybridVectorDatabase):
+        db = backend(dim=128, ann_index="ivf")
+        ann = db._dense_index(db.index).ann
+        ann.min_train_size = 200
+        documents = make_documents(400)
+        db.add_documents(documents[:250])
+        while db._training:
+            time.sleep(0.01)
+        assert ann.is_trained and ann.trained_size == 250
+
+        db.add_documents(documents[250:])
+        assert sum(len(ordinals) for ordinals in ann.lists) == 400
+        assert db.search(documents[300]["content"], 1)[0]["id"] == "doc300"
@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+from document_processing.chunker import Chunker
+
+def make_paragraphs(rng: random.Random, count: int, max_sentences: int):
+    vocab = [f"w{i}" for i in range(5000)]
+    paragraphs = []
+    for _ in range(count):
+        sentences = [
+            " ".join(rng.choices(vocab, k=rng.randint(3, 25))).capitalize() + rng.choice(".!?")
+            for _ in range(rng.randint(1, max_sentences))
+        ]
+        paragraphs.append(" ".join(sentences))
+    return paragraphs
+
+def check_chunks(chunker: Chunker, paragraphs, chunks):
+    """Chunks fit the budget, are taken from the text in order, and cover all of it (whitespace aside)"""
+    text = " ".join("\n\n".join(paragraphs).split())
+    assert chunks
+    position = -1
+    end = 0
+    for chunk in chunks:
+        assert chunk.strip()
+        assert chunker.measure(chunk) <= chunker.size
+        chunk = " ".join(chunk.split())
+        start = text.find(chunk, position + 1)
+        assert start >= 0
+        # Consecutive chunks overlap by at most the overlap budget, and skip nothing but whitespace
+        assert not text[end:start].strip()
+        if start < end:
+            assert chunker.measure(text[start:end]) <= chunker.overlap
+        position, end = start, start + len(chunk)
+    assert not text[end:].strip()
+
+@pytest.mark.parametrize("unit, size, overlap", [("chars", 500, 0), ("chars", 1000, 100), ("tokens", 120, 15)])
+@pytest.mark.parametrize("max_sentences", [3, 60])
+def test_chunk_invariants(unit, size, overlap, max_sentences):
+    rng = random.Random(size + max_sentences)
+    chunker = Chunker(size, overlap, unit)
+    paragraphs = make_paragraphs(rng, 80, max_sentences)
+    check_chunks(chunker, paragraphs, list(chunker.chunks(paragraphs)))
+
+def test_text_within_budget_is_one_unchanged_chunk():
+    chunker = Chunker(1000, 100, "chars")
+    paragraphs = ["First paragraph.", "", "Second one, with  odd   spacing."]
+    assert list(chunker.chunks(paragraphs)) == ["First paragraph.\n\nSecond one, with  odd   spacing."]
+    assert list(chunker.split("A page.\nNext line.")) == ["A page.\nNext line."]
+
+def test_words_longer_than_budget_are_cut():
+    chunker = Chunker(10, 0, "chars")
+    chunks = list(chunker.split("x" * 25 + " tail"))
+    assert chunks == ["x" * 10, "x" * 10, "x" * 5 + " tail"]
+
+@pytest.mark.parametrize("size, overlap, unit", [(100, 100, "chars"), (100, -1, "chars"), (100, 10, "pages")])
+def test_invalid_settings(size, overlap, unit):
+    with pytest.raises(ValueError):
+        Chunker(size, overlap, unit)
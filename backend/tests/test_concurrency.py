@@ -0,0 +1,132 @@
+import random
+import threading
+import time
+
+import pytest
+
+from document_processing.vectordb import (
+    SimpleVectorDatabase,
+    DenseVectorDatabase,
+    HybridVectorDatabase,
+    ShardedVectorDatabase,
+)
+
+BATCH_SIZE = 10
+BATCHES = 30
+
+def make_batch(writer: int, batch: int, rng: random.Random):
+    """Chunks carrying a token unique to their batch, so a search can count how much of it is visible"""
+    vocab = [f"word{i}" for i in range(500)]
+    return [
+        {
+            "id": f"w{writer}b{batch}d{i}",
+            "content": f"batch{writer}x{batch} " + " ".join(rng.choices(vocab, k=30)),
+            "metadata": {"source": f"writer{writer}.pdf", "page": batch},
+        }
+        for i in range(BATCH_SIZE)
+    ]
+
+def run_threads(targets, errors):
+    def guarded(target):
+        try:
+            target()
+        except BaseException as e:  # Reported by the test thread
+            errors.append(e)
+
+    threads = [threading.Thread(target=guarded, args=(target,)) for target in targets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(60)
+    assert not any(thread.is_alive() for thread in threads)
+
+@pytest.mark.parametrize("backend", [SimpleVectorDatabase, DenseVectorDatabase, HybridVectorDatabase])
+def test_parallel_add_search_delete(backend):
+    db = backend(compaction_threshold=0.1)
+    writers = 3
+    added = []  # Batches fully added, as (writer, batch)
+    deleted = set()  # IDs whose deletion has returned
+    lock = threading.Lock()
+    done = threading.Event()
+    errors = []
+    searches = [0]
+
+    def writer(number):
+        rng = random.Random(number)
+        for batch in range(BATCHES):
+            db.add_documents(make_batch(number, batch, rng))
+            with lock:
+                added.append((number, batch))
+
+    def deleter():
+        rng = random.Random(-1)
+        while not done.is_set():
+            with lock:
+                # Only even batches are deleted from; odd ones stay whole
+                candidates = [(w, b) for w, b in added if b % 2 == 0]
+            if candidates:
+                w, b = rng.choice(candidates)
+                doc_id = f"w{w}b{b}d{rng.randrange(BATCH_SIZE)}"
+                db.delete_documents([doc_id])
+                with lock:
+                    deleted.add(doc_id)
+            time.sleep(0.001)
+
+    def searcher():
+        rng = random.Random(-2)
+        while not done.is_set():
+            with lock:
+                gone = set(deleted)
+                complete = [(w, b) for w, b in added if b % 2]
+            query = rng.choice(["word1 word2", "word7", "word100 word200 word300"] + [f"batch{w}x{b}" for w, b in complete[-5:]])
+            results = db.search(query, 20)
+            searches[0] += 1
+            assert all(result["id"] not in gone for result in results)
+            scores = [result["score"] for result in results]
+            assert scores == sorted(scores, reverse=True)
+            assert all(result["content"].startswith("batch") for result in results)
+
+            # A batch is published in one step: a search sees all of it or none of it
+            if backend is SimpleVectorDatabase and complete:
+                w, b = rng.choice(complete)
+                batch = [result["id"] for result in db.search(f"batch{w}x{b}", 20)]
+                assert len(batch) == BATCH_SIZE and all(doc_id.startswith(f"w{w}b{b}d") for doc_id in batch)
+
+    writer_threads = [lambda number=number: writer(number) for number in range(writers)]
+
+    def writers_then_stop():
+        try:
+            run_threads(writer_threads, errors)
+        finally:
+            done.set()
+
+    run_threads([writers_then_stop, deleter, searcher, searcher], errors)
+    assert not errors, errors
+    assert searches[0] > 0
+
+    while db._compacting:
+        time.sleep(0.01)
+    expected = {f"w{w}b{b}d{i}" for w in range(writers) for b in range(BATCHES) for i in range(BATCH_SIZE)} - deleted
+    assert set(db.ordinals) == expected
+    assert set(db.documents) == expected
+    assert all(db.document_ids[ordinal] == doc_id for doc_id, ordinal in db.ordinals.items())
+    assert len(db.index) - db.index.deleted_count == len(expected)
+
+def test_sessions_stay_isolated_under_concurrency():
+    db = ShardedVectorDatabase(factory=SimpleVectorDatabase)
+    errors = []
+
+    def session(number):
+        rng = random.Random(number)
+        session_id = f"s{number}"
+        for batch in range(BATCHES):
+            db.add_documents(make_batch(number, batch, rng), session_id)
+            results = db.search("word1 word2 word3", session_id, 10)
+            assert all(result["id"].startswith(f"w{number}b") for result in results)
+            if batch % 3 == 0:
+                assert db.delete_documents([f"w{number}b{batch}d0"], session_id) == 1
+
+    run_threads([lambda number=number: session(number) for number in range(4)], errors)
+    assert not errors, errors
+    for number in range(4):
+        assert len(db.get_shard(f"s{number}").ordinals) == BATCHES * BATCH_SIZE - BATCHES // 3
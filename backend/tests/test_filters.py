@@ -0,0 +1,81 @@
+import random
+
+import pytest
+
+from document_processing.filters import MetadataIndex, intersect_sorted
+
+def make_metadata(rng: random.Random, count: int):
+    metadata = []
+    for _ in range(count):
+        if rng.random() < 0.1:
+            metadata.append(None)  # Deleted placeholder
+            continue
+        metadata.append({
+            "source": rng.choice(["a.pdf", "b.pdf", "c.docx"]),
+            "chunk_type": rng.choice(["text", "table"]),
+            "page": rng.choice([rng.randint(1, 40), None]),
+            "table_index": rng.choice([None, 0, 1]),
+        })
+    return metadata
+
+def expected(metadata, filters):
+    ordinals = []
+    for ordinal, meta in enumerate(metadata):
+        if meta is None and filters:
+            continue
+        if any(meta.get(name) != filters[name] for name in ("source", "chunk_type", "table_index") if name in filters):
+            continue
+        if "page_from" in filters or "page_to" in filters:
+            page = meta.get("page")
+            if page is None or page < filters.get("page_from", page) or page > filters.get("page_to", page):
+                continue
+        ordinals.append(ordinal)
+    return ordinals
+
+@pytest.mark.parametrize("seed", range(5))
+def test_select_matches_brute_force(seed):
+    rng = random.Random(seed)
+    metadata = make_metadata(rng, 500)
+    index = MetadataIndex()
+    # Added in batches, as uploads arrive
+    for start in range(0, len(metadata), 70):
+        index.add(metadata[start:start + 70])
+    assert len(index) == len(metadata)
+
+    for _ in range(100):
+        filters = {}
+        for name, values in (("source", ["a.pdf", "b.pdf", "x.pdf"]), ("chunk_type", ["text", "table"]), ("table_index", [0, 1])):
+            if rng.random() < 0.3:
+                filters[name] = rng.choice(values)
+        if rng.random() < 0.5:
+            filters["page_from"] = rng.randint(0, 42)
+        if rng.random() < 0.5:
+            filters["page_to"] = rng.randint(0, 42)
+        assert list(index.select(filters)) == expected(metadata, filters)
+
+def test_select_without_filters_returns_every_ordinal():
+    index = MetadataIndex()
+    index.add([{"source": "a.pdf"}, None, {}])
+    assert list(index.select({})) == [0, 1, 2]
+
+def test_unknown_filter():
+    with pytest.raises(ValueError):
+        MetadataIndex().select({"author": "x"})
+
+def test_intersect_sorted():
+    assert intersect_sorted([1, 4, 9, 12], [0, 1, 2, 3, 4, 10, 12]) == [1, 4, 12]
+    assert intersect_sorted([5], []) == []
+
+def test_page_runs_stay_few_as_batches_arrive():
+    rng = random.Random(9)
+    index = MetadataIndex()
+    metadata = []
+    for _ in range(300):
+        batch = [{"page": rng.randint(1, 20)} for _ in range(rng.randint(1, 8))]
+        index.add(batch)
+        metadata.extend(batch)
+        assert len(index.page_runs) <= len(metadata).bit_length()
+
+    for page_from, page_to in ((5, 5), (3, 9), (None, 2), (18, None)):
+        filters = {name: value for name, value in (("page_from", page_from), ("page_to", page_to)) if value is not None}
+        assert list(index.select(filters)) == expected(metadata, filters)
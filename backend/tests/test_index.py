@@ -0,0 +1,129 @@
+import math
+import random
+from collections import Counter
+
+import pytest
+
+from document_processing.index import InvertedIndex
+from document_processing.segment import SegmentedIndex
+
+def make_corpus(rng: random.Random, documents: int = 400, vocab: int = 300):
+    """Documents of 5-60 tokens drawn from a skewed vocabulary, so some terms are common"""
+    words = [f"t{i}" for i in range(vocab)]
+    weights = [1.0 / (rank + 1) for rank in range(vocab)]
+    return [rng.choices(words, weights, k=rng.randint(5, 60)) for _ in range(documents)]
+
+def scores(results):
+    return [round(score, 9) for _, score in results]
+
+def reference_bm25(corpus, query, k1=1.5, b=0.75):
+    """BM25 scores of every matching document, straight from the formula"""
+    avgdl = sum(len(tokens) for tokens in corpus) / len(corpus)
+    df = Counter(term for tokens in corpus for term in set(tokens))
+    result = {}
+    for ordinal, tokens in enumerate(corpus):
+        tf = Counter(tokens)
+        score = 0.0
+        for term, qtf in Counter(query).items():
+            if tf[term]:
+                idf = math.log(1.0 + (len(corpus) - df[term] + 0.5) / (df[term] + 0.5))
+                score += qtf * idf * tf[term] * (k1 + 1.0) / (tf[term] + k1 * (1.0 - b + b * len(tokens) / avgdl))
+        if score:
+            result[ordinal] = score
+    return result
+
+def test_scores_match_bm25_formula():
+    rng = random.Random(0)
+    corpus = make_corpus(rng, documents=200)
+    index = InvertedIndex()
+    assert [index.add(tokens) for tokens in corpus] == list(range(len(corpus)))
+
+    for _ in range(20):
+        query = rng.sample(corpus[rng.randrange(len(corpus))], 2) + ["missing"]
+        expected = reference_bm25(corpus, query)
+        results = index.search(query, len(corpus), prune=False)
+        assert len(results) == len(expected)
+        for ordinal, score in results:
+            assert score == pytest.approx(expected[ordinal])
+        assert [score for _, score in results] == sorted((score for _, score in results), reverse=True)
+
+def test_extend_matches_adding_one_by_one():
+    rng = random.Random(1)
+    corpus = make_corpus(rng, documents=150)
+    single = InvertedIndex()
+    for tokens in corpus:
+        single.add(tokens)
+
+    merged = InvertedIndex()
+    for start in range(0, len(corpus), 40):
+        batch = InvertedIndex()
+        for tokens in corpus[start:start + 40]:
+            batch.add(tokens)
+        assert merged.extend(batch) == range(start, min(start + 40, len(corpus)))
+
+    assert merged.doc_lengths == single.doc_lengths
+    for term, posting_list in single.postings.items():
+        other = merged.postings[term]
+        assert (other.ordinals, other.freqs, other.max_tf, other.min_length) == \
+            (posting_list.ordinals, posting_list.freqs, posting_list.max_tf, posting_list.min_length)
+
+def test_empty_index_and_unknown_terms():
+    index = InvertedIndex()
+    assert index.search(["anything"]) == []
+    index.add(["known"])
+    assert index.search(["unknown"]) == []
+    assert index.search(["known"], top_k=0) == []
+
+@pytest.mark.parametrize("seed", range(5))
+def test_maxscore_matches_exhaustive(seed):
+    rng = random.Random(seed)
+    corpus = make_corpus(rng)
+    index = InvertedIndex()
+    for tokens in corpus:
+        index.add(tokens)
+    for ordinal in rng.sample(range(len(corpus)), 40):
+        index.delete(ordinal)
+
+    for _ in range(50):
+        query = rng.sample(corpus[rng.randrange(len(corpus))], 3) + [f"t{rng.randrange(300)}"]
+        top_k = rng.choice([1, 5, 20])
+        pruned = index.search(query, top_k)
+        exhaustive = index.search(query, top_k, prune=False)
+        assert scores(pruned) == scores(exhaustive)
+        assert not any(index.deleted[ordinal] for ordinal, _ in pruned)
+
+def test_segmented_index_matches_single_index():
+    rng = random.Random(7)
+    corpus = make_corpus(rng)
+    single = InvertedIndex()
+    for tokens in corpus:
+        single.add(tokens)
+
+    parts = []
+    for start in range(0, 300, 100):
+        part = InvertedIndex()
+        for tokens in corpus[start:start + 100]:
+            part.add(tokens)
+        parts.append(part)
+    segmented = SegmentedIndex(parts, InvertedIndex())
+    for tokens in corpus[300:]:
+        segmented.add(tokens)
+
+    for _ in range(30):
+        query = rng.sample(corpus[rng.randrange(len(corpus))], 3)
+        assert scores(segmented.search(query, 10)) == scores(single.search(query, 10, prune=False))
+
+@pytest.mark.parametrize("seed", range(3))
+def test_maxscore_matches_exhaustive_with_allowed(seed):
+    rng = random.Random(seed)
+    corpus = make_corpus(rng)
+    index = InvertedIndex()
+    for tokens in corpus:
+        index.add(tokens)
+    allowed = sorted(rng.sample(range(len(corpus)), 100))
+
+    for _ in range(30):
+        query = rng.sample(corpus[rng.randrange(len(corpus))], 3)
+        pruned = index.search(query, 10, allowed=allowed)
+        assert scores(pruned) == scores(index.search(query, 10, prune=False, allowed=allowed))
+        assert {ordinal for ordinal, _ in pruned} <= set(allowed)
@@ -0,0 +1,31 @@
+import os
+
+from document_processing.parse_cache import ParseCache
+
+def make_chunks(count: int):
+    return [
+        {"id": f"c{i}", "content": f"chunk {i}", "metadata": {"source": "old.pdf", "page": i}}
+        for i in range(count)
+    ]
+
+def test_put_then_get_under_a_new_name(tmp_path):
+    cache = ParseCache(str(tmp_path))
+    key = ParseCache.key("abc", ".pdf")
+    assert cache.get(key, "new.pdf") is None
+
+    cache.put(key, make_chunks(3))
+    chunks = list(cache.get(key, "new.pdf"))
+    assert [chunk["content"] for chunk in chunks] == ["chunk 0", "chunk 1", "chunk 2"]
+    assert all(chunk["metadata"]["source"] == "new.pdf" for chunk in chunks)
+    assert [chunk["metadata"]["page"] for chunk in chunks] == [0, 1, 2]
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+def test_abandoned_record_leaves_no_entry(tmp_path):
+    cache = ParseCache(str(tmp_path))
+    key = ParseCache.key("abc", ".pdf")
+    chunks = cache.record(key, make_chunks(3))
+    assert next(chunks)["id"] == "c0"
+    chunks.close()
+
+    assert cache.get(key, "new.pdf") is None
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,36 @@
+import io
+import random
+
+import pytest
+
+from document_processing import parser
+from document_processing.chunker import Chunker
+from document_processing.parser import DocumentParser
+
+@pytest.mark.parametrize("seed", range(20))
+def test_text_paragraphs_match_split(seed, monkeypatch):
+    monkeypatch.setattr(parser, "READ_BLOCK_SIZE", 7)
+    rng = random.Random(seed)
+    text = "".join(rng.choice(["a", "b ", "\n", "\n\n", "\n\n\n", "word "]) for _ in range(400))
+    paragraphs = list(DocumentParser._iter_paragraphs(io.StringIO(text), 10 ** 6))
+    assert paragraphs == text.split("\n\n")
+
+def test_long_text_paragraph_is_cut_at_whitespace(monkeypatch):
+    monkeypatch.setattr(parser, "READ_BLOCK_SIZE", 64)
+    text = " ".join(f"word{i}" for i in range(2000))  # No paragraph break at all
+    paragraphs = list(DocumentParser._iter_paragraphs(io.StringIO(text), 500))
+    assert "".join(paragraphs) == text
+    assert all(len(paragraph) <= 500 + 64 for paragraph in paragraphs)
+    assert all(paragraph.endswith(" ") for paragraph in paragraphs[:-1])
+
+def test_txt_without_breaks_is_chunked(tmp_path):
+    rng = random.Random(3)
+    words = [f"w{rng.randrange(5000)}" for _ in range(60000)]
+    path = tmp_path / "long.txt"
+    path.write_text(" ".join(words), encoding="utf-8")
+
+    chunker = Chunker(1000, 0, "chars")
+    chunks = [chunk["content"] for chunk in DocumentParser._iter_txt(str(path), "long.txt", chunker)]
+    assert len(chunks) > 300
+    assert all(len(chunk) <= 1000 for chunk in chunks)
+    assert " ".join(chunks).split() == words
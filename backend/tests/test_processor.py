@@ -0,0 +1,85 @@
+import io
+import threading
+
+import pytest
+
+from document_processing.processor import DocumentProcessor, IngestionCancelled
+from document_processing.vectordb import ShardedVectorDatabase, SimpleVectorDatabase
+
+class BlockingDatabase(SimpleVectorDatabase):
+    """Shard whose writes wait until released, to hold an ingestion mid-write"""
+
+    def __init__(self, release: threading.Event, writing: threading.Event, **kwargs):
+        super().__init__(**kwargs)
+        self.release = release
+        self.writing = writing
+
+    def add_documents(self, documents):
+        self.writing.set()
+        assert self.release.wait(10)
+        return super().add_documents(documents)
+
+def make_text(words: int) -> bytes:
+    return " ".join(f"word{i % 97}" for i in range(words)).encode("utf-8")
+
+@pytest.fixture
+def processor(monkeypatch):
+    monkeypatch.setenv("PARSE_CACHE_MB", "0")
+    release = threading.Event()
+    writing = threading.Event()
+    blocked = {"slow"}
+
+    def factory():
+        if blocked:
+            blocked.pop()
+            return BlockingDatabase(release, writing)
+        return SimpleVectorDatabase()
+
+    processor = DocumentProcessor(vector_db=ShardedVectorDatabase(factory=factory))
+    processor.release, processor.writing = release, writing
+    yield processor
+    release.set()
+
+def ingest_in_thread(processor, session_id, outcome):
+    upload = processor.save_upload(io.BytesIO(make_text(500)), "slow.txt")
+
+    def run():
+        try:
+            outcome["result"] = processor.ingest_file(upload, session_id)
+        except Exception as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    assert processor.writing.wait(10)
+    return thread
+
+def test_sessions_ingest_concurrently(processor):
+    outcome = {}
+    thread = ingest_in_thread(processor, "slow-session", outcome)
+
+    # While the first session's write is held, another session indexes and the processor stays usable
+    info = processor.process_file(io.BytesIO(make_text(300)), "fast.txt", "fast-session")
+    assert info["chunk_count"] > 0
+    assert processor.search_documents("word5", "fast-session")
+    assert processor.get_file_info("fast-session")["files"][0]["filename"] == "fast.txt"
+    assert processor.get_file_info("slow-session") == {}
+    assert thread.is_alive()
+
+    processor.release.set()
+    thread.join(10)
+    assert outcome["result"]["chunk_count"] > 0
+    assert processor.search_documents("word5", "slow-session")
+
+def test_clear_during_write_does_not_recreate_the_shard(processor):
+    outcome = {}
+    thread = ingest_in_thread(processor, "slow-session", outcome)
+
+    processor.clear_session("slow-session")  # Does not wait for the held write
+    processor.release.set()
+    thread.join(10)
+
+    assert isinstance(outcome["error"], IngestionCancelled)
+    assert processor.vector_db.get_shard("slow-session") is None
+    assert processor.get_file_info("slow-session") == {}
+    assert processor._ingesting == {}
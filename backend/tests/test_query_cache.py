@@ -0,0 +1,56 @@
+from document_processing.cache import QueryCache
+
+def results(content: str):
+    return [{"id": content, "content": content, "metadata": {"source": "a.pdf"}, "score": 1.0}]
+
+def test_get_returns_copies():
+    cache = QueryCache()
+    cache.put("s1", "q", results("x"), cache.generation("s1"))
+    cached = cache.get("s1", "q")
+    cached[0]["score"] = 0.0
+    assert cache.get("s1", "q")[0]["score"] == 1.0
+    assert cache.get("s2", "q") is None
+
+def test_invalidate_drops_only_that_session():
+    cache = QueryCache()
+    cache.put("s1", "q", results("x"), cache.generation("s1"))
+    cache.put("s2", "q", results("y"), cache.generation("s2"))
+    cache.invalidate("s1")
+    assert cache.get("s1", "q") is None
+    assert cache.get("s2", "q") is not None
+    assert cache.stats()["entries"] == 1
+
+def test_results_computed_before_a_change_are_not_cached():
+    cache = QueryCache()
+    generation = cache.generation("s1")
+    cache.invalidate("s1")  # Documents added while the search ran
+    cache.put("s1", "q", results("stale"), generation)
+    assert cache.get("s1", "q") is None
+
+    cache.put("s1", "q", results("fresh"), cache.generation("s1"))
+    assert cache.get("s1", "q")[0]["content"] == "fresh"
+
+def test_drop_forgets_the_session():
+    cache = QueryCache()
+    cache.invalidate("s1")
+    generation = cache.generation("s1")
+    cache.put("s1", "q", results("x"), generation)
+    cache.drop("s1")
+    assert cache.stats()["entries"] == 0 and cache.stats()["bytes"] == 0
+    assert cache._generations == {} and cache._session_keys == {}
+
+    cache.put("s1", "q", results("x"), generation)
+    assert cache.get("s1", "q") is None
+
+def test_lru_eviction_keeps_within_budget():
+    entry_size = QueryCache._estimate_size(results("x" * 100))
+    cache = QueryCache(max_bytes=entry_size * 3)
+    for i in range(3):
+        cache.put("s1", i, results("x" * 100), cache.generation("s1"))
+    cache.get("s1", 0)  # Now the most recently used
+    cache.put("s1", 3, results("x" * 100), cache.generation("s1"))
+
+    assert cache.get("s1", 1) is None
+    assert all(cache.get("s1", key) is not None for key in (0, 2, 3))
+    assert cache.stats()["evictions"] == 1
+    assert cache.size <= cache.max_bytes
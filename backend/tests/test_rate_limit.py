@@ -0,0 +1,93 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from search import llm, rate_limit
+from search.llm import LLMService
+from search.rate_limit import RateLimiter, get_limiter
+
+def test_burst_then_paced():
+    limiter = RateLimiter("test", rate=20, burst=3)
+    assert [limiter.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+
+    start = time.monotonic()
+    wait = limiter.acquire()
+    assert 0.03 < wait <= 0.05
+    assert time.monotonic() - start >= wait * 0.9
+    assert limiter.stats()["queued"] == 1
+
+def test_concurrent_callers_queue_in_turn():
+    limiter = RateLimiter("test", rate=50, burst=1)
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        waits = sorted(executor.map(lambda _: limiter.acquire(), range(5)))
+    # Each caller reserves the next free slot, 20 ms apart
+    for i, wait in enumerate(waits):
+        assert wait == pytest.approx(i * 0.02, abs=0.01)
+    assert limiter.stats()["acquired"] == 5
+
+def test_timeout_refuses_without_using_a_token():
+    limiter = RateLimiter("test", rate=10, burst=1)
+    assert limiter.acquire(timeout=0) == 0.0
+    assert limiter.acquire(timeout=0.05) is None
+    assert limiter.acquire(timeout=0.05) is None
+    assert limiter.stats()["timeouts"] == 2
+
+    # The refused requests did not push the next slot back
+    wait = limiter.acquire(timeout=1)
+    assert wait is not None and wait <= 0.1
+
+def test_state_file_shares_the_bucket(tmp_path):
+    path = str(tmp_path / "shared.bucket")
+    first = RateLimiter("test", rate=10, burst=1, state_path=path)
+    second = RateLimiter("test", rate=10, burst=1, state_path=path)
+    assert first.acquire(timeout=0) == 0.0
+    assert second.acquire(timeout=0) is None
+
+def test_get_limiter_reads_environment(monkeypatch):
+    monkeypatch.setattr(rate_limit, "_limiters", {})
+    monkeypatch.setenv("TESTAPI_RATE_LIMIT", "7")
+    monkeypatch.setenv("TESTAPI_RATE_BURST", "")
+    monkeypatch.delenv("RATE_LIMIT_DIR", raising=False)
+    limiter = get_limiter("testapi", 1, 2)
+    assert (limiter.rate, limiter.burst) == (7.0, 2)
+    assert get_limiter("testapi", 3) is limiter
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = ""
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setenv("GROQ_RATE_LIMIT_TIMEOUT", "0.05")
+    monkeypatch.setenv("GROQ_MAX_RETRY_AFTER", "2")
+    service = LLMService(api_key="test")
+    service.limiter = RateLimiter("groq", rate=1, burst=1)
+    return service
+
+@pytest.mark.parametrize("header, expected", [
+    ("1.5", 1.5),
+    ("3600", 2.0),
+    ("-5", 0.0),
+    ("nan", 2.0),
+    ("soon", 2.0),
+    ("Wed, 21 Oct 2015 07:28:00 GMT", 0.0),
+    (None, 2.0),
+])
+def test_retry_after_is_clamped(service, header, expected):
+    headers = {"retry-after": header} if header is not None else {}
+    # Invalid headers fall back to exponential backoff (2 s on the first retry), also clamped
+    assert service._retry_after(FakeResponse(429, headers), 1) == expected
+
+def test_rate_limit_timeout_falls_back(service, monkeypatch):
+    posts = []
+    monkeypatch.setattr(llm.requests, "post", lambda *args, **kwargs: posts.append(1) or FakeResponse(500))
+    service.limiter.acquire()  # Leaves no token for a second
+
+    start = time.monotonic()
+    answer = service.answer_question("What is the result?", "The result is forty two.")
+    assert time.monotonic() - start < 0.5
+    assert answer == "The result is forty two."
+    assert posts == [] and service.limiter.stats()["timeouts"] == 1
@@ -0,0 +1,40 @@
+from search import result_cache
+from search.result_cache import SearchCache
+
+def test_key_normalizes_query():
+    assert SearchCache.key("arxiv", "  Graph   Neural Nets ", 5) == SearchCache.key("arxiv", "graph neural nets", 5)
+    assert SearchCache.key("arxiv", "graph", 5) != SearchCache.key("pubmed", "graph", 5)
+
+def test_fresh_then_stale_then_expired(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(result_cache.time, "time", lambda: now[0])
+    cache = SearchCache(str(tmp_path / "cache.db"), ttl=10, stale_ttl=20)
+    cache.put("k", [{"title": "Paper"}])
+
+    assert cache.get("k") == ([{"title": "Paper"}], True)
+    now[0] += 15
+    assert cache.get("k") == ([{"title": "Paper"}], False)
+    now[0] += 20
+    assert cache.get("k") is None
+    assert (cache.hits, cache.stale_hits, cache.misses) == (1, 1, 1)
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(result_cache.time, "time", lambda: now[0])
+    entry = [{"abstract": "x" * 1000}]
+    cache = SearchCache(str(tmp_path / "cache.db"), max_bytes=2500)
+    for key in ("a", "b"):
+        cache.put(key, entry)
+        now[0] += 1
+    cache.get("a")
+    now[0] += 1
+    cache.put("c", entry)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+
+def test_entries_are_shared_through_the_file(tmp_path):
+    path = str(tmp_path / "cache.db")
+    SearchCache(path).put("k", [{"title": "Paper"}])
+    assert SearchCache(path).get("k") == ([{"title": "Paper"}], True)
@@ -0,0 +1,64 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from search.singleflight import SingleFlight
+
+def test_concurrent_calls_share_one_run():
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    runs = []
+
+    def slow(value):
+        runs.append(value)
+        started.set()
+        release.wait(5)
+        return [value]
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        leader = executor.submit(flights.do, "key", slow, 1)
+        started.wait(5)
+        followers = [executor.submit(flights.do, "key", slow, 2) for _ in range(4)]
+        while flights.stats()["coalesced"] < 4:
+            time.sleep(0.001)
+        release.set()
+        outcomes = [leader.result()] + [future.result() for future in followers]
+
+    assert runs == [1]
+    assert outcomes[0] == ([1], False)
+    assert all(outcome == ([1], True) for outcome in outcomes[1:])
+    assert outcomes[0][0] is outcomes[1][0]
+    assert flights.stats() == {"calls": 5, "upstream_calls": 1, "coalesced": 4, "in_flight": 0}
+
+def test_errors_are_shared_and_not_kept():
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("upstream down")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(flights.do, "key", failing)
+        started.wait(5)
+        follower = executor.submit(flights.do, "key", failing)
+        while flights.stats()["coalesced"] < 1:
+            time.sleep(0.001)
+        release.set()
+        for future in (leader, follower):
+            with pytest.raises(RuntimeError):
+                future.result()
+
+    # Nothing is cached: the next call runs again
+    assert flights.do("key", lambda: "ok") == ("ok", False)
+
+def test_different_keys_run_separately():
+    flights = SingleFlight()
+    assert flights.do("a", lambda: 1) == (1, False)
+    assert flights.do("b", lambda: 2) == (2, False)
+    assert flights.stats()["upstream_calls"] == 2
@@ -0,0 +1,203 @@
+import os
+import time
+import random
+
+import pytest
+
+from document_processing.segment import SEGMENT_SUFFIX, read_manifest
+from document_processing.vectordb import (
+    SimpleVectorDatabase,
+    DenseVectorDatabase,
+    HybridVectorDatabase,
+    ShardedVectorDatabase,
+)
+
+BACKENDS = [SimpleVectorDatabase, DenseVectorDatabase, HybridVectorDatabase]
+
+def make_documents(count: int, seed: int = 0, prefix: str = "doc"):
+    rng = random.Random(seed)
+    words = [f"word{i}" for i in range(200)]
+    return [
+        {
+            "id": f"{prefix}{i}",
+            "content": " ".join(rng.choices(words, k=rng.randint(5, 40))),
+            "metadata": {"source": f"{prefix}-{i % 3}.pdf", "page": i % 10 + 1, "chunk_type": "text"},
+        }
+        for i in range(count)
+    ]
+
+def ranking(db, queries, top_k=10, filters=None):
+    return [[(doc["id"], round(doc["score"], 6)) for doc in db.search(query, top_k, filters=filters)] for query in queries]
+
+QUERIES = ["word1 word2", "word17", "word5 word80 word150", "word199 word3"]
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_compaction_keeps_live_documents(backend):
+    db = backend(compaction_threshold=1.0)  # Compact by hand
+    documents = make_documents(200)
+    db.add_documents(documents)
+    deleted = {f"doc{i}" for i in range(0, 200, 3)}
+    assert db.delete_documents(sorted(deleted)) == len(deleted)
+    assert db.index.deleted_count == len(deleted)
+
+    db.compact()
+
+    assert db.index.deleted_count == 0
+    assert len(db.index) == 200 - len(deleted)
+    assert db.document_ids == [doc["id"] for doc in documents if doc["id"] not in deleted]
+    assert all(db.ordinals[doc_id] == ordinal for ordinal, doc_id in enumerate(db.document_ids))
+
+    # Same results as an index built from the live documents only
+    fresh = backend()
+    fresh.add_documents([doc for doc in documents if doc["id"] not in deleted])
+    assert ranking(db, QUERIES) == ranking(fresh, QUERIES)
+
+def test_deletion_triggers_background_compaction():
+    db = SimpleVectorDatabase(compaction_threshold=0.25)
+    db.add_documents(make_documents(100))
+    db.delete_documents([f"doc{i}" for i in range(30)])
+    while db._compacting:
+        time.sleep(0.01)
+    assert db.index.deleted_count == 0
+    assert len(db.document_ids) == 70
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_deleted_documents_leave_results_at_once(backend):
+    db = backend()
+    db.add_documents(make_documents(50))
+    target = db.search("word1 word2", 1)[0]["id"]
+    assert db.delete_documents([target, "missing"]) == 1
+    assert target not in [doc["id"] for doc in db.search("word1 word2", 50)]
+    assert target not in db.documents
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_save_load_round_trip(backend, tmp_path):
+    db = backend()
+    db.add_documents(make_documents(150))
+    db.delete_documents(["doc3", "doc4"])
+    before = ranking(db, QUERIES)
+    db.save(str(tmp_path))
+
+    assert ranking(db, QUERIES) == before
+    loaded = backend.load(str(tmp_path))
+    assert ranking(loaded, QUERIES) == before
+    assert "doc3" not in loaded.documents
+    assert loaded.documents["doc5"]["content"] == db.documents["doc5"]["content"]
+
+@pytest.mark.parametrize("backend", [SimpleVectorDatabase, HybridVectorDatabase])
+def test_incremental_saves_add_segments(backend, tmp_path):
+    db = backend(max_segments=100)
+    db.add_documents(make_documents(50, seed=1, prefix="a"))
+    db.save(str(tmp_path))
+    db.add_documents(make_documents(50, seed=2, prefix="b"))
+    db.delete_documents(["a1"])
+    db.save(str(tmp_path))
+
+    manifest = read_manifest(str(tmp_path))
+    assert [entry["docs"] for entry in manifest["segments"]] == [50, 50]
+    before = ranking(db, QUERIES)
+    assert ranking(backend.load(str(tmp_path)), QUERIES) == before
+
+    db.merge_segments()
+    assert len(read_manifest(str(tmp_path))["segments"]) == 1
+    assert ranking(backend.load(str(tmp_path)), QUERIES) == before
+
+def test_load_ignores_segments_missing_from_manifest(tmp_path):
+    db = SimpleVectorDatabase()
+    db.add_documents(make_documents(80))
+    db.save(str(tmp_path))
+    before = ranking(db, QUERIES)
+
+    # A segment written by a save or merge that crashed before updating the manifest
+    other = SimpleVectorDatabase()
+    other.add_documents(make_documents(30, seed=9, prefix="stray"))
+    other.save(str(tmp_path / "other"))
+    stray = next(name for name in os.listdir(tmp_path / "other") if name.endswith(SEGMENT_SUFFIX))
+    os.replace(tmp_path / "other" / stray, tmp_path / f"seg-crashed{SEGMENT_SUFFIX}")
+
+    loaded = SimpleVectorDatabase.load(str(tmp_path))
+    assert ranking(loaded, QUERIES) == before
+    assert not any(doc_id.startswith("stray") for doc_id in loaded.document_ids)
+
+    # The next save drops the unreferenced file
+    loaded.add_documents(make_documents(5, seed=3, prefix="new"))
+    loaded.save(str(tmp_path))
+    assert not os.path.exists(tmp_path / f"seg-crashed{SEGMENT_SUFFIX}")
+
+def test_sharded_cache_invalidation():
+    db = ShardedVectorDatabase(factory=SimpleVectorDatabase)
+    db.add_documents(make_documents(50), "s1")
+    db.add_documents(make_documents(50, prefix="other"), "s2")
+
+    def hits():
+        return db.cache.stats()["hits"]
+
+    timings = {}
+    first = db.search("word1 word2", "s1", timings=timings)
+    assert hits() == 0
+    assert timings and all(isinstance(value, float) for value in timings.values())
+    timings = {}
+    assert db.search("word1 word2", "s1", timings=timings) == first
+    assert hits() == 1
+    assert timings == {}
+    db.search("word1 word2", "s2")
+    assert hits() == 1
+
+    # Changing one session's corpus only invalidates that session
+    db.add_documents([{"id": "new", "content": "word1 word2 word1 word2", "metadata": {}}], "s1")
+    results = db.search("word1 word2", "s1")
+    assert hits() == 1
+    assert results[0]["id"] == "new"
+    db.search("word1 word2", "s2")
+    assert hits() == 2
+
+    db.delete_documents(["new"], "s1")
+    assert "new" not in [doc["id"] for doc in db.search("word1 word2", "s1")]
+    assert hits() == 2
+
+def test_sharded_drop_session_forgets_cache_state():
+    db = ShardedVectorDatabase(factory=SimpleVectorDatabase)
+    db.add_documents(make_documents(20), "s1")
+    db.search("word1", "s1")
+    generation = db.cache.generation("s1")
+
+    db.drop_session("s1")
+    assert db.search("word1", "s1") == []
+    assert db.cache.stats()["entries"] == 0
+    assert "s1" not in db.cache._generations
+
+    # A search that started before the drop cannot cache its results afterwards
+    db.cache.put("s1", "key", [{"content": "stale"}], generation)
+    assert db.cache.get("s1", "key") is None
+
+def test_filtered_search_matches_unfiltered_subset():
+    db = SimpleVectorDatabase()
+    documents = make_documents(300)
+    db.add_documents(documents)
+    metadata = {doc["id"]: doc["metadata"] for doc in documents}
+
+    for filters in ({"source": "doc-1.pdf"}, {"page_from": 3, "page_to": 5}, {"source": "doc-2.pdf", "page_to": 2}):
+        results = db.search("word1 word2 word3", 300, filters=filters)
+        assert results
+        for doc in results:
+            meta = metadata[doc["id"]]
+            assert meta["source"] == filters.get("source", meta["source"])
+            assert filters.get("page_from", 1) <= meta["page"] <= filters.get("page_to", 10)
+
+    with pytest.raises(ValueError):
+        db.search("word1", filters={"author": "x"})
+
+@pytest.mark.parametrize("saved, reloaded", [(True, False), (False, True)])
+def test_load_keeps_the_saved_positional_flag(saved, reloaded, tmp_path):
+    db = SimpleVectorDatabase(positional=saved)
+    db.add_documents([{"id": "a", "content": "graph neural networks", "metadata": {}}])
+    db.save(str(tmp_path))
+
+    # POSITIONAL_INDEX changed between runs
+    loaded = SimpleVectorDatabase.load(str(tmp_path), positional=reloaded)
+    assert loaded.positional is saved
+    loaded.add_documents([{"id": "b", "content": "graph attention networks", "metadata": {}}])
+    assert {doc["id"] for doc in loaded.search('"graph attention"' if saved else "graph", 5)} >= {"b"}
+
+    loaded.save(str(tmp_path))
+    assert SimpleVectorDatabase.load(str(tmp_path)).index.positional is saved
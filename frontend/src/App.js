@@ -269,24 +269,34 @@ function App() {
     formData.append('file', file);
     
     try {
-      // Simulate progress
-      const progressInterval = setInterval(() => {
-        setUploadProgress((prev) => {
-          const newProgress = prev + 10;
-          return newProgress >= 90 ? 90 : newProgress;
-        });
-      }, 300);
-      
       const response = await fetch(`http://localhost:8000/upload?session_id=${sessionId}`, {
         method: 'POST',
         body: formData,
       });
       
-      clearInterval(progressInterval);
-      setUploadProgress(100);
+      const job = await response.json();
+      console.log("File upload response:", job);
+      if (!response.ok) {
+        throw new Error(job.detail || 'Upload failed');
+      }
       
-      const data = await response.json();
-      console.log("File upload response:", data);
+      // Parsing and indexing run in the background: poll the job until it finishes
+      let data = null;
+      while (!data) {
+        await new Promise((resolve) => setTimeout(resolve, 500));
+        const statusResponse = await fetch(`http://localhost:8000/upload/${job.job_id}?session_id=${sessionId}`);
+        const status = await statusResponse.json();
+        
+        if (status.status === 'done') {
+          data = status.result;
+        } else if (status.status === 'failed' || !statusResponse.ok) {
+          throw new Error(status.error || status.detail || 'Processing failed');
+        } else if (status.progress && status.progress.total_pages) {
+          const parsed = status.progress.pages_parsed || 0;
+          setUploadProgress(Math.min(95, Math.round((parsed / status.progress.total_pages) * 95)));
+        }
+      }
+      setUploadProgress(100);
       
       // Add the uploaded file to the state directly
       if (data.file_id && data.filename && data.chunk_count) {